@@ -1,16 +1,24 @@
 # app.py
-from fastapi import FastAPI, HTTPException, Request, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import asyncio
+import datetime
+import json
+import time
+import uuid
 import io
-import tempfile
 import os
 import sys
+import logging
 
 # Add current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
 
 # Add CORS middleware
@@ -22,24 +30,109 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+import deadlines
+import metrics
+from deadlines import DeadlineExceeded
+from worker_pools import PoolSaturated, run_in_stage, stage_slot, pool_stats, shutdown_pools
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    """Shed load quickly instead of queueing behind a busy stage"""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": str(exc), "stage": exc.stage},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """The request's latency budget ran out in a stage with no cheaper answer to give"""
+    return JSONResponse(
+        status_code=504,
+        content={"success": False, "error": str(exc), "stage": exc.stage},
+    )
+
+@app.on_event("shutdown")
+async def shutdown_worker_pools():
+    shutdown_pools()
+
 # Import your existing functions from separate modules
 try:
-    # Import Google Speech-to-Text function
-    from stt_live import transcribe_audio_file
+    # Import speech-to-text backends (Google or local) and upload helpers
+    from stt_backends import BackendUnavailable, get_backend, backend_stats, close_backends
+    from stt_live import (
+        collect_audio, open_streaming_recognizer, AudioTooLarge, MAX_AUDIO_BYTES, UPLOAD_CHUNK_SIZE
+    )
     
     # Import NLU functions from the new module
-    from nlu_service import extract_event
+    from nlu_service import (
+        extract_event, extract_event_async, rule_fast_path, rule_parse, nlu_status, start_health_probe,
+        stop_health_probe, OLLAMA_WARMUP, warm_model
+    )
+    from audio_preprocess import AUDIO_PREPROCESS, EmptyAudio, preprocess_audio
+    from nlu_cache import normalize_utterance
+    from ollama_client import close_client
     
     # Import calendar functions from calendar_booker
-    from calendar_booker import create_event, query_conflicts
+    from calendar_booker import create_event, query_conflicts, bulk_apply, find_free_slots, FreeBusyUnavailable
+    from calendar_async import calendar_client
+    from calendar_outbox import OUTBOX_ENABLED, TERMINAL, IdempotencyConflict, event_id_for, outbox
+    from calendar_service import service_pool
+    from calendar_mirror import MIRROR_ENABLED, get_mirror, mirror_stats
+    from event_index import index_stats
     
     print("✅ Successfully imported all backend modules")
     
 except ImportError as e:
     print(f"❌ Import error: {e}")
     # Fallback to simulating the functions
-    def transcribe_audio_file(audio_path):
-        return "Simulated transcript: Meeting with team tomorrow at 2 PM"
+    class _SimulatedBackend:
+        def transcribe(self, audio, encoding="WEBM_OPUS", sample_rate=48000, stats=None):
+            return "Simulated transcript: Meeting with team tomorrow at 2 PM"
+        
+        def warm(self):
+            return False
+    
+    class BackendUnavailable(RuntimeError):
+        def __init__(self, backend, reason):
+            super().__init__(f"STT backend '{backend}' is unavailable: {reason}")
+            self.backend = backend
+    
+    def get_backend(name=None):
+        return _SimulatedBackend()
+    
+    def backend_stats():
+        return {}
+    
+    def close_backends():
+        pass
+    
+    MAX_AUDIO_BYTES = 10 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE = 64 * 1024
+    
+    class AudioTooLarge(ValueError):
+        def __init__(self, size, limit):
+            super().__init__(f"Audio exceeds {limit} bytes (got at least {size})")
+            self.size = size
+            self.limit = limit
+    
+    async def collect_audio(chunks, max_bytes=MAX_AUDIO_BYTES, stats=None):
+        parts = [chunk async for chunk in chunks]
+        content = b"".join(parts)
+        if len(content) > max_bytes:
+            raise AudioTooLarge(len(content), max_bytes)
+        return content
+    
+    def open_streaming_recognizer(encoding="WEBM_OPUS", sample_rate=48000):
+        raise RuntimeError("Streaming recognition is unavailable")
+    
+    AUDIO_PREPROCESS = False
+    
+    class EmptyAudio(ValueError):
+        pass
+    
+    def preprocess_audio(data, stats=None):
+        return data, "WEBM_OPUS", 48000
     
     def extract_event(utterance):
         return {
@@ -52,11 +145,151 @@ except ImportError as e:
             "timezone": "America/New_York"
         }
     
+    async def extract_event_async(utterance, stats=None, rule_checked=False):
+        return extract_event(utterance)
+    
+    def rule_fast_path(utterance, stats):
+        return None
+    
+    def rule_parse(utterance, stats):
+        return extract_event(utterance), False
+    
+    def normalize_utterance(utterance):
+        return " ".join(utterance.lower().split())
+    
+    async def close_client():
+        pass
+    
+    def nlu_status():
+        return {"breaker": None}
+    
+    def start_health_probe():
+        pass
+    
+    def stop_health_probe():
+        pass
+    
+    OLLAMA_WARMUP = False
+    
+    async def warm_model():
+        return {}
+    
     def create_event(event_data):
         return {"id": "simulated_event", "htmlLink": "#", "status": "created"}
     
     def query_conflicts(start, end):
         return []
+    
+    def bulk_apply(operations, dry_run=False):
+        return [{"index": i, "op": op.get("op", "create"), "success": True, "dry_run": dry_run}
+                for i, op in enumerate(operations)]
+    
+    def find_free_slots(duration_minutes, window, working_hours=None, calendars=None, preferred=None, limit=5):
+        return [{"rank": 1, "start": window[0], "end": window[0]}]
+    
+    class FreeBusyUnavailable(Exception):
+        calendars = {}
+        slots = []
+    
+    class _SimulatedCalendarClient:
+        async def create_event(self, event_data, account=None, event_id=None):
+            return create_event(event_data)
+        
+        async def query_conflicts(self, start, end):
+            return query_conflicts(start, end)
+        
+        async def find_free_slots(self, duration_minutes, window, working_hours=None, calendars=None,
+                                  preferred=None, limit=5):
+            return find_free_slots(duration_minutes, window, working_hours, calendars, preferred, limit)
+        
+        async def aclose(self):
+            pass
+    
+    calendar_client = _SimulatedCalendarClient()
+    
+    OUTBOX_ENABLED = False
+    TERMINAL = ("done", "failed")
+    outbox = None
+    
+    class IdempotencyConflict(ValueError):
+        pass
+    
+    def event_id_for(key, account=None):
+        return None
+    service_pool = None
+    MIRROR_ENABLED = False
+    
+    def mirror_stats():
+        return {}
+    
+    def index_stats():
+        return {}
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# /free-slots searches this many days ahead when the request gives no end
+FREE_SLOT_SEARCH_DAYS = int(os.getenv("FREE_SLOT_SEARCH_DAYS", "7"))
+
+def budget_degraded(nlu_stats: Dict[str, Any]) -> bool:
+    """The budget ran out before the LLM answered, so the event is the rule parser's best effort"""
+    return nlu_stats.get("path") == "budget"
+
+async def extract_text(utterance: str, nlu_stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Rule fast path inline; only work that may reach the LLM takes an NLU slot"""
+    event_data = rule_fast_path(utterance, nlu_stats)
+    if event_data is not None:
+        return event_data
+    async with stage_slot("nlu"):
+        return await extract_event_async(utterance, nlu_stats)
+
+@app.on_event("startup")
+async def warm_stt_backend():
+    # In the background: a cold TLS handshake or model load shouldn't hold up startup
+    asyncio.create_task(run_in_stage("stt", get_backend().warm))
+
+@app.on_event("shutdown")
+async def stop_stt_backends():
+    close_backends()
+
+@app.on_event("startup")
+async def start_nlu_probe():
+    start_health_probe()
+
+@app.on_event("startup")
+async def warm_nlu_model():
+    # In the background, like the STT warmup; requests that arrive first just queue behind the load
+    if OLLAMA_WARMUP:
+        asyncio.create_task(warm_model())
+
+@app.on_event("shutdown")
+async def stop_nlu_probe():
+    stop_health_probe()
+    await close_client()
+
+@app.on_event("startup")
+async def start_calendar_service():
+    if service_pool is not None:
+        service_pool.start_refresher()
+        # Build the client now so the first booking doesn't pay for it
+        warmed = await run_in_stage("calendar", service_pool.warm)
+        # Only mirror when a stored token exists; never start an OAuth flow in the background
+        if warmed and MIRROR_ENABLED:
+            get_mirror().start()
+
+@app.on_event("shutdown")
+async def stop_calendar_service():
+    if service_pool is not None:
+        service_pool.stop_refresher()
+    if MIRROR_ENABLED:
+        get_mirror().stop()
+    if OUTBOX_ENABLED:
+        await outbox.stop()
+    await calendar_client.aclose()
+
+@app.on_event("startup")
+async def start_calendar_outbox():
+    if OUTBOX_ENABLED:
+        await outbox.start()
 
 @app.get("/")
 async def root():
@@ -66,56 +299,403 @@ async def root():
 async def health_check():
     return {
         "status": "healthy", 
-        "service": "VoiceCalendar AI Backend"
+        "service": "VoiceCalendar AI Backend",
+        "stt": backend_stats(),
+        "nlu": nlu_status(),
+        "calendar": service_pool.stats() if service_pool is not None else None,
+        "calendar_mirror": mirror_stats(),
+        "calendar_outbox": await outbox.stats() if OUTBOX_ENABLED else None,
+        "title_index": index_stats()
     }
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latency quantiles, error counters and pool gauges in Prometheus text format"""
+    for stage, stats in pool_stats().items():
+        for field in ("running", "queued"):
+            metrics.registry.set_gauge(f"pool_{field}", stats[field], stage=stage)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/pools")
+async def worker_pool_stats():
+    """Queue depth and wait time per stage, for tuning the pool limits"""
+    return pool_stats()
+
+# Room for the multipart boundary and part headers around the audio itself
+MULTIPART_OVERHEAD = 16 * 1024
+AUDIO_PATHS = {"/process-audio", "/process-audio/stream"}
+
+@app.exception_handler(AudioTooLarge)
+async def audio_too_large_handler(request: Request, exc: AudioTooLarge):
+    return JSONResponse(
+        status_code=413,
+        content={"success": False, "error": str(exc), "limit_bytes": exc.limit},
+    )
+
+@app.exception_handler(BackendUnavailable)
+async def backend_unavailable_handler(request: Request, exc: BackendUnavailable):
+    """A ?backend= that this install can't run, e.g. local without faster-whisper"""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": str(exc), "backend": exc.backend},
+    )
+
+@app.middleware("http")
+async def reject_oversized_audio(request: Request, call_next):
+    """Refuse an upload from its Content-Length before the body is read at all"""
+    if request.url.path in AUDIO_PATHS:
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > MAX_AUDIO_BYTES + MULTIPART_OVERHEAD:
+            return await audio_too_large_handler(request, AudioTooLarge(int(length), MAX_AUDIO_BYTES))
+    return await call_next(request)
+
+class AudioBodyLimit:
+    """
+    Cap the raw body of audio uploads as it arrives, for requests with no (or a wrong) Content-Length.
+    UploadFile spools the whole multipart body before the endpoint runs, so the cap can't wait for it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in AUDIO_PATHS:
+            await self.app(scope, receive, send)
+            return
+        state = {"received": 0, "too_large": None}
+
+        async def capped_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["received"] += len(message.get("body", b""))
+                if state["received"] > MAX_AUDIO_BYTES + MULTIPART_OVERHEAD:
+                    state["too_large"] = AudioTooLarge(state["received"], MAX_AUDIO_BYTES)
+                    raise state["too_large"]
+            return message
+
+        async def checked_send(message):
+            if state["too_large"] is None:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                # FastAPI reports any error while reading the form as a 400; answer with the 413 instead
+                response = await audio_too_large_handler(None, state["too_large"])
+                await response(scope, receive, send)
+
+        await self.app(scope, capped_receive, checked_send)
+
+app.add_middleware(AudioBodyLimit)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """One trace per request; every stage span below lands in it, and slow requests log the breakdown"""
+    trace, token = metrics.start_trace(f"{request.method} {request.url.path}")
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.end_trace(trace, token, getattr(route, "path", "unmatched"), request.method, status)
+
+# Routes that set their own budgets: one per batch item, or one per stage of a progressive stream
+SELF_BUDGETED_PATHS = {"/process-text/batch", "/process-audio/stream"}
+
+def request_budget_seconds(request: Request) -> float:
+    return deadlines.budget_from_header(request.headers.get(deadlines.BUDGET_HEADER))
+
+@app.middleware("http")
+async def request_budget(request: Request, call_next):
+    """
+    One latency budget per request (REQUEST_BUDGET_MS, or less via X-Request-Budget-Ms).
+    Every stage below takes its timeout from what is left of it, so the whole request ends in time.
+    """
+    if request.url.path in SELF_BUDGETED_PATHS:
+        return await call_next(request)
+    with deadlines.budget(request_budget_seconds(request)):
+        return await call_next(request)
+
+async def upload_chunks(upload: UploadFile):
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+async def transcribe_upload(audio: UploadFile, backend: Optional[str], audio_stats: Dict[str, Any]) -> str:
+    """Read, optionally preprocess and transcribe an uploaded clip; raises EmptyAudio for silence"""
+    stt = get_backend(backend)
+    logger.info(f"Received audio file: {audio.filename}")
+    
+    # Pass the upload through in chunks; AudioBodyLimit has already capped the raw body, this caps the audio part
+    audio_data = await collect_audio(upload_chunks(audio), MAX_AUDIO_BYTES, audio_stats)
+    logger.info(f"Audio data size: {len(audio_data)} bytes")
+    
+    encoding, sample_rate = "WEBM_OPUS", 48000
+    if AUDIO_PREPROCESS:
+        # Mono 16 kHz FLAC/PCM with the silence trimmed; empty clips stop here, before any network call
+        audio_data, encoding, sample_rate = await run_in_stage("stt", preprocess_audio, audio_data, audio_stats)
+        # The cap applies to what is sent to STT, not only to what was uploaded
+        if len(audio_data) > MAX_AUDIO_BYTES:
+            raise AudioTooLarge(len(audio_data), MAX_AUDIO_BYTES)
+    
+    transcript = await run_in_stage("stt", stt.transcribe, audio_data, encoding, sample_rate, audio_stats)
+    logger.info(f"Transcript: {transcript}")
+    return transcript
+
 @app.post("/process-audio")
-async def process_audio_file(audio: UploadFile = File(...)):
-    """Process audio file from frontend using Google Speech-to-Text"""
+async def process_audio_file(audio: UploadFile = File(...), backend: Optional[str] = None):
+    """Process audio file from frontend; ?backend=google|local picks the STT engine"""
+    audio_stats = {}
     try:
-        print(f"🎯 Received audio file: {audio.filename}")
-        
-        # Save audio to temporary file with correct extension
-        audio_data = await audio.read()
-        print(f"📊 Audio data size: {len(audio_data)} bytes")
-        
-        # Determine file extension based on content type or filename
-        if audio.filename.endswith('.webm') or audio.content_type == 'audio/webm':
-            file_extension = '.webm'
-        elif audio.filename.endswith('.wav') or audio.content_type == 'audio/wav':
-            file_extension = '.wav'
-        else:
-            # Default to webm since that's what browsers typically record in
-            file_extension = '.webm'
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-            tmp_file.write(audio_data)
-            tmp_file_path = tmp_file.name
-        
-        print(f"💾 Saved temporary file: {tmp_file_path}")
-        
-        # Transcribe using your existing Google Speech-to-Text setup
-        transcript = transcribe_audio_file(tmp_file_path)
-        print(f"📝 Transcript: {transcript}")
+        try:
+            transcript = await transcribe_upload(audio, backend, audio_stats)
+        except EmptyAudio as e:
+            return {"success": False, "error": str(e), "audio_stats": audio_stats}
         
         # Extract event data from transcript using NLU
-        event_data = extract_event(transcript)
+        nlu_stats = {}
+        async with stage_slot("nlu"):
+            event_data = await extract_event_async(transcript, nlu_stats)
         print(f"📅 Extracted event data: {event_data}")
         
-        # Clean up temporary file
-        os.unlink(tmp_file_path)
-        print("✅ Temporary file cleaned up")
-        
         return {
             "success": True, 
             "transcript": transcript,
-            "event": event_data
+            "event": event_data,
+            "degraded": budget_degraded(nlu_stats),
+            "nlu_stats": nlu_stats,
+            "audio_stats": audio_stats
         }
         
+    except (PoolSaturated, DeadlineExceeded, AudioTooLarge, BackendUnavailable):
+        raise
     except Exception as e:
         print(f"❌ Error in process-audio: {str(e)}")
         return {"success": False, "error": str(e)}
 
+# LLM stages of open /process-audio/stream responses, so a client can cancel one it no longer needs
+_refinements: Dict[str, asyncio.Task] = {}
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+@app.post("/process-audio/stream")
+async def process_audio_stream(request: Request, audio: UploadFile = File(...), backend: Optional[str] = None,
+                               format: str = "ndjson"):
+    """
+    Progressive /process-audio, as NDJSON lines (or server-sent events with ?format=sse):
+    "transcript" as soon as STT returns, then a "provisional" rule-based event, then the
+    "final" LLM event, each with the timings so far. A confident rule parse is sent as
+    "final" straight away. POST /process-audio/stream/{id}/cancel (or disconnecting) stops
+    the LLM stage; the stream then ends with "cancelled".
+    STT and the LLM stage each get a full request budget: the client already has a provisional answer.
+    """
+    started = time.perf_counter()
+    stream_id = uuid.uuid4().hex
+    audio_stats = {}
+    budget_seconds = request_budget_seconds(request)
+    try:
+        with deadlines.budget(budget_seconds):
+            transcript = await transcribe_upload(audio, backend, audio_stats)
+    except EmptyAudio as e:
+        return {"success": False, "error": str(e), "audio_stats": audio_stats}
+    except (PoolSaturated, DeadlineExceeded, AudioTooLarge, BackendUnavailable):
+        raise
+    except Exception as e:
+        logger.error(f"Error in process-audio/stream: {e}")
+        return {"success": False, "error": str(e)}
+    timings = {"stt_ms": _elapsed_ms(started)}
+    sse = format == "sse"
+    
+    def frame(kind: str, **payload) -> str:
+        data = json.dumps({"type": kind, "id": stream_id, **payload, "timings": dict(timings)}, default=str)
+        return f"event: {kind}\ndata: {data}\n\n" if sse else data + "\n"
+    
+    async def refine(nlu_stats: Dict[str, Any]) -> Dict[str, Any]:
+        with deadlines.budget(budget_seconds):
+            async with stage_slot("nlu"):
+                return await extract_event_async(transcript, nlu_stats, rule_checked=True)
+    
+    async def stream():
+        yield frame("transcript", transcript=transcript, audio_stats=audio_stats)
+        
+        nlu_stats = {}
+        rule_started = time.perf_counter()
+        provisional, confident = rule_parse(transcript, nlu_stats)
+        timings["rule_ms"] = _elapsed_ms(rule_started)
+        if confident:
+            timings["total_ms"] = _elapsed_ms(started)
+            yield frame("final", event=provisional, nlu_stats=nlu_stats)
+            return
+        yield frame("provisional", event=provisional, nlu_stats=dict(nlu_stats))
+        
+        llm_started = time.perf_counter()
+        task = asyncio.create_task(refine(nlu_stats))
+        _refinements[stream_id] = task
+        try:
+            # wait() rather than await: a cancel from the endpoint ends the stream cleanly, a disconnect propagates
+            await asyncio.wait({task})
+            timings["llm_ms"] = _elapsed_ms(llm_started)
+            timings["total_ms"] = _elapsed_ms(started)
+            if task.cancelled():
+                yield frame("cancelled", event=provisional, nlu_stats=nlu_stats)
+            elif task.exception() is not None:
+                yield frame("error", error=str(task.exception()), event=provisional, nlu_stats=nlu_stats)
+            else:
+                yield frame("final", event=task.result(), degraded=budget_degraded(nlu_stats), nlu_stats=nlu_stats)
+        finally:
+            _refinements.pop(stream_id, None)
+            task.cancel()
+    
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/process-audio/stream/{stream_id}/cancel")
+async def cancel_audio_stream(stream_id: str):
+    """Stop the LLM stage of a streaming request whose provisional event the user accepted"""
+    task = _refinements.get(stream_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="No LLM stage running for this stream")
+    task.cancel()
+    return {"success": True, "cancelled": stream_id}
+
+# Stability at which an interim transcript is worth a speculative extraction
+SPECULATION_STABILITY = float(os.getenv("SPECULATION_STABILITY", "0.8"))
+# A partial must survive this long before it may reach the LLM, so each new word doesn't cost a request
+SPECULATION_DEBOUNCE = float(os.getenv("SPECULATION_DEBOUNCE_MS", "150")) / 1000
+# A live session that sends nothing for this long is ended, releasing its streaming STT worker
+WS_RECEIVE_TIMEOUT = float(os.getenv("WS_RECEIVE_TIMEOUT", "15"))
+
+async def speculative_extract(utterance: str, nlu_stats: Dict[str, Any]) -> Dict[str, Any]:
+    event_data = rule_fast_path(utterance, nlu_stats)
+    if event_data is not None:
+        return event_data
+    await asyncio.sleep(SPECULATION_DEBOUNCE)
+    async with stage_slot("nlu"):
+        return await extract_event_async(utterance, nlu_stats)
+
+@app.websocket("/ws/transcribe")
+async def live_transcribe(websocket: WebSocket, encoding: str = "WEBM_OPUS", sample_rate: int = 48000):
+    """
+    Live transcription: binary frames are audio, {"type": "end"} marks the end of speech.
+    Sends partial/final transcripts as they arrive, then the extracted event.
+    Extraction starts speculatively on stable partials and is reused if the final transcript matches.
+    Recognition runs in the "stt_stream" pool, so live sessions can't take every one-shot STT worker.
+    """
+    await websocket.accept()
+    session = {"speculations": 0, "speculations_cancelled": 0, "speculation_reused": False}
+    speculation = None  # (normalized text, task, nlu_stats)
+    tasks = []
+    recognizer = None
+    disconnected = False
+
+    def speculate(text: str):
+        nonlocal speculation
+        key = normalize_utterance(text)
+        if not key or (speculation and speculation[0] == key):
+            return
+        if speculation:
+            speculation[1].cancel()
+            session["speculations_cancelled"] += 1
+        nlu_stats = {}
+        speculation = (key, asyncio.create_task(speculative_extract(text, nlu_stats)), nlu_stats)
+        session["speculations"] += 1
+
+    try:
+        recognizer = open_streaming_recognizer(encoding.upper(), sample_rate)
+
+        async def recognize():
+            try:
+                await run_in_stage("stt_stream", recognizer.run)
+            except PoolSaturated as e:
+                recognizer.abort(e)
+
+        async def pump_audio():
+            nonlocal disconnected
+            try:
+                while True:
+                    message = await asyncio.wait_for(websocket.receive(), WS_RECEIVE_TIMEOUT)
+                    if message["type"] == "websocket.disconnect":
+                        disconnected = True
+                        return
+                    if message.get("bytes"):
+                        recognizer.feed(message["bytes"])
+                    elif message.get("text"):
+                        try:
+                            control = json.loads(message["text"])
+                        except ValueError:
+                            recognizer.abort(ValueError("Text frames must be JSON control messages"))
+                            return
+                        if isinstance(control, dict) and control.get("type") == "end":
+                            return
+            except asyncio.TimeoutError:
+                recognizer.abort(TimeoutError(f"No audio or control message for {WS_RECEIVE_TIMEOUT:g}s"))
+            finally:
+                # However the pump ends, the recognizer's worker must not wait for more audio
+                recognizer.close()
+
+        started = time.perf_counter()
+        tasks += [asyncio.create_task(recognize()), asyncio.create_task(pump_audio())]
+        finals = []
+        async for update in recognizer.updates():
+            if update["is_final"]:
+                finals.append(update["transcript"])
+            text = " ".join(finals if update["is_final"] else finals + [update["transcript"]]).strip()
+            session.setdefault("first_partial_ms", round((time.perf_counter() - started) * 1000, 1))
+            await websocket.send_json({
+                "type": "final" if update["is_final"] else "partial",
+                "transcript": text,
+                "stability": update["stability"],
+            })
+            if update["stability"] >= SPECULATION_STABILITY:
+                speculate(text)
+        if disconnected:
+            return
+
+        transcript = " ".join(finals).strip()
+        final_at = time.perf_counter()
+        if speculation and speculation[0] == normalize_utterance(transcript):
+            event_data, nlu_stats = await speculation[1], speculation[2]
+            session["speculation_reused"] = True
+        else:
+            if speculation:
+                speculation[1].cancel()
+                session["speculations_cancelled"] += 1
+            nlu_stats = {}
+            # Speech has ended: from here on the session is a request like any other
+            with deadlines.budget(deadlines.REQUEST_BUDGET_MS / 1000):
+                event_data = await extract_text(transcript, nlu_stats)
+        speculation = None
+        session["final_to_event_ms"] = round((time.perf_counter() - final_at) * 1000, 1)
+        session["audio_bytes"] = recognizer.bytes_received
+        await websocket.send_json({
+            "type": "event",
+            "transcript": transcript,
+            "event": event_data,
+            "nlu_stats": nlu_stats,
+            "session_stats": session,
+        })
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except PoolSaturated as e:
+        if not disconnected:
+            await websocket.send_json({"type": "error", "error": str(e), "stage": e.stage, "retry_after": e.retry_after})
+            await websocket.close(code=1013)
+    except Exception as e:
+        logger.error(f"Error in live transcription: {e}")
+        if not disconnected:
+            await websocket.send_json({"type": "error", "error": str(e)})
+            await websocket.close(code=1011)
+    finally:
+        if speculation:
+            speculation[1].cancel()
+        for task in tasks:
+            task.cancel()
+        if recognizer is not None:
+            recognizer.close()
+
 @app.post("/process-text")
 async def process_text_command(request: Request):
     """Use your existing NLU to extract event data"""
@@ -126,22 +706,203 @@ async def process_text_command(request: Request):
         if not utterance:
             return {"success": False, "error": "No utterance provided", "event": None}
         
-        event_data = extract_event(utterance)
-        return {"success": True, "event": event_data, "transcript": utterance}
+        nlu_stats = {}
+        event_data = await extract_text(utterance, nlu_stats)
+        return {"success": True, "event": event_data, "transcript": utterance,
+                "degraded": budget_degraded(nlu_stats), "nlu_stats": nlu_stats}
         
+    except (PoolSaturated, DeadlineExceeded):
+        raise
     except Exception as e:
         return {"success": False, "error": str(e), "event": None}
 
+@app.post("/process-text/batch")
+async def process_text_batch(request: Request):
+    """
+    Extract events for many utterances; identical ones are extracted once.
+    Each extraction gets its own request budget, from when it starts rather than when the batch arrived.
+    """
+    data = await request.json()
+    utterances = data.get("utterances")
+    stream = bool(data.get("stream", False))
+    
+    if not isinstance(utterances, list) or not utterances:
+        return {"success": False, "error": "No utterances provided", "results": []}
+    if len(utterances) > BATCH_MAX_ITEMS:
+        return JSONResponse(
+            status_code=413,
+            content={"success": False, "error": f"Batch exceeds {BATCH_MAX_ITEMS} utterances", "results": []},
+        )
+    
+    # Group indexes by normalized text so repeats share one extraction
+    groups: Dict[str, list] = {}
+    for index, utterance in enumerate(utterances):
+        key = normalize_utterance(utterance) if isinstance(utterance, str) and utterance.strip() else None
+        groups.setdefault(key, []).append(index)
+    
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+    budget_seconds = request_budget_seconds(request)
+    
+    async def run_group(key, indexes):
+        utterance = utterances[indexes[0]]
+        if key is None:
+            return indexes, {"success": False, "error": "No utterance provided", "event": None}
+        nlu_stats = {}
+        try:
+            async with limit:
+                with deadlines.budget(budget_seconds):
+                    event_data = await extract_text(utterance, nlu_stats)
+            return indexes, {"success": True, "event": event_data, "degraded": budget_degraded(nlu_stats),
+                             "nlu_stats": nlu_stats}
+        except Exception as e:
+            return indexes, {"success": False, "error": str(e), "event": None}
+    
+    tasks = [asyncio.create_task(run_group(key, indexes)) for key, indexes in groups.items()]
+    
+    def item(index, outcome):
+        return {"index": index, "transcript": utterances[index], **outcome}
+    
+    if stream:
+        async def ndjson():
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    indexes, outcome = await finished
+                    for index in indexes:
+                        yield json.dumps(item(index, outcome)) + "\n"
+                yield json.dumps({"done": True, "count": len(utterances), "unique": len(groups)}) + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+        
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    results = [None] * len(utterances)
+    for indexes, outcome in await asyncio.gather(*tasks):
+        for index in indexes:
+            results[index] = item(index, outcome)
+    return {"success": True, "count": len(utterances), "unique": len(groups), "results": results}
+
 @app.post("/create-event")
-async def create_calendar_event(request: Request):
-    """Use your calendar_booker to create the event"""
+async def create_calendar_event(request: Request, check_conflicts: bool = False):
+    """
+    Record the event in the outbox and answer 202 with an operation id; a worker inserts it.
+    An Idempotency-Key header makes client retries safe; without one every request is a new event.
+    Optionally reports conflicts with the requested slot.
+    """
     try:
         event_data = await request.json()
-        result = create_event(event_data)
-        return {"success": True, "event": result}
+        key = request.headers.get("Idempotency-Key") or uuid.uuid4().hex
+        if not OUTBOX_ENABLED:
+            return await create_event_now(event_data, key, check_conflicts)
+        
+        operation, created = await outbox.submit(event_data, key)
+        content = {"success": operation["status"] != "failed", **operation,
+                   "status_url": f"/operations/{operation['operation_id']}"}
+        if check_conflicts:
+            async with stage_slot("calendar"):
+                conflicts = await calendar_client.query_conflicts(event_data["start"], event_data["end"])
+            content["conflicts"] = [c for c in conflicts if c.get("id") != event_id_for(key)]
+        return JSONResponse(status_code=200 if operation["status"] in TERMINAL else 202, content=content)
+    except IdempotencyConflict as e:
+        return JSONResponse(status_code=409, content={"success": False, "error": str(e), "event": None})
+    except (PoolSaturated, DeadlineExceeded):
+        raise
     except Exception as e:
         return {"success": False, "error": str(e), "event": None}
 
+async def create_event_now(event_data: Dict[str, Any], key: str, check_conflicts: bool) -> Dict[str, Any]:
+    """Insert inline (outbox disabled); the key still pins the event id so retries don't duplicate"""
+    event_id = event_id_for(key)
+    async with stage_slot("calendar"):
+        if not check_conflicts:
+            return {"success": True, "event": await calendar_client.create_event(event_data, event_id=event_id)}
+        conflicts, result = await asyncio.gather(
+            calendar_client.query_conflicts(event_data["start"], event_data["end"]),
+            calendar_client.create_event(event_data, event_id=event_id),
+        )
+    conflicts = [c for c in conflicts if c.get("id") != result.get("id")]
+    return {"success": True, "event": result, "conflicts": conflicts}
+
+@app.get("/operations/{operation_id}")
+async def operation_status(operation_id: str):
+    """Status of an outbox write; `event` is set once it is done"""
+    operation = await outbox.get(operation_id) if OUTBOX_ENABLED else None
+    if operation is None:
+        raise HTTPException(status_code=404, detail="Unknown operation")
+    return operation
+
+@app.get("/operations/{operation_id}/events")
+async def operation_events(operation_id: str):
+    """Server-sent events: the operation's status on every change, ending once it is done or failed"""
+    operation = await outbox.get(operation_id) if OUTBOX_ENABLED else None
+    if operation is None:
+        raise HTTPException(status_code=404, detail="Unknown operation")
+    
+    async def stream():
+        current = operation
+        yield f"event: status\ndata: {json.dumps(current)}\n\n"
+        while current["status"] not in TERMINAL:
+            changed = await outbox.wait_for_change(operation_id, timeout=15)
+            latest = await outbox.get(operation_id)
+            if latest is None:
+                return
+            if changed or latest["updated"] != current["updated"]:
+                current = latest
+                yield f"event: status\ndata: {json.dumps(current)}\n\n"
+            else:
+                # Keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/free-slots")
+async def free_slots(request: Request):
+    """Ranked free slots across one or more calendars, from a single freeBusy call"""
+    try:
+        data = await request.json()
+        duration = int(data.get("duration_minutes") or 30)
+        start = data.get("start") or datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0).isoformat()
+        end = data.get("end") or (datetime.datetime.fromisoformat(start.replace("Z", "+00:00"))
+                                  + datetime.timedelta(days=FREE_SLOT_SEARCH_DAYS)).isoformat()
+        async with stage_slot("calendar"):
+            slots = await calendar_client.find_free_slots(
+                duration, (start, end), data.get("working_hours"), data.get("calendars"),
+                data.get("preferred"), int(data.get("limit") or 5),
+            )
+        return {"success": True, "slots": slots, "window": {"start": start, "end": end}}
+    except FreeBusyUnavailable as e:
+        # The slots ignore the failed calendars' busy times; the client decides whether they are good enough
+        return {"success": False, "error": str(e), "slots": e.slots, "unavailable_calendars": e.calendars,
+                "window": {"start": start, "end": end}}
+    except (PoolSaturated, DeadlineExceeded):
+        raise
+    except Exception as e:
+        return {"success": False, "error": str(e), "slots": []}
+
+@app.post("/create-events")
+async def create_calendar_events(request: Request):
+    """Bulk create/move/cancel through Calendar API batch requests"""
+    try:
+        data = await request.json()
+        # "events" is shorthand for a list of creates; "operations" allows moves and cancels too
+        operations = data.get("operations")
+        if operations is None:
+            operations = [{"op": "create", "event": event} for event in data.get("events") or []]
+        if not operations:
+            return {"success": False, "error": "No events provided", "results": []}
+        
+        dry_run = bool(data.get("dry_run", False))
+        results = await run_in_stage("calendar", bulk_apply, operations, dry_run)
+        return {
+            "success": all(r["success"] for r in results),
+            "dry_run": dry_run,
+            "results": results
+        }
+    except (PoolSaturated, DeadlineExceeded):
+        raise
+    except Exception as e:
+        return {"success": False, "error": str(e), "results": []}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
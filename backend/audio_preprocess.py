@@ -0,0 +1,237 @@
+# audio_preprocess.py
+import io
+import os
+import time
+import shutil
+import logging
+import subprocess
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "0") == "1"
+TARGET_RATE = int(os.getenv("AUDIO_TARGET_RATE", "16000"))
+FFMPEG = os.getenv("FFMPEG_PATH", "") or shutil.which("ffmpeg")
+# Rate ffmpeg decodes compressed input to; Opus is 48 kHz internally, so this is not a resample
+DECODE_RATE = 48000
+
+VAD_FRAME_MS = 30
+# A frame is speech if it is this far above the clip's noise floor and above the absolute floor
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+VAD_MIN_DB = float(os.getenv("VAD_MIN_DB", "-50"))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "200"))
+MIN_SPEECH_MS = int(os.getenv("MIN_SPEECH_MS", "250"))
+
+class EmptyAudio(ValueError):
+    """The clip has no speech worth sending to STT"""
+
+class PreprocessUnavailable(Exception):
+    """The clip can't be decoded here (no ffmpeg, unsupported WAV); send it as is"""
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+WAVE_PCM, WAVE_FLOAT, WAVE_MULAW, WAVE_EXTENSIBLE = 1, 3, 7, 0xFFFE
+
+def read_wav(data: bytes) -> Dict[str, Any]:
+    """Format tag, channels, rate, bits and the sample bytes of a RIFF/WAVE file"""
+    view = memoryview(data)
+    fmt, samples = None, None
+    pos = 12
+    while pos + 8 <= len(data) and (fmt is None or samples is None):
+        chunk_id, size = bytes(view[pos:pos + 4]), int.from_bytes(view[pos + 4:pos + 8], "little")
+        body = view[pos + 8:pos + 8 + size]
+        if chunk_id == b"fmt " and len(body) >= 16:
+            tag = int.from_bytes(body[0:2], "little")
+            if tag == WAVE_EXTENSIBLE and len(body) >= 26:
+                # The real format is the first two bytes of the sub-format GUID
+                tag = int.from_bytes(body[24:26], "little")
+            fmt = {
+                "format": tag,
+                "channels": int.from_bytes(body[2:4], "little"),
+                "rate": int.from_bytes(body[4:8], "little"),
+                "bits": int.from_bytes(body[14:16], "little"),
+            }
+        elif chunk_id == b"data":
+            samples = body
+        pos += 8 + size + (size & 1)  # chunks are word-aligned
+    if fmt is None or samples is None or not fmt["channels"] or not fmt["rate"]:
+        raise PreprocessUnavailable("Malformed WAV: no usable fmt or data chunk")
+    return {**fmt, "data": samples}
+
+def decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """float32 samples shaped (frames, channels) in [-1, 1], and the sample rate"""
+    wav = read_wav(data)
+    tag, channels, width = wav["format"], wav["channels"], wav["bits"] // 8
+    raw = wav["data"]
+    raw = raw[:len(raw) - len(raw) % (channels * max(width, 1))]
+    if tag == WAVE_FLOAT and width in (4, 8):
+        samples = np.frombuffer(raw, dtype=f"<f{width}").astype(np.float32)
+    elif tag == WAVE_PCM and width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif tag == WAVE_PCM and width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif tag == WAVE_PCM and width == 3:
+        # Widen each little-endian 3-byte sample to int32: low bytes unsigned, top byte signed
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        b[:, 2] = b[:, 2].astype(np.int8)
+        samples = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)).astype(np.float32) / 8388608
+    elif tag == WAVE_PCM and width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise PreprocessUnavailable(f"Unsupported WAV format {tag} at {wav['bits']} bits")
+    return samples.reshape(-1, channels), wav["rate"]
+
+def wav_encoding(data: bytes) -> Tuple[str, int]:
+    """Speech API encoding and rate for sending a WAV as is; unspecified lets the API read the header"""
+    try:
+        wav = read_wav(data)
+    except PreprocessUnavailable:
+        return "ENCODING_UNSPECIFIED", 0
+    if wav["format"] == WAVE_PCM and wav["bits"] == 16:
+        return "LINEAR16", wav["rate"]
+    if wav["format"] == WAVE_MULAW:
+        return "MULAW", wav["rate"]
+    return "ENCODING_UNSPECIFIED", wav["rate"]
+
+def decode_ffmpeg(data: bytes) -> Tuple[np.ndarray, int]:
+    if not FFMPEG:
+        raise PreprocessUnavailable("ffmpeg not found")
+    proc = subprocess.run(
+        [FFMPEG, "-v", "error", "-i", "pipe:0", "-f", "f32le", "-ac", "1", "-ar", str(DECODE_RATE), "pipe:1"],
+        input=data, capture_output=True, timeout=30,
+    )
+    if proc.returncode != 0:
+        raise PreprocessUnavailable(f"ffmpeg failed: {proc.stderr.decode(errors='replace').strip()[:200]}")
+    # Raw output carries no channel count, so ffmpeg downmixes compressed input itself
+    return np.frombuffer(proc.stdout, dtype="<f4").reshape(-1, 1), DECODE_RATE
+
+def decode(data: bytes) -> Tuple[np.ndarray, int]:
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return decode_wav(data)
+    return decode_ffmpeg(data)
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    return samples[:, 0] if samples.shape[1] == 1 else samples.mean(axis=1, dtype=np.float32)
+
+def _lowpass_taps(cutoff: float, taps: int = 63) -> np.ndarray:
+    # Hamming-windowed sinc; cutoff as a fraction of the source rate
+    n = np.arange(taps) - (taps - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (h / h.sum()).astype(np.float32)
+
+def resample(samples: np.ndarray, rate: int, target: int = TARGET_RATE) -> np.ndarray:
+    """Anti-aliased decimation (integer ratios) or linear interpolation (anything else)"""
+    if rate == target or samples.size == 0:
+        return samples
+    if target < rate:
+        taps = _lowpass_taps(0.5 * target / rate)
+        if rate % target == 0:
+            # Filter only the samples that survive decimation
+            padded = np.pad(samples, (len(taps) // 2, len(taps) // 2))
+            windows = np.lib.stride_tricks.sliding_window_view(padded, len(taps))[::rate // target]
+            return windows @ taps[::-1]
+        samples = np.convolve(samples, taps, mode="same")
+    positions = np.arange(0, len(samples) * target / rate) * rate / target
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+def speech_bounds(samples: np.ndarray, rate: int) -> Optional[Tuple[int, int]]:
+    """Sample range from the first to the last speech frame (padded), or None if there is none"""
+    frame = rate * VAD_FRAME_MS // 1000
+    count = len(samples) // frame
+    if count == 0:
+        return None
+    frames = samples[:count * frame].reshape(count, frame)
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-12)
+    threshold = max(VAD_MIN_DB, np.percentile(energy_db, 10) + VAD_MARGIN_DB)
+    voiced = np.flatnonzero(energy_db > threshold)
+    if len(voiced) * VAD_FRAME_MS < MIN_SPEECH_MS:
+        return None
+    pad = rate * VAD_PAD_MS // 1000
+    return max(0, voiced[0] * frame - pad), min(len(samples), (voiced[-1] + 1) * frame + pad)
+
+def to_linear16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+def encode_flac(pcm: bytes, rate: int) -> bytes:
+    """Lossless FLAC for mono LINEAR16; roughly half the size of the raw samples"""
+    if not FFMPEG:
+        raise PreprocessUnavailable("ffmpeg not found")
+    proc = subprocess.run(
+        [FFMPEG, "-v", "error", "-f", "s16le", "-ac", "1", "-ar", str(rate), "-i", "pipe:0", "-f", "flac", "pipe:1"],
+        input=pcm, capture_output=True, timeout=30,
+    )
+    if proc.returncode != 0:
+        raise PreprocessUnavailable(f"ffmpeg failed: {proc.stderr.decode(errors='replace').strip()[:200]}")
+    return proc.stdout
+
+def preprocess_audio(data: bytes, stats: Optional[Dict[str, Any]] = None) -> Tuple[bytes, str, int]:
+    """
+    Decode, downmix, resample to TARGET_RATE and trim silence.
+    Returns (audio, encoding, sample_rate) for STT; raises EmptyAudio if there is no speech.
+    The result is FLAC when ffmpeg is available, LINEAR16 otherwise. Compressed audio that
+    can't be decoded here, or that would only grow when re-encoded, is returned unchanged
+    as WEBM_OPUS at 48 kHz; a WAV that can't be decoded is returned with its own encoding.
+    """
+    with metrics.span("stt.preprocess"):
+        return _preprocess(data, stats)
+
+def _preprocess(data: bytes, stats: Optional[Dict[str, Any]]) -> Tuple[bytes, str, int]:
+    stats = stats if stats is not None else {}
+    timings = stats.setdefault("preprocess_ms", {})
+    stats["input_bytes"] = len(data)
+
+    started = time.perf_counter()
+    is_wav = data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+    try:
+        samples, rate = decode(data)
+    except PreprocessUnavailable as e:
+        logger.info(f"Skipping audio preprocessing: {e}")
+        stats["preprocessed"] = False
+        if is_wav:
+            return (data, *wav_encoding(data))
+        return data, "WEBM_OPUS", 48000
+    timings["decode"] = _elapsed_ms(started)
+    stats["input_seconds"] = round(len(samples) / rate, 2)
+
+    started = time.perf_counter()
+    mono = downmix(samples)
+    timings["downmix"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    mono = resample(mono, rate, TARGET_RATE)
+    timings["resample"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    bounds = speech_bounds(mono, TARGET_RATE)
+    timings["vad"] = _elapsed_ms(started)
+    if bounds is None:
+        stats["speech_seconds"] = 0.0
+        raise EmptyAudio("No speech detected in the recording")
+    mono = mono[bounds[0]:bounds[1]]
+    stats["speech_seconds"] = round(len(mono) / TARGET_RATE, 2)
+
+    started = time.perf_counter()
+    audio, encoding = to_linear16(mono), "LINEAR16"
+    try:
+        audio, encoding = encode_flac(audio, TARGET_RATE), "FLAC"
+    except PreprocessUnavailable as e:
+        logger.info(f"Sending LINEAR16: {e}")
+    timings["encode"] = _elapsed_ms(started)
+
+    if not is_wav and len(audio) >= len(data):
+        # Opus is denser than the trimmed re-encode, so the original is the cheaper upload
+        stats["preprocessed"] = False
+        stats["output_bytes"] = len(data)
+        stats["bytes_saved"] = 0
+        return data, "WEBM_OPUS", 48000
+
+    stats["preprocessed"] = True
+    stats["output_encoding"] = encoding
+    stats["output_bytes"] = len(audio)
+    stats["bytes_saved"] = len(data) - len(audio)
+    return audio, encoding, TARGET_RATE
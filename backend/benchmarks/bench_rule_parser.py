@@ -0,0 +1,277 @@
+# benchmarks/bench_rule_parser.py
+"""
+Microbenchmark: precompiled single-pass rule parser vs the previous
+per-call regex implementation of extract_event_fallback / validate_and_correct_dates.
+
+Run from backend/:  python benchmarks/bench_rule_parser.py [--number N]
+"""
+import os
+import re
+import sys
+import timeit
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rule_parser
+from nlu_service import RULE_CONFIDENCE_THRESHOLD, validate_and_correct_dates, extract_event_fallback
+
+logger = logging.getLogger("legacy")
+# Keep log formatting out of both measurements
+logging.disable(logging.CRITICAL)
+
+UTTERANCES = [
+    "Book a meeting with Brenda next Tuesday at 1 PM for 3 hours",
+    "Meeting with team tomorrow at 2 PM",
+    "Lunch on September 18th at 12:30 pm for 45 minutes",
+    "Schedule a call with John on Friday at 10am for 30 minutes",
+    "Dentist appointment December 3 at 9 a.m. for 1 hour",
+    "Quick sync",
+]
+# Dates, lengths, offsets and zones the grammar doesn't read; a confident parse of these would be wrong
+LLM_ONLY = [
+    "Meeting at 2:30pm for 1.5 hours tomorrow",
+    "Meeting at 2:30pm for two and a half hours tomorrow",
+    "Review in 30 minutes at 4pm today",
+    "Meeting the day after tomorrow at 2pm",
+    "Meeting next week on Tuesday at 2pm",
+    "Meeting 2 days before Friday at 3pm",
+    "Meeting on Friday after next at 2pm",
+    "Meeting tomorrow 2pm 3 hours",
+    "Call with Tokyo tomorrow at 9am PST",
+]
+UTTERANCES += LLM_ONLY
+
+# --- Previous implementation, kept verbatim for comparison ---
+
+def legacy_validate_and_correct_dates(event_data: Dict[str, Any], utterance: str = "") -> Dict[str, Any]:
+    """Validate and correct date formats with proper relative date handling"""
+    utterance_lower = utterance.lower()
+    
+    # If we don't have a start date, try to extract from utterance
+    if "start" not in event_data or not event_data["start"]:
+        return event_data
+    
+    event_data["attendees"] = []
+    
+    try:
+        start_str = event_data.get("start", "")
+        current_year = datetime.now().year
+        
+        # Check if we mentioned a specific month that should override any existing date
+        month_patterns = {
+            'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+            'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
+        }
+        
+        for month_name, month_num in month_patterns.items():
+            if month_name in utterance_lower:
+                day_match = re.search(rf"{month_name}\s+(\d{{1,2}})(?:st|nd|rd|th)?", utterance_lower)
+                if day_match:
+                    day_num = int(day_match.group(1))
+                    current_year = datetime.now().year
+                    
+                    try:
+                        corrected_date = datetime(current_year, month_num, day_num)
+                        
+                        # If we have a time in the existing start date, preserve it
+                        if "start" in event_data and event_data["start"]:
+                            start_str = event_data["start"]
+                            time_match = re.search(r"T(\d{2}:\d{2}:\d{2})", start_str)
+                            if time_match:
+                                time_part = time_match.group(1)
+                                event_data["start"] = f"{corrected_date.strftime('%Y-%m-%d')}T{time_part}"
+                                
+                                # Also update end date if it exists
+                                if "end" in event_data and event_data["end"]:
+                                    end_str = event_data["end"]
+                                    end_time_match = re.search(r"T(\d{2}:\d{2}:\d{2})", end_str)
+                                    if end_time_match:
+                                        event_data["end"] = f"{corrected_date.strftime('%Y-%m-%d')}T{end_time_match.group(1)}"
+                        
+                        logger.info(f"Corrected to specific date: {corrected_date.strftime('%Y-%m-%d')}")
+                        break
+                        
+                    except ValueError:
+                        continue
+    
+    except Exception as e:
+        logger.error(f"Date correction failed: {e}")
+    
+    return event_data
+
+def legacy_extract_event_fallback(utterance: str) -> Dict[str, Any]:
+    """Improved fallback function with proper date parsing for specific dates"""
+    utterance_lower = utterance.lower()
+    result = {"intent": "CreateEvent", "title": "Meeting", "timezone": "America/New_York", "attendees": []}
+    
+    today = datetime.now()
+    current_year = today.year
+    
+    # Handle specific dates like "September 18th"
+    month_patterns = {
+        'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+        'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
+    }
+    
+    event_date = None
+    date_found = False
+    
+    # Parse specific month-day patterns
+    for month_name, month_num in month_patterns.items():
+        if month_name in utterance_lower:
+            # Match patterns like "September 18th", "September 18", "september 18th at"
+            day_match = re.search(rf"{month_name}\s+(\d{{1,2}})(?:st|nd|rd|th)?", utterance_lower)
+            if day_match:
+                day_num = int(day_match.group(1))
+                try:
+                    event_date = datetime(current_year, month_num, day_num)
+                    result["title"] = f"Meeting on {month_name.title()} {day_num}"
+                    date_found = True
+                    logger.info(f"Parsed specific date: {event_date.strftime('%Y-%m-%d')}")
+                    break
+                except ValueError:
+                    # Invalid date (e.g., February 30)
+                    continue
+    
+    # Handle "next [day]" patterns if no specific date found
+    if not date_found:
+        day_mapping = {
+            'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+            'friday': 4, 'saturday': 5, 'sunday': 6
+        }
+        
+        next_day_match = re.search(r"next\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)", utterance_lower)
+        
+        if next_day_match:
+            day_name = next_day_match.group(1)
+            target_weekday = day_mapping[day_name]
+            current_weekday = today.weekday()
+            
+            days_until_next = (target_weekday - current_weekday) % 7
+            if days_until_next <= 0:
+                days_until_next += 7
+            
+            event_date = today + timedelta(days=days_until_next)
+            result["title"] = f"{day_name.title()} Meeting"
+            
+        elif "tomorrow" in utterance_lower:
+            event_date = today + timedelta(days=1)
+            
+        else:
+            # Default to today if no date specified
+            event_date = today
+    
+    # Parse time with better pattern matching
+    time_match = re.search(r"at\s+(\d{1,2})(?::(\d{2}))?\s*(a\.m\.|p\.m\.|am|pm|a\.m|p\.m)?", utterance_lower, re.IGNORECASE)
+    if time_match and event_date:
+        hour = int(time_match.group(1))
+        minute = int(time_match.group(2) or "0")
+        period = (time_match.group(3) or "").lower().replace('.', '')
+        
+        # Convert to 24-hour format
+        if any(p in period for p in ['pm', 'p.m']):
+            if hour < 12:
+                hour += 12
+        elif any(p in period for p in ['am', 'a.m']) and hour == 12:
+            hour = 0
+        
+        # Handle 12-hour format without AM/PM (assume PM if ambiguous)
+        if not period and hour < 8:
+            hour += 12  # Assume evening for hours 1-7 without AM/PM
+        
+        try:
+            start_time = event_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            result["start"] = start_time.isoformat()
+            
+            # Set default duration of 1 hour if not specified
+            default_duration = 60
+            result["end"] = (start_time + timedelta(minutes=default_duration)).isoformat()
+            result["duration_minutes"] = default_duration
+        except ValueError as e:
+            logger.error(f"Invalid time: {e}")
+    
+    # Parse duration more accurately
+    duration_match = re.search(r"for\s+(\d+)\s*(hour|hr|minute|min|minutes|hrs|hours)", utterance_lower)
+    if duration_match and "start" in result:
+        duration = int(duration_match.group(1))
+        unit = duration_match.group(2).lower()
+        
+        try:
+            start_time = datetime.fromisoformat(result["start"].replace('Z', '+00:00'))
+            
+            if any(u in unit for u in ['hour', 'hr']):
+                result["end"] = (start_time + timedelta(hours=duration)).isoformat()
+                result["duration_minutes"] = duration * 60
+            else:
+                result["end"] = (start_time + timedelta(minutes=duration)).isoformat()
+                result["duration_minutes"] = duration
+        except Exception as e:
+            logger.error(f"Error calculating end time: {e}")
+    
+    # Parse title from utterance (first few meaningful words)
+    words = [word for word in utterance.split() if word.lower() not in ['schedule', 'a', 'meeting', 'with', 'on', 'at', 'for']]
+    if len(words) > 0:
+        result["title"] = " ".join(words[:4])  # Use first 4 meaningful words as title
+    
+    # Parse attendees
+    #email_matches = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', utterance)
+    #if email_matches:
+    #    result["attendees"] = email_matches
+    result["attendees"] = []
+    
+    return result
+
+# --- Benchmark ---
+
+def _llm_like_event() -> Dict[str, Any]:
+    return {"start": "2026-01-01T14:00:00", "end": "2026-01-01T15:00:00"}
+
+def bench(label: str, fn, number: int) -> float:
+    # Best of several runs; the minimum is the least noisy estimate
+    total = min(timeit.repeat(fn, number=number, repeat=5))
+    per_call_us = total / (number * len(UTTERANCES)) * 1e6
+    print(f"{label:<42} {per_call_us:9.1f} us/utterance")
+    return per_call_us
+
+def cold(fn):
+    """fn with rule_parser's per-utterance memos emptied first, as for text never seen before"""
+    def run():
+        rule_parser._parse.cache_clear()
+        rule_parser._month_days.cache_clear()
+        return fn()
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000, help="iterations over the utterance set")
+    args = parser.parse_args()
+
+    print(f"{len(UTTERANCES)} utterances x {args.number} iterations\n")
+    fallback = lambda: [extract_event_fallback(u) for u in UTTERANCES]
+    validate = lambda: [validate_and_correct_dates(_llm_like_event(), u) for u in UTTERANCES]
+    old_fb = bench("legacy extract_event_fallback", lambda: [legacy_extract_event_fallback(u) for u in UTTERANCES], args.number)
+    cold_fb = bench("extract_event_fallback, first sight", cold(fallback), args.number)
+    # A request that misses the fast path parses the same text again in the hedge or fallback
+    new_fb = bench("extract_event_fallback, repeat", fallback, args.number)
+    bench("rule_parser.parse, first sight", cold(lambda: [rule_parser.parse(u) for u in UTTERANCES]), args.number)
+    old_v = bench("legacy validate_and_correct_dates",
+                  lambda: [legacy_validate_and_correct_dates(_llm_like_event(), u) for u in UTTERANCES], args.number)
+    cold_v = bench("validate_and_correct_dates, first sight", cold(validate), args.number)
+    new_v = bench("validate_and_correct_dates, repeat", validate, args.number)
+    print(f"\nfallback speedup: {old_fb / cold_fb:.1f}x first sight, {old_fb / new_fb:.1f}x repeat; "
+          f"validation speedup: {old_v / cold_v:.1f}x first sight, {old_v / new_v:.1f}x repeat")
+
+    confident = [u for u in UTTERANCES if rule_parser.parse(u)[1] >= RULE_CONFIDENCE_THRESHOLD]
+    print(f"tier-0 fast path: {len(confident)}/{len(UTTERANCES)} utterances skip the LLM "
+          f"(threshold {RULE_CONFIDENCE_THRESHOLD})")
+    wrong = [u for u in LLM_ONLY if u in confident]
+    if wrong:
+        print(f"confident parse of utterances the grammar can't read: {wrong}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+# benchmarks/fake_services.py
+"""
+Local stand-ins for Ollama, Google Speech-to-Text and Google Calendar, with
+configurable latency, jitter and error rate, so the backend can be measured
+without credentials or a GPU.
+
+Run standalone from backend/:  python benchmarks/fake_services.py [--ollama-latency-ms 300 ...]
+and point the app at them with the environment variables it prints.
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+import itertools
+from concurrent import futures
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+@dataclass
+class Behavior:
+    """Latency model and failure rate for one fake service"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+    def delay(self):
+        ms = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def fails(self) -> bool:
+        return random.random() < self.error_rate
+
+class _HTTPFake:
+    """ThreadingHTTPServer on a background thread; port 0 picks a free port"""
+
+    handler = BaseHTTPRequestHandler
+
+    def __init__(self, behavior: Behavior, port: int = 0):
+        self.behavior = behavior
+        handler = type(self.handler.__name__, (self.handler,), {"fake": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def count(self, failed: bool):
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "errors": self.errors}
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: Any = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _send(self, status: int, payload: Optional[Dict[str, Any]] = None):
+        data = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _maybe_fail(self) -> bool:
+        failed = self.fake.behavior.fails()
+        self.fake.count(failed)
+        if failed:
+            # Drain the request body so the kept-alive connection stays usable
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self._send(503, {"error": {"code": 503, "message": "injected failure"}})
+        return failed
+
+# --- Ollama ---
+
+OLLAMA_EVENT = {
+    "intent": "CreateEvent", "title": "Team sync", "start": "2026-10-18T14:00:00",
+    "end": "2026-10-18T15:00:00", "duration_minutes": 60, "attendees": [], "timezone": "America/New_York",
+}
+
+class _OllamaHandler(_JSONHandler):
+    def do_GET(self):
+        if self.path.startswith("/api/tags"):
+            self._send(200, {"models": [{"name": "llama3.2:latest"}]})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self.path.startswith("/api/generate"):
+            return self._send(404, {"error": "not found"})
+        body = self._body()
+        behavior = self.fake.behavior
+        self.fake.load_model(body.get("keep_alive"))
+        # Latency is time to first token; the rest of the answer streams at token_ms per token
+        behavior.delay()
+        if self._maybe_fail():
+            return
+        text = json.dumps(OLLAMA_EVENT)
+        tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+        if not body.get("stream"):
+            time.sleep(self.fake.token_ms * len(tokens) / 1000)
+            return self._send(200, {"model": body.get("model"), "response": text, "done": True,
+                                    "eval_count": len(tokens)})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens + [None]:
+                chunk = {"response": token or "", "done": token is None}
+                if token is None:
+                    chunk["eval_count"] = len(tokens)
+                line = (json.dumps(chunk) + "\n").encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+                if token is not None and self.fake.token_ms:
+                    time.sleep(self.fake.token_ms / 1000)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client stopped early once it had every field it needed
+            pass
+
+def _keep_alive_seconds(value) -> float:
+    """Ollama's keep_alive: seconds as a number (negative = forever) or a duration like "30m"; default 5m"""
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", value.strip())
+    if not match:
+        return 300.0
+    amount = float(match.group(1))
+    if amount < 0:
+        return float("inf")
+    return amount * {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}[match.group(2)]
+
+class FakeOllama(_HTTPFake):
+    """load_ms is paid by the first request, and again once the model idles past its keep_alive"""
+
+    handler = _OllamaHandler
+
+    def __init__(self, behavior: Behavior, token_ms: float = 5.0, load_ms: float = 0.0, port: int = 0):
+        super().__init__(behavior, port)
+        self.token_ms = token_ms
+        self.load_ms = load_ms
+        self.loads = 0
+        self._loaded_until = 0.0
+        self._load_lock = threading.Lock()
+
+    def load_model(self, keep_alive):
+        # Concurrent requests during a load all wait for it, as they do on a real server
+        with self._load_lock:
+            if time.monotonic() >= self._loaded_until:
+                self.loads += 1
+                time.sleep(self.load_ms / 1000)
+            self._loaded_until = time.monotonic() + _keep_alive_seconds(keep_alive)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "model_loads": self.loads}
+
+# --- Calendar ---
+
+class _CalendarHandler(_JSONHandler):
+    def _route(self):
+        # /calendar/v3/calendars/{calendarId}/events[/{eventId}]
+        parsed = urlparse(self.path)
+        parts = parsed.path.strip("/").split("/")
+        if len(parts) < 5 or parts[:2] != ["calendar", "v3"] or parts[4] != "events":
+            return None, None
+        return (parts[5] if len(parts) > 5 else None), parse_qs(parsed.query)
+
+    def _freebusy(self):
+        body = self._body()
+        busy = [{"start": e["start"]["dateTime"], "end": e["end"]["dateTime"]}
+                for e in self.fake.events.values()
+                if "dateTime" in e.get("start", {}) and e["start"]["dateTime"] < body["timeMax"]
+                and e["end"]["dateTime"] > body["timeMin"]]
+        calendars = {item["id"]: {"busy": busy if item["id"] == "primary" else []} for item in body.get("items", [])}
+        self._send(200, {"kind": "calendar#freeBusy", "calendars": calendars})
+
+    def _handle(self, method: str):
+        if method == "POST" and urlparse(self.path).path.rstrip("/") == "/calendar/v3/freeBusy":
+            self.fake.behavior.delay()
+            return self._maybe_fail() or self._freebusy()
+        event_id, query = self._route()
+        if query is None:
+            return self._send(404, {"error": {"code": 404, "message": "not found"}})
+        self.fake.behavior.delay()
+        if self._maybe_fail():
+            return
+        events = self.fake.events
+        if method == "POST":
+            body = self._body()
+            event = {**body, "id": body.get("id") or f"evt{next(self.fake.ids)}", "status": "confirmed"}
+            if event["id"] in events:
+                return self._send(409, {"error": {"code": 409, "message": "The requested identifier already exists."}})
+            event["htmlLink"] = f"https://calendar.example/{event['id']}"
+            events[event["id"]] = event
+            return self._send(200, event)
+        if method == "GET" and not event_id:
+            items = list(events.values())
+            if "q" in query:
+                needle = query["q"][0].lower()
+                items = [e for e in items if needle in e.get("summary", "").lower()]
+            if "timeMin" in query and "timeMax" in query:
+                lo, hi = query["timeMin"][0], query["timeMax"][0]
+                items = [e for e in items if e.get("start", {}).get("dateTime", "") < hi
+                         and e.get("end", {}).get("dateTime", "") > lo]
+            return self._send(200, {"items": items[:2500]})
+        if event_id not in events:
+            return self._send(404, {"error": {"code": 404, "message": "event not found"}})
+        if method == "GET":
+            return self._send(200, events[event_id])
+        if method == "PATCH":
+            events[event_id].update(self._body())
+            return self._send(200, events[event_id])
+        events.pop(event_id)
+        self._send(204)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+class FakeCalendar(_HTTPFake):
+    handler = _CalendarHandler
+
+    def __init__(self, behavior: Behavior, port: int = 0):
+        super().__init__(behavior, port)
+        self.events: Dict[str, Dict[str, Any]] = {}
+        self.ids = itertools.count(1)
+
+    @property
+    def api_base(self) -> str:
+        return f"{self.url}/calendar/v3"
+
+# --- Speech ---
+
+class FakeSpeech:
+    """gRPC server answering google.cloud.speech.v1.Speech/Recognize with a fixed transcript"""
+
+    def __init__(self, behavior: Behavior, transcript: str = "Meeting with team tomorrow at 2 PM",
+                 port: int = 0, workers: int = 32):
+        import grpc
+        from google.cloud import speech
+
+        self.behavior = behavior
+        self.transcript = transcript
+        self.requests = 0
+        self.errors = 0
+        self._speech = speech
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers))
+        handler = grpc.method_handlers_generic_handler("google.cloud.speech.v1.Speech", {
+            "Recognize": grpc.unary_unary_rpc_method_handler(
+                self._recognize,
+                request_deserializer=speech.RecognizeRequest.deserialize,
+                response_serializer=speech.RecognizeResponse.serialize,
+            ),
+        })
+        self.server.add_generic_rpc_handlers((handler,))
+        self.port = self.server.add_insecure_port(f"127.0.0.1:{port}")
+
+    @property
+    def endpoint(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def _recognize(self, request, context):
+        import grpc
+        self.behavior.delay()
+        self.requests += 1
+        if self.behavior.fails():
+            self.errors += 1
+            context.abort(grpc.StatusCode.UNAVAILABLE, "injected failure")
+        speech = self._speech
+        alternative = speech.SpeechRecognitionAlternative(transcript=self.transcript, confidence=0.93)
+        return speech.RecognizeResponse(results=[speech.SpeechRecognitionResult(alternatives=[alternative])])
+
+    def start(self):
+        self.server.start()
+        return self
+
+    def stop(self):
+        self.server.stop(grace=None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "errors": self.errors}
+
+def start_all(ollama: Behavior, speech: Behavior, calendar: Behavior, token_ms: float = 5.0,
+              load_ms: float = 0.0):
+    return {
+        "ollama": FakeOllama(ollama, token_ms, load_ms).start(),
+        "speech": FakeSpeech(speech).start(),
+        "calendar": FakeCalendar(calendar).start(),
+    }
+
+def app_environment(fakes) -> Dict[str, str]:
+    """Environment that points the backend at the fakes"""
+    return {
+        "OLLAMA_HOSTS": fakes["ollama"].url,
+        "STT_ENDPOINT": fakes["speech"].endpoint,
+        "STT_INSECURE": "1",
+        "STT_BACKEND": "google",
+        "CALENDAR_API_BASE": fakes["calendar"].api_base,
+        # The mirror syncs through googleapiclient against Google itself
+        "CALENDAR_MIRROR": "0",
+    }
+
+def add_behavior_args(parser: argparse.ArgumentParser):
+    for name, latency in (("ollama", 300), ("speech", 400), ("calendar", 120)):
+        parser.add_argument(f"--{name}-latency-ms", type=float, default=latency)
+        parser.add_argument(f"--{name}-jitter-ms", type=float, default=latency / 5)
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0)
+    parser.add_argument("--ollama-token-ms", type=float, default=5.0)
+    parser.add_argument("--ollama-load-ms", type=float, default=2000.0, help="cold model load")
+
+def behaviors_from_args(args) -> Dict[str, Behavior]:
+    return {
+        name: Behavior(getattr(args, f"{name}_latency_ms"), getattr(args, f"{name}_jitter_ms"),
+                       getattr(args, f"{name}_error_rate"))
+        for name in ("ollama", "speech", "calendar")
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_behavior_args(parser)
+    args = parser.parse_args()
+    behaviors = behaviors_from_args(args)
+    fakes = start_all(behaviors["ollama"], behaviors["speech"], behaviors["calendar"], args.ollama_token_ms,
+                      args.ollama_load_ms)
+    for key, value in app_environment(fakes).items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for fake in fakes.values():
+            fake.stop()
+
+if __name__ == "__main__":
+    main()
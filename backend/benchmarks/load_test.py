@@ -0,0 +1,287 @@
+# benchmarks/load_test.py
+"""
+End-to-end load test against local fakes for Ollama, Speech and Calendar.
+
+Starts the fakes (benchmarks/fake_services.py), runs the app under uvicorn
+pointed at them, drives /process-text, /process-audio and /create-event at
+each concurrency level, and saves throughput and p50/p95/p99 as JSON. The
+first request of each level is timed on its own, so the cold first request
+(--no-model-warmup) can be compared with the steady state.
+
+Run from backend/:
+    python benchmarks/load_test.py --concurrency 1,8,32 --requests 200
+    python benchmarks/load_test.py --compare benchmarks/results/baseline.json
+    python benchmarks/load_test.py --target http://localhost:8000   # an already running app
+"""
+import io
+import os
+import sys
+import json
+import math
+import time
+import wave
+import random
+import asyncio
+import argparse
+import datetime
+import subprocess
+import tempfile
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_services import add_behavior_args, app_environment, behaviors_from_args, start_all
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+SCENARIOS = ("text", "audio", "event")
+
+NAMES = ["Brenda", "John", "Priya", "Marco", "Aiko", "Sam"]
+TOPICS = ["roadmap", "budget", "hiring", "launch plan", "retro", "Q3 goals", "design review"]
+DAYS = ["tomorrow", "next Tuesday", "on Friday", "on September 18th", "today"]
+TIMES = ["at 9am", "at 1 PM", "at 3:30 pm", "at noon"]
+
+def random_utterance(llm: bool = False) -> str:
+    """About half parse confidently by rule; the rest (all, with llm) need the LLM and rarely repeat"""
+    if not llm and random.random() < 0.5:
+        return f"Meeting with {random.choice(NAMES)} {random.choice(DAYS)} {random.choice(TIMES)} for an hour"
+    return f"Sync up with {random.choice(NAMES)} about the {random.choice(TOPICS)} sometime soon #{random.randrange(10**6)}"
+
+def make_wav(seconds: float = 2.0, rate: int = 16000) -> bytes:
+    samples = bytearray()
+    for i in range(int(seconds * rate)):
+        value = int(8000 * math.sin(2 * math.pi * 220 * i / rate)) if rate * 0.3 < i < rate * (seconds - 0.3) else 0
+        samples += value.to_bytes(2, "little", signed=True)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(bytes(samples))
+    return buf.getvalue()
+
+def fake_token_home() -> str:
+    """A HOME with a non-expiring stored Calendar token, so the app never starts an OAuth flow"""
+    home = tempfile.mkdtemp(prefix="voicecal-bench-")
+    token_dir = os.path.join(home, ".voice-calendar-ai")
+    os.makedirs(token_dir)
+    with open(os.path.join(token_dir, "token.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "token": "bench-token", "refresh_token": "bench-refresh", "client_id": "bench",
+            "client_secret": "bench", "token_uri": "http://127.0.0.1:9/token",
+            "scopes": ["https://www.googleapis.com/auth/calendar.events"],
+            "expiry": "2099-01-01T00:00:00Z",
+        }, f)
+    return home
+
+async def send(client: httpx.AsyncClient, scenario: str, audio: bytes, llm: bool = False) -> httpx.Response:
+    if scenario == "text":
+        return await client.post("/process-text", json={"utterance": random_utterance(llm)})
+    if scenario == "audio":
+        return await client.post("/process-audio", files={"audio": ("clip.wav", audio, "audio/wav")})
+    start = datetime.datetime(2026, 11, 2, 9) + datetime.timedelta(minutes=30 * random.randrange(400))
+    return await client.post("/create-event", json={
+        "title": f"Bench {random.randrange(10**6)}",
+        "start": start.isoformat(),
+        "end": (start + datetime.timedelta(minutes=30)).isoformat(),
+    })
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+async def run_level(base_url: str, scenario: str, concurrency: int, total: int, warmup: int) -> Dict[str, Any]:
+    audio = make_wav()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        # First request of the level on its own (an LLM one for text), before the warmup requests
+        started = time.perf_counter()
+        await send(client, scenario, audio, llm=True)
+        first_ms = (time.perf_counter() - started) * 1000
+        for _ in range(warmup):
+            await send(client, scenario, audio)
+
+        latencies: List[float] = []
+        statuses: Counter = Counter()
+        paths: Counter = Counter()
+        errors = 0
+        remaining = iter(range(total))
+
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    response = await send(client, scenario, audio)
+                    body = response.json()
+                    ok = response.is_success and body.get("success", False)
+                    statuses[response.status_code] += 1
+                    path = (body.get("nlu_stats") or {}).get("path")
+                    if path:
+                        paths[path] += 1
+                except (httpx.HTTPError, ValueError):
+                    ok = False
+                    statuses["exception"] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        "first_ms": round(first_ms, 1),
+        "mean_ms": round(sum(ordered) / len(ordered), 1),
+        "p50_ms": round(percentile(ordered, 0.50), 1),
+        "p95_ms": round(percentile(ordered, 0.95), 1),
+        "p99_ms": round(percentile(ordered, 0.99), 1),
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "nlu_paths": dict(paths),
+    }
+
+def start_app(env: Dict[str, str], port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"App exited during startup with code {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError("App did not become healthy within 60s")
+
+def base_url_for(port: int) -> str:
+    return f"http://127.0.0.1:{port}"
+
+def wait_for_model_warmup(base_url: str, timeout: float = 120):
+    """The app warms Ollama in the background after startup; measure from when it is done"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if httpx.get(f"{base_url}/health", timeout=5).json().get("nlu", {}).get("warmup_ms"):
+            return
+        time.sleep(0.25)
+    print("Warning: model warmup did not finish; first requests may include the load")
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Print per-level deltas; return the levels whose p95 or throughput regressed past threshold"""
+    before = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'scenario':<8} {'conc':>5} {'p95 ms':>18} {'rps':>18}")
+    for result in current["results"]:
+        key = (result["scenario"], result["concurrency"])
+        old = before.get(key)
+        if old is None:
+            continue
+        p95_change = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+        rps_change = (result["throughput_rps"] - old["throughput_rps"]) / old["throughput_rps"] if old["throughput_rps"] else 0.0
+        flag = ""
+        if p95_change > threshold or rps_change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(f"{key[0]}@{key[1]}")
+        print(f"{key[0]:<8} {key[1]:>5} {old['p95_ms']:>7}->{result['p95_ms']:<7}({p95_change:+.0%})"
+              f" {old['throughput_rps']:>7}->{result['throughput_rps']:<7}({rps_change:+.0%}){flag}")
+    return regressions
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--target", help="benchmark an already running app instead of starting one with fakes")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/load-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed p95/throughput regression")
+    parser.add_argument("--no-model-warmup", action="store_true",
+                        help="start the app with OLLAMA_WARMUP=0, so the first request pays the model load")
+    add_behavior_args(parser)
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+    behaviors = behaviors_from_args(args)
+
+    fakes, app_proc = None, None
+    base_url = args.target
+    if not base_url:
+        fakes = start_all(behaviors["ollama"], behaviors["speech"], behaviors["calendar"], args.ollama_token_ms,
+                          args.ollama_load_ms)
+        env = {**app_environment(fakes), "HOME": fake_token_home()}
+        if args.no_model_warmup:
+            env["OLLAMA_WARMUP"] = "0"
+        app_proc = start_app(env, args.port)
+        if not args.no_model_warmup:
+            wait_for_model_warmup(base_url_for(args.port))
+        base_url = base_url_for(args.port)
+
+    try:
+        results = []
+        for scenario in scenarios:
+            for level in levels:
+                result = asyncio.run(run_level(base_url, scenario, level, args.requests, args.warmup))
+                results.append(result)
+                print(f"{scenario:<6} c={level:<4} first {result['first_ms']:>7} ms  {result['throughput_rps']:>8} rps  "
+                      f"p50 {result['p50_ms']:>7} ms  p95 {result['p95_ms']:>7} ms  "
+                      f"p99 {result['p99_ms']:>7} ms  errors {result['errors']}")
+    finally:
+        if app_proc is not None:
+            app_proc.terminate()
+            app_proc.wait(timeout=10)
+        if fakes is not None:
+            for fake in fakes.values():
+                fake.stop()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "target": args.target or "local fakes",
+            "requests": args.requests,
+            "fakes": {name: vars(b) for name, b in behaviors.items()} if fakes else None,
+            "ollama_token_ms": args.ollama_token_ms,
+            "ollama_load_ms": args.ollama_load_ms,
+            "model_warmup": not args.no_model_warmup,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"\nRegressed past {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# calendar_async.py
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from calendar_booker import (
+    CALENDAR_ID, FREE_SLOT_LIMIT, _active_mirror, _format_event_body, _record_write, _refind_event,
+    _require_event, conflicts_params, freebusy_body, get_service, move_patch, slots_from_freebusy,
+)
+from calendar_service import service_pool
+import deadlines
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_API_BASE = os.getenv("CALENDAR_API_BASE", "https://www.googleapis.com/calendar/v3").rstrip("/")
+CALENDAR_POOL_SIZE = int(os.getenv("CALENDAR_POOL_SIZE", "20"))
+CALENDAR_CONNECT_TIMEOUT = float(os.getenv("CALENDAR_CONNECT_TIMEOUT", "5"))
+CALENDAR_READ_TIMEOUT = float(os.getenv("CALENDAR_READ_TIMEOUT", "20"))
+
+class CalendarAPIError(Exception):
+    """Non-2xx response from the Calendar REST API"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Calendar API error {status}: {message}")
+        self.status = status
+
+class AsyncCalendarClient:
+    """
+    Calendar operations over a pooled httpx.AsyncClient, sharing credentials with calendar_service.
+    Request bodies, parameters and the title-index lookup come from calendar_booker's helpers.
+    """
+
+    def __init__(self, base_url: str = CALENDAR_API_BASE):
+        self.base_url = base_url
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(CALENDAR_READ_TIMEOUT, connect=CALENDAR_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=CALENDAR_POOL_SIZE, max_keepalive_connections=CALENDAR_POOL_SIZE),
+            )
+        return self._client
+
+    async def _token(self, account: Optional[str]) -> str:
+        # Fast path: client already built and token fresh (the refresher keeps it so)
+        creds = service_pool.cached_credentials(account)
+        if creds is None or not creds.valid:
+            # First use or a missed refresh: load/refresh off the event loop
+            creds = await asyncio.to_thread(service_pool.get_credentials, account)
+        return creds.token
+
+    async def _request(self, method: str, path: str, account: Optional[str] = None,
+                       stage: str = "calendar.request", **kwargs) -> Any:
+        with metrics.span(stage):
+            return await self._send(method, path, account, **kwargs)
+
+    async def _send(self, method: str, path: str, account: Optional[str], **kwargs) -> Any:
+        headers = {"Authorization": f"Bearer {await self._token(account)}"}
+        # Under a request budget no call outlives it
+        timeout = deadlines.timeout_for("calendar", CALENDAR_READ_TIMEOUT)
+        try:
+            response = await self.client.request(
+                method, f"{self.base_url}{path}", headers=headers,
+                timeout=httpx.Timeout(timeout, connect=min(timeout, CALENDAR_CONNECT_TIMEOUT)), **kwargs
+            )
+        except httpx.TimeoutException:
+            deadlines.check("calendar")
+            raise
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("error", {}).get("message", response.text)
+            except ValueError:
+                message = response.text
+            raise CalendarAPIError(response.status_code, message)
+        if response.status_code == 204 or not response.content:
+            return None
+        return response.json()
+
+    def _events_path(self, event_id: str = "") -> str:
+        path = f"/calendars/{CALENDAR_ID}/events"
+        return f"{path}/{event_id}" if event_id else path
+
+    async def create_event(self, event_body: Dict[str, Any], account: Optional[str] = None,
+                           event_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Insert the event. With `event_id` the insert is idempotent: if that id already
+        exists (an earlier attempt got through but its response was lost) it is returned;
+        if it exists but was deleted since, the 409 stands.
+        """
+        formatted_event = _format_event_body(event_body)
+        if event_id:
+            formatted_event["id"] = event_id
+        try:
+            event = await self._request("POST", self._events_path(), account, "calendar.create",
+                                        params={"sendUpdates": "all"}, json=formatted_event)
+        except CalendarAPIError as e:
+            if not event_id or e.status != 409:
+                raise
+            existing = await self.get_event(event_id, account)
+            if existing.get("status") == "cancelled":
+                # Deleted since, and Google never reuses an id: the write can't go through under this key
+                raise CalendarAPIError(409, f"Event {event_id} was already created and then deleted") from e
+            logger.info(f"Event {event_id} already exists; not inserting it again")
+            return existing
+        _record_write(event, account)
+        return event
+
+    async def get_event(self, event_id: str, account: Optional[str] = None) -> Dict[str, Any]:
+        return await self._request("GET", self._events_path(event_id), account, "calendar.get")
+
+    async def query_conflicts(self, start_iso: str, end_iso: str, account: Optional[str] = None) -> List[Dict[str, Any]]:
+        mirror = _active_mirror(account)
+        if mirror is not None:
+            with metrics.span("calendar.conflicts_mirror"):
+                return mirror.conflicts(start_iso, end_iso)
+        resp = await self._request("GET", self._events_path(), account, "calendar.conflicts",
+                                   params=conflicts_params(start_iso, end_iso))
+        return resp.get("items", [])
+
+    async def find_free_slots(self, duration_minutes: int, window: Tuple[str, str], working_hours=None,
+                              calendars: Optional[List[str]] = None, preferred: Optional[str] = None,
+                              limit: int = FREE_SLOT_LIMIT, account: Optional[str] = None) -> List[Dict[str, Any]]:
+        if duration_minutes <= 0:
+            raise ValueError("duration_minutes must be positive")
+        response = await self._request("POST", "/freeBusy", account, "calendar.freebusy",
+                                       json=freebusy_body(window, calendars))
+        return slots_from_freebusy(response, duration_minutes, window, working_hours, preferred, limit)
+
+    async def _act_on_event(self, criteria: Dict[str, Any], account: Optional[str], near: Optional[str], action):
+        """
+        As calendar_booker._act_on_event, with an async action. The index lookup and the
+        fallback search use the shared sync service, so they run in a thread.
+        """
+        service = await asyncio.to_thread(get_service, account)
+        ev = await asyncio.to_thread(_require_event, service, criteria, account, near)
+        try:
+            return await action(ev)
+        except CalendarAPIError as e:
+            if e.status not in (404, 410):
+                raise
+        ev = await asyncio.to_thread(_refind_event, service, criteria, account, ev)
+        return await action(ev)
+
+    async def move_event(self, criteria: Dict[str, Any], new_start: str, new_end: str,
+                         account: Optional[str] = None) -> Dict[str, Any]:
+        patch = move_patch(new_start, new_end)
+
+        async def move(ev):
+            return await self._request("PATCH", self._events_path(ev["id"]), account, "calendar.move",
+                                       params={"sendUpdates": "all"}, json=patch)
+
+        updated = await self._act_on_event(criteria, account, criteria.get("start") or new_start, move)
+        _record_write(updated, account)
+        return updated
+
+    async def cancel_event(self, criteria: Dict[str, Any], account: Optional[str] = None) -> Dict[str, Any]:
+        async def cancel(ev):
+            await self._request("DELETE", self._events_path(ev["id"]), account, "calendar.cancel",
+                                params={"sendUpdates": "all"})
+            return {"id": ev["id"], "status": "cancelled"}
+
+        result = await self._act_on_event(criteria, account, criteria.get("start"), cancel)
+        _record_write(result, account)
+        return result
+
+    async def book_events(self, event_bodies: List[Dict[str, Any]], check_conflicts: bool = True,
+                          account: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Conflict checks and inserts for several events at once; one result per event"""
+
+        async def book(body):
+            try:
+                _format_event_body(body)  # validate before spending any request
+                if check_conflicts:
+                    conflicts, created = await asyncio.gather(
+                        self.query_conflicts(body["start"], body["end"], account),
+                        self.create_event(body, account),
+                    )
+                    conflicts = [c for c in conflicts if c.get("id") != created.get("id")]
+                else:
+                    conflicts, created = [], await self.create_event(body, account)
+                return {"success": True, "event": created, "conflicts": conflicts}
+            except Exception as e:
+                return {"success": False, "error": str(e), "event": None}
+
+        return await asyncio.gather(*(book(body) for body in event_bodies))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+calendar_client = AsyncCalendarClient()
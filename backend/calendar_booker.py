@@ -1,23 +1,39 @@
 # calendar_booker.py
 import os
+import time
+import uuid
+import asyncio
+import logging
 import datetime
 import zoneinfo
-from pathlib import Path
-from typing import Dict, Any, List, Optional
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 import json
+import httplib2
+import httpx
+from google.auth.exceptions import TransportError as AuthTransportError
+from googleapiclient.errors import HttpError
+
+# Credentials, token storage and the long-lived client live in calendar_service
+from calendar_service import SCOPES, CLIENT_PATH, TOKEN_PATH, service_pool
+from event_index import get_index
+import deadlines
+import metrics
+
+logger = logging.getLogger(__name__)
 
-SCOPES = ["https://www.googleapis.com/auth/calendar.events"]
-# Use environment variable or relative path for better portability
-CLIENT_PATH = os.getenv("GOOGLE_CREDENTIALS_PATH", 
-                       r"C:\Users\gatsi\Box\MY BREATHTAKING PROJECT\Voice Calendar AI\credentials.json")
-TOKEN_PATH = Path.home() / ".voice-calendar-ai" / "token.json"
-TOKEN_PATH.parent.mkdir(parents=True, exist_ok=True)
 CALENDAR_ID = "primary"
 DEFAULT_TZ = "America/New_York"
+# Calendar API batch requests; Google recommends keeping these small
+BATCH_SIZE = int(os.getenv("CALENDAR_BATCH_SIZE", "50"))
+BATCH_MAX_RETRIES = int(os.getenv("CALENDAR_BATCH_RETRIES", "2"))
+BATCH_RETRY_BACKOFF = float(os.getenv("CALENDAR_BATCH_BACKOFF", "0.5"))
+# Free-slot search: local working hours ("HH:MM-HH:MM"), weekdays (Monday=0), candidate granularity
+WORKING_HOURS = os.getenv("WORKING_HOURS", "09:00-17:00")
+WORKING_DAYS = tuple(int(d) for d in os.getenv("WORKING_DAYS", "0,1,2,3,4").split(","))
+SLOT_STEP_MINUTES = int(os.getenv("SLOT_STEP_MINUTES", "15"))
+FREE_SLOT_LIMIT = int(os.getenv("FREE_SLOT_LIMIT", "5"))
+
+Interval = Tuple[datetime.datetime, datetime.datetime]
 
 def _ensure_rfc3339_with_tz(dt_str: str) -> str:
     """Convert datetime string to RFC3339 format with timezone"""
@@ -54,124 +70,126 @@ def _ensure_rfc3339_with_tz(dt_str: str) -> str:
         print(f"Warning: Could not parse date '{dt_str}': {e}")
         return dt_str  # Return as-is and let Google API handle validation
 
-def get_service():
-    """Get authenticated Google Calendar service"""
-    creds = None
+def get_service(account: Optional[str] = None):
+    """Get the cached, authenticated Google Calendar service for an account"""
+    return service_pool.get_service(account)
+
+def _active_mirror(account: Optional[str] = None):
+    """Fresh local mirror for the account, if one is running (imported lazily: it imports us)"""
+    from calendar_mirror import active_mirror
+    return active_mirror(account)
+
+def _record_write(event: Dict[str, Any], account: Optional[str] = None):
+    """Keep the local mirror and title index in step with writes made here"""
+    mirror = _active_mirror(account)
+    if mirror is not None:
+        mirror.record_write(event)
+    index = get_index(account)
+    if index.loaded:
+        index.upsert(event)
+
+def _format_event_body(event_body: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an extracted event into a Google Calendar insert body"""
+    # Ensure the event body has the correct structure
+    if "start" not in event_body or "end" not in event_body:
+        raise ValueError("Event must have both start and end times")
     
-    # Load token if exists
-    if TOKEN_PATH.exists():
-        try:
-            creds = Credentials.from_authorized_user_file(str(TOKEN_PATH), SCOPES)
-        except Exception as e:
-            print(f"Error loading credentials: {e}")
-            creds = None
+    # Convert string dates to proper Google Calendar format
+    formatted_event = {
+        "summary": event_body.get("title", "Untitled Event"),
+        "description": event_body.get("description", ""),
+    }
     
-    # Refresh or get new credentials
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(Request())
-            except Exception as e:
-                print(f"Error refreshing token: {e}")
-                creds = None
-        
-        if not creds:
-            try:
-                if not os.path.exists(CLIENT_PATH):
-                    raise FileNotFoundError(f"Credentials file not found: {CLIENT_PATH}")
-                
-                flow = InstalledAppFlow.from_client_secrets_file(str(CLIENT_PATH), SCOPES)
-                creds = flow.run_local_server(port=8080, prompt="consent")
-                
-                # Save the credentials for next run
-                TOKEN_PATH.write_text(creds.to_json(), encoding="utf-8")
-            except Exception as e:
-                print(f"Error during OAuth flow: {e}")
-                raise
+    # Handle start time
+    if isinstance(event_body["start"], str):
+        formatted_event["start"] = {
+            "dateTime": _ensure_rfc3339_with_tz(event_body["start"]),
+            "timeZone": DEFAULT_TZ
+        }
+    else:
+        formatted_event["start"] = event_body["start"]
     
-    return build("calendar", "v3", credentials=creds)
-
-def create_event(event_body: Dict[str, Any]) -> Dict[str, Any]:
-    """Create a new calendar event with proper validation"""
-    try:
-        service = get_service()
-        
-        # Ensure the event body has the correct structure
-        if "start" not in event_body or "end" not in event_body:
-            raise ValueError("Event must have both start and end times")
-        
-        # Convert string dates to proper Google Calendar format
-        formatted_event = {
-            "summary": event_body.get("title", "Untitled Event"),
-            "description": event_body.get("description", ""),
+    # Handle end time - ensure it exists and is valid
+    if isinstance(event_body["end"], str):
+        formatted_event["end"] = {
+            "dateTime": _ensure_rfc3339_with_tz(event_body["end"]),
+            "timeZone": DEFAULT_TZ
         }
-        
-        # Handle start time
-        if isinstance(event_body["start"], str):
-            formatted_event["start"] = {
-                "dateTime": _ensure_rfc3339_with_tz(event_body["start"]),
-                "timeZone": DEFAULT_TZ
-            }
-        else:
-            formatted_event["start"] = event_body["start"]
-        
-        # Handle end time - ensure it exists and is valid
-        if isinstance(event_body["end"], str):
+    elif "end" in event_body:
+        formatted_event["end"] = event_body["end"]
+    else:
+        # Calculate end time if only duration is provided
+        if "duration_minutes" in event_body and "start" in formatted_event:
+            start_time = datetime.datetime.fromisoformat(
+                formatted_event["start"]["dateTime"].replace('Z', '+00:00')
+            )
+            end_time = start_time + datetime.timedelta(minutes=event_body["duration_minutes"])
             formatted_event["end"] = {
-                "dateTime": _ensure_rfc3339_with_tz(event_body["end"]),
+                "dateTime": end_time.isoformat(),
                 "timeZone": DEFAULT_TZ
             }
-        elif "end" in event_body:
-            formatted_event["end"] = event_body["end"]
         else:
-            # Calculate end time if only duration is provided
-            if "duration_minutes" in event_body and "start" in formatted_event:
-                start_time = datetime.datetime.fromisoformat(
-                    formatted_event["start"]["dateTime"].replace('Z', '+00:00')
-                )
-                end_time = start_time + datetime.timedelta(minutes=event_body["duration_minutes"])
-                formatted_event["end"] = {
-                    "dateTime": end_time.isoformat(),
-                    "timeZone": DEFAULT_TZ
-                }
-            else:
-                raise ValueError("Event must have end time or duration")
-        
-        # Add attendees if present
-        if "attendees" in event_body and event_body["attendees"]:
-            formatted_event["attendees"] = [
-                {"email": email} for email in event_body["attendees"] if isinstance(email, str)
-            ]
+            raise ValueError("Event must have end time or duration")
+    
+    # Add attendees if present
+    if "attendees" in event_body and event_body["attendees"]:
+        formatted_event["attendees"] = [
+            {"email": email} for email in event_body["attendees"] if isinstance(email, str)
+        ]
+    
+    return formatted_event
+
+def create_event(event_body: Dict[str, Any], account: Optional[str] = None) -> Dict[str, Any]:
+    """Create a new calendar event with proper validation"""
+    try:
+        service = get_service(account)
+        formatted_event = _format_event_body(event_body)
         
         print(f"Creating event with body: {json.dumps(formatted_event, indent=2)}")
         
-        event = service.events().insert(
-            calendarId=CALENDAR_ID, 
-            body=formatted_event, 
-            sendUpdates="all"
-        ).execute()
+        with metrics.span("calendar.create"):
+            event = service.events().insert(
+                calendarId=CALENDAR_ID, 
+                body=formatted_event, 
+                sendUpdates="all"
+            ).execute()
         
         print(f"Event created: {event.get('htmlLink')}")
+        _record_write(event, account)
         return event
         
     except Exception as e:
         print(f"Error creating event: {e}")
         raise
 
-def query_conflicts(start_iso: str, end_iso: str) -> List[Dict[str, Any]]:
+def conflicts_params(start_iso: str, end_iso: str) -> Dict[str, Any]:
+    """events.list parameters for the events overlapping a time range (shared with calendar_async)"""
+    return {
+        "timeMin": _ensure_rfc3339_with_tz(start_iso),
+        "timeMax": _ensure_rfc3339_with_tz(end_iso),
+        "singleEvents": True,
+        "orderBy": "startTime",
+    }
+
+def move_patch(new_start: str, new_end: str) -> Dict[str, Any]:
+    """events.patch body that moves an event to a new time"""
+    return {
+        "start": {"dateTime": _ensure_rfc3339_with_tz(new_start), "timeZone": DEFAULT_TZ},
+        "end": {"dateTime": _ensure_rfc3339_with_tz(new_end), "timeZone": DEFAULT_TZ}
+    }
+
+def query_conflicts(start_iso: str, end_iso: str, account: Optional[str] = None) -> List[Dict[str, Any]]:
     """Query for conflicting events in the given time range"""
     try:
-        service = get_service()
-        start_iso = _ensure_rfc3339_with_tz(start_iso)
-        end_iso = _ensure_rfc3339_with_tz(end_iso)
-        
-        resp = service.events().list(
-            calendarId=CALENDAR_ID,
-            timeMin=start_iso,
-            timeMax=end_iso,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
+        # Answered locally when the mirror is fresh; Google is only hit on sync
+        mirror = _active_mirror(account)
+        if mirror is not None:
+            with metrics.span("calendar.conflicts_mirror"):
+                return mirror.conflicts(start_iso, end_iso)
+        
+        service = get_service(account)
+        with metrics.span("calendar.conflicts"):
+            resp = service.events().list(calendarId=CALENDAR_ID, **conflicts_params(start_iso, end_iso)).execute()
         
         return resp.get("items", [])
         
@@ -179,58 +197,427 @@ def query_conflicts(start_iso: str, end_iso: str) -> List[Dict[str, Any]]:
         print(f"Error querying conflicts: {e}")
         return []
 
-def _find_event_by_title(service, title: str) -> Optional[Dict[str, Any]]:
-    """Find event by title (case-insensitive partial match)"""
-    try:
-        resp = service.events().list(calendarId=CALENDAR_ID, q=title).execute()
+def _parse_dt(value: str) -> datetime.datetime:
+    """Aware datetime for an ISO string; naive times are DEFAULT_TZ, bare dates are midnight"""
+    if "T" not in value:
+        return datetime.datetime.fromisoformat(value).replace(tzinfo=zoneinfo.ZoneInfo(DEFAULT_TZ))
+    return datetime.datetime.fromisoformat(_ensure_rfc3339_with_tz(value).replace("Z", "+00:00"))
+
+def _parse_working_hours(working_hours) -> Tuple[int, int]:
+    """"09:00-17:00" or ("09:00", "17:00") to minutes after midnight"""
+    if isinstance(working_hours, str):
+        working_hours = working_hours.split("-")
+    start, end = (int(h) * 60 + int(m) for h, m in (part.strip().split(":") for part in working_hours))
+    if end <= start:
+        raise ValueError(f"Working hours must end after they start: {working_hours}")
+    return start, end
+
+def merge_busy(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sweep line over start/end points: union of busy intervals, sorted; touching ones merge"""
+    # At the same instant starts (-1) sort before ends (+1), so back-to-back meetings join
+    points = sorted([(s, -1) for s, e in intervals if e > s] + [(e, 1) for s, e in intervals if e > s])
+    merged, depth, opened = [], 0, None
+    for at, kind in points:
+        if kind < 0:
+            if depth == 0:
+                opened = at
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                merged.append((opened, at))
+    return merged
+
+def _working_windows(window: Interval, working_hours, working_days: Iterable[int] = WORKING_DAYS) -> List[Interval]:
+    """Working-hour blocks (in DEFAULT_TZ) clipped to the search window"""
+    tz = zoneinfo.ZoneInfo(DEFAULT_TZ)
+    open_min, close_min = _parse_working_hours(working_hours)
+    start, end = window
+    blocks = []
+    day = start.astimezone(tz).date()
+    while day <= end.astimezone(tz).date():
+        if day.weekday() in working_days:
+            midnight = datetime.datetime.combine(day, datetime.time(), tzinfo=tz)
+            block = (max(start, midnight + datetime.timedelta(minutes=open_min)),
+                     min(end, midnight + datetime.timedelta(minutes=close_min)))
+            if block[1] > block[0]:
+                blocks.append(block)
+        day += datetime.timedelta(days=1)
+    return blocks
+
+def _free_intervals(blocks: List[Interval], busy: List[Interval]) -> List[Interval]:
+    """Subtract merged busy intervals from the working blocks (both sorted)"""
+    free = []
+    for block_start, block_end in blocks:
+        cursor = block_start
+        for busy_start, busy_end in busy:
+            if busy_end <= cursor:
+                continue
+            if busy_start >= block_end:
+                break
+            if busy_start > cursor:
+                free.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < block_end:
+            free.append((cursor, block_end))
+    return free
+
+def rank_slots(free: List[Interval], duration_minutes: int, preferred: Optional[datetime.datetime] = None,
+               limit: int = FREE_SLOT_LIMIT, step_minutes: int = SLOT_STEP_MINUTES) -> List[Dict[str, Any]]:
+    """
+    Candidate starts on step boundaries inside each free interval, closest to `preferred`
+    first (earliest first without one). Picked slots never overlap each other.
+    """
+    duration = datetime.timedelta(minutes=duration_minutes)
+    step = datetime.timedelta(minutes=step_minutes)
+    candidates = []
+    for free_start, free_end in free:
+        # Round up to the next step boundary past the hour
+        offset = (free_start.minute * 60 + free_start.second) % (step_minutes * 60)
+        at = free_start + datetime.timedelta(seconds=(step_minutes * 60 - offset) % (step_minutes * 60))
+        at = at.replace(microsecond=0)
+        while at + duration <= free_end:
+            candidates.append(at)
+            at += step
+    if preferred is not None:
+        candidates.sort(key=lambda at: (abs((at - preferred).total_seconds()), at))
+
+    picked: List[datetime.datetime] = []
+    for at in candidates:
+        if len(picked) >= limit:
+            break
+        if not any(abs(at - other) < duration for other in picked):
+            picked.append(at)
+    return [{"rank": rank, "start": at.isoformat(), "end": (at + duration).isoformat()}
+            for rank, at in enumerate(picked, 1)]
+
+def freebusy_body(window: Tuple[str, str], calendars: Optional[List[str]] = None) -> Dict[str, Any]:
+    """freeBusy query covering every involved calendar (ids or attendee emails) in one call"""
+    return {
+        "timeMin": _ensure_rfc3339_with_tz(window[0]),
+        "timeMax": _ensure_rfc3339_with_tz(window[1]),
+        "timeZone": DEFAULT_TZ,
+        "items": [{"id": calendar} for calendar in (calendars or [CALENDAR_ID])],
+    }
+
+class FreeBusyUnavailable(Exception):
+    """
+    freeBusy returned errors for some calendars (e.g. notFound for an attendee whose calendar isn't
+    shared), so their busy times are unknown. `slots` treats them as free; offer those knowingly.
+    """
+
+    def __init__(self, calendars: Dict[str, Any], slots: List[Dict[str, Any]]):
+        super().__init__(f"free/busy unavailable for {', '.join(calendars)}")
+        self.calendars = calendars
+        self.slots = slots
+
+def slots_from_freebusy(response: Dict[str, Any], duration_minutes: int, window: Tuple[str, str],
+                        working_hours=None, preferred: Optional[str] = None,
+                        limit: int = FREE_SLOT_LIMIT) -> List[Dict[str, Any]]:
+    """Ranked free slots from a freeBusy response; raises FreeBusyUnavailable if any calendar failed"""
+    # Work in DEFAULT_TZ throughout so slots come back with one offset and align to its hours
+    tz = zoneinfo.ZoneInfo(DEFAULT_TZ)
+    busy = []
+    failed = {}
+    for calendar, info in (response.get("calendars") or {}).items():
+        if info.get("errors"):
+            logger.warning(f"free/busy unavailable for {calendar}: {info['errors']}")
+            failed[calendar] = info["errors"]
+        busy.extend((_parse_dt(b["start"]).astimezone(tz), _parse_dt(b["end"]).astimezone(tz))
+                    for b in info.get("busy", []))
+
+    span = (_parse_dt(window[0]).astimezone(tz), _parse_dt(window[1]).astimezone(tz))
+    blocks = _working_windows(span, working_hours or WORKING_HOURS)
+    free = _free_intervals(blocks, merge_busy(busy))
+    slots = rank_slots(free, duration_minutes, _parse_dt(preferred) if preferred else None, limit)
+    if failed:
+        raise FreeBusyUnavailable(failed, slots)
+    return slots
+
+def find_free_slots(duration_minutes: int, window: Tuple[str, str], working_hours=None,
+                    calendars: Optional[List[str]] = None, preferred: Optional[str] = None,
+                    limit: int = FREE_SLOT_LIMIT, account: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Free slots of `duration_minutes` within `window` (start, end ISO strings) during working
+    hours, when every calendar in `calendars` (default: primary) is free.
+    One freeBusy call covers all calendars; slots nearest `preferred` rank first.
+    Raises FreeBusyUnavailable, carrying the slots, if a calendar's busy times couldn't be read.
+    """
+    if duration_minutes <= 0:
+        raise ValueError("duration_minutes must be positive")
+    service = get_service(account)
+    with metrics.span("calendar.freebusy", calendars=len(calendars or [CALENDAR_ID])):
+        response = service.freebusy().query(body=freebusy_body(window, calendars)).execute()
+    return slots_from_freebusy(response, duration_minutes, window, working_hours, preferred, limit)
+
+def _search_event_by_title(service, title: str) -> Optional[Dict[str, Any]]:
+    """API search by title (exact case-insensitive match), following every result page"""
+    page_token = None
+    while True:
+        with metrics.span("calendar.search"):
+            resp = service.events().list(calendarId=CALENDAR_ID, q=title, pageToken=page_token).execute()
         for ev in resp.get("items", []):
             if ev.get("summary", "").lower() == title.lower():
                 return ev
-        return None
+        page_token = resp.get("nextPageToken")
+        if not page_token:
+            return None
+
+def _find_event_by_title(service, title: str, account: Optional[str] = None,
+                         near: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Find event by title using the local title index, ranked by closeness to `near`"""
+    try:
+        index = get_index(account)
+        with metrics.span("calendar.index_load"):
+            index.ensure_loaded(service, CALENDAR_ID)
+        near_dt = None
+        if near:
+            near_dt = datetime.datetime.fromisoformat(_ensure_rfc3339_with_tz(near).replace("Z", "+00:00"))
+        ev = index.find(title, near_dt)
+        if ev is not None:
+            return ev
+        
+        # Possibly created outside this app since the index was loaded
+        ev = _search_event_by_title(service, title)
+        if ev is not None:
+            index.upsert(ev)
+        return ev
     except Exception as e:
         print(f"Error finding event by title: {e}")
         return None
 
-def move_event(criteria: Dict[str, Any], new_start: str, new_end: str) -> Dict[str, Any]:
+def _require_event(service, criteria: Dict[str, Any], account: Optional[str], near: Optional[str]) -> Dict[str, Any]:
+    ev = _find_event_by_title(service, criteria["title"], account, near)
+    if not ev:
+        raise ValueError(f"Event '{criteria['title']}' not found")
+    return ev
+
+def _refind_event(service, criteria: Dict[str, Any], account: Optional[str], gone: Dict[str, Any]) -> Dict[str, Any]:
+    """The index handed out an event deleted elsewhere: drop it and search the API once more"""
+    index = get_index(account)
+    index.remove(gone["id"])
+    ev = _search_event_by_title(service, criteria["title"])
+    if not ev:
+        raise ValueError(f"Event '{criteria['title']}' not found")
+    index.upsert(ev)
+    return ev
+
+def _act_on_event(service, criteria: Dict[str, Any], account: Optional[str], near: Optional[str], action):
+    """
+    Run action(event) on the event matching criteria["title"]. If the index handed out an
+    event that was deleted elsewhere (404/410), drop it and try once more with a fresh API search.
+    """
+    ev = _require_event(service, criteria, account, near)
+    try:
+        return action(ev)
+    except HttpError as e:
+        if getattr(e.resp, "status", None) not in (404, 410):
+            raise
+    return action(_refind_event(service, criteria, account, ev))
+
+def move_event(criteria: Dict[str, Any], new_start: str, new_end: str, account: Optional[str] = None) -> Dict[str, Any]:
     """Move an existing event to new time"""
     try:
-        service = get_service()
-        ev = _find_event_by_title(service, criteria["title"])
-        if not ev:
-            raise ValueError(f"Event '{criteria['title']}' not found")
+        service = get_service(account)
+        patch = move_patch(new_start, new_end)
         
-        patch = {
-            "start": {"dateTime": _ensure_rfc3339_with_tz(new_start), "timeZone": DEFAULT_TZ},
-            "end": {"dateTime": _ensure_rfc3339_with_tz(new_end), "timeZone": DEFAULT_TZ}
-        }
+        def move(ev):
+            with metrics.span("calendar.move"):
+                return service.events().patch(
+                    calendarId=CALENDAR_ID,
+                    eventId=ev["id"],
+                    body=patch,
+                    sendUpdates="all"
+                ).execute()
         
-        return service.events().patch(
-            calendarId=CALENDAR_ID,
-            eventId=ev["id"],
-            body=patch,
-            sendUpdates="all"
-        ).execute()
+        updated = _act_on_event(service, criteria, account, criteria.get("start") or new_start, move)
+        _record_write(updated, account)
+        return updated
         
     except Exception as e:
         print(f"Error moving event: {e}")
         raise
 
-def cancel_event(criteria: Dict[str, Any]) -> Dict[str, Any]:
+def cancel_event(criteria: Dict[str, Any], account: Optional[str] = None) -> Dict[str, Any]:
     """Cancel an existing event"""
     try:
-        service = get_service()
-        ev = _find_event_by_title(service, criteria["title"])
-        if not ev:
-            raise ValueError(f"Event '{criteria['title']}' not found")
+        service = get_service(account)
         
-        service.events().delete(
-            calendarId=CALENDAR_ID,
-            eventId=ev["id"],
-            sendUpdates="all"
-        ).execute()
+        def cancel(ev):
+            with metrics.span("calendar.cancel"):
+                service.events().delete(
+                    calendarId=CALENDAR_ID,
+                    eventId=ev["id"],
+                    sendUpdates="all"
+                ).execute()
+            return {"id": ev["id"], "status": "cancelled"}
         
-        return {"id": ev["id"], "status": "cancelled"}
+        result = _act_on_event(service, criteria, account, criteria.get("start"), cancel)
+        _record_write(result, account)
+        return result
         
     except Exception as e:
         print(f"Error canceling event: {e}")
-        raise
\ No newline at end of file
+        raise
+
+# Failures to reach the API at all (timeouts, resets, TLS); the request may or may not have been applied
+_TRANSPORT_ERRORS = (OSError, asyncio.TimeoutError, httplib2.HttpLib2Error, httpx.TransportError, AuthTransportError)
+
+def _is_retryable(error: Exception) -> bool:
+    """
+    Rate limits, server errors and transport failures are worth retrying; bad requests and bugs are not.
+    Understands HttpError and any error with an HTTP `status` (calendar_async's CalendarAPIError).
+    """
+    if isinstance(error, HttpError):
+        status = getattr(error.resp, "status", None)
+        if status is None:
+            # Malformed batch response rather than a rejected request
+            return True
+        if status in (429, 500, 502, 503, 504):
+            return True
+        return status == 403 and b"ateLimitExceeded" in (error.content or b"")
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        if status in (429, 500, 502, 503, 504):
+            return True
+        # Only the error message survives here, e.g. "Rate Limit Exceeded"
+        return status == 403 and "rate limit" in str(error).lower()
+    return isinstance(error, _TRANSPORT_ERRORS)
+
+def _retry_backoff(attempt: int) -> float:
+    return min(BATCH_RETRY_BACKOFF * 2 ** (attempt - 1), 10)
+
+def _retry_fits_budget(attempt: int) -> bool:
+    """Under a request budget, only retry if the backoff before the next attempt still fits in it"""
+    left = deadlines.remaining()
+    if left is None or left > _retry_backoff(attempt):
+        return True
+    deadlines.record_overrun("calendar")
+    return False
+
+def _prepare_operation(service, operation: Dict[str, Any], account: Optional[str]) -> Dict[str, Any]:
+    """Validate one bulk operation and return a factory for its API request"""
+    op = operation.get("op", "create")
+    if op not in ("create", "move", "cancel"):
+        raise ValueError(f"Unknown operation '{op}'")
+    if op == "create":
+        body = _format_event_body(operation.get("event") or {})
+        # Fixed across retries: an insert that went through before a failed batch call then gets a 409
+        event_id = "vc" + uuid.uuid4().hex
+        return {
+            "body": body,
+            "request": lambda: service.events().insert(calendarId=CALENDAR_ID, body={**body, "id": event_id},
+                                                       sendUpdates="all"),
+            "result": lambda response: response,
+            "event_id": event_id,
+        }
+    
+    criteria = operation.get("criteria") or {}
+    if not criteria.get("title"):
+        raise ValueError(f"{op} needs criteria.title")
+    
+    if op == "move":
+        new_start, new_end = operation.get("new_start"), operation.get("new_end")
+        if not new_start or not new_end:
+            raise ValueError("move needs new_start and new_end")
+        ev = _find_event_by_title(service, criteria["title"], account, criteria.get("start") or new_start)
+        if not ev:
+            raise ValueError(f"Event '{criteria['title']}' not found")
+        patch = move_patch(new_start, new_end)
+        return {
+            "body": {"eventId": ev["id"], **patch},
+            "request": lambda: service.events().patch(calendarId=CALENDAR_ID, eventId=ev["id"], body=patch, sendUpdates="all"),
+            "result": lambda response: response,
+        }
+    
+    else:
+        ev = _find_event_by_title(service, criteria["title"], account, criteria.get("start"))
+        if not ev:
+            raise ValueError(f"Event '{criteria['title']}' not found")
+        return {
+            "body": {"eventId": ev["id"]},
+            "request": lambda: service.events().delete(calendarId=CALENDAR_ID, eventId=ev["id"], sendUpdates="all"),
+            "result": lambda response: {"id": ev["id"], "status": "cancelled"},
+        }
+
+def _already_inserted(exception: Optional[Exception], item: Dict[str, Any]) -> bool:
+    return (isinstance(exception, HttpError) and getattr(exception.resp, "status", None) == 409
+            and "event_id" in item)
+
+def _inserted_event(service, event_id: str, conflict: Exception) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
+    """(event, None) for the event an earlier attempt inserted under event_id; the 409 stands if it was deleted since"""
+    try:
+        event = service.events().get(calendarId=CALENDAR_ID, eventId=event_id).execute()
+    except Exception as e:
+        return None, e
+    if event.get("status") == "cancelled":
+        return None, conflict
+    logger.info(f"Event {event_id} already exists; not inserting it again")
+    return event, None
+
+def bulk_apply(operations: List[Dict[str, Any]], dry_run: bool = False,
+               account: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Apply many create/move/cancel operations using Calendar API batch requests.
+    Returns one result per operation, in order. Only failed items are retried; creates keep
+    the same event id across attempts, so one that already went through isn't inserted twice.
+    With dry_run, every payload is validated and nothing is written.
+    """
+    service = get_service(account)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+    pending: Dict[int, Dict[str, Any]] = {}
+    
+    for index, operation in enumerate(operations):
+        op = operation.get("op", "create")
+        try:
+            prepared = _prepare_operation(service, operation, account)
+        except Exception as e:
+            results[index] = {"index": index, "op": op, "success": False, "error": str(e), "attempts": 0}
+            continue
+        if dry_run:
+            results[index] = {"index": index, "op": op, "success": True, "dry_run": True, "body": prepared["body"]}
+        else:
+            pending[index] = {**prepared, "op": op}
+    
+    attempt = 0
+    while pending:
+        attempt += 1
+        retry: Dict[int, Dict[str, Any]] = {}
+        indexes = list(pending)
+        
+        for chunk_start in range(0, len(indexes), BATCH_SIZE):
+            chunk = indexes[chunk_start:chunk_start + BATCH_SIZE]
+            
+            def on_response(request_id, response, exception):
+                index = int(request_id)
+                item = pending[index]
+                if _already_inserted(exception, item):
+                    response, exception = _inserted_event(service, item["event_id"], exception)
+                if exception is None:
+                    event = item["result"](response)
+                    _record_write(event, account)
+                    results[index] = {"index": index, "op": item["op"], "success": True, "event": event, "attempts": attempt}
+                elif _is_retryable(exception) and attempt <= BATCH_MAX_RETRIES and _retry_fits_budget(attempt):
+                    retry[index] = item
+                else:
+                    results[index] = {"index": index, "op": item["op"], "success": False,
+                                      "error": str(exception), "attempts": attempt}
+            
+            batch = service.new_batch_http_request(callback=on_response)
+            for index in chunk:
+                batch.add(pending[index]["request"](), request_id=str(index))
+            try:
+                with metrics.span("calendar.batch", size=len(chunk)):
+                    batch.execute()
+            except Exception as e:
+                # The whole batch call failed; every item in it without a result gets the error
+                logger.warning(f"Batch request failed: {e}")
+                for index in chunk:
+                    if results[index] is None and index not in retry:
+                        on_response(str(index), None, e)
+        
+        pending = retry
+        if pending:
+            time.sleep(_retry_backoff(attempt))
+    
+    return results
@@ -0,0 +1,241 @@
+# calendar_mirror.py
+import os
+import time
+import bisect
+import logging
+import datetime
+import threading
+import zoneinfo
+from typing import Any, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from calendar_booker import CALENDAR_ID, DEFAULT_TZ, _ensure_rfc3339_with_tz, get_service
+from event_index import get_index
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MIRROR_ENABLED = os.getenv("CALENDAR_MIRROR", "1") == "1"
+MIRROR_SYNC_INTERVAL = float(os.getenv("CALENDAR_MIRROR_INTERVAL", "30"))
+# Past this lag conflict checks go back to the API rather than trust the mirror
+MIRROR_MAX_LAG = float(os.getenv("CALENDAR_MIRROR_MAX_LAG", "300"))
+
+def _to_epoch(value: Dict[str, Any]) -> Optional[float]:
+    """Epoch seconds for a Calendar start/end; all-day dates are midnight in DEFAULT_TZ"""
+    if not value:
+        return None
+    if value.get("dateTime"):
+        dt = datetime.datetime.fromisoformat(_ensure_rfc3339_with_tz(value["dateTime"]).replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=zoneinfo.ZoneInfo(value.get("timeZone") or DEFAULT_TZ))
+        return dt.timestamp()
+    if value.get("date"):
+        day = datetime.date.fromisoformat(value["date"])
+        tz = zoneinfo.ZoneInfo(value.get("timeZone") or DEFAULT_TZ)
+        return datetime.datetime(day.year, day.month, day.day, tzinfo=tz).timestamp()
+    return None
+
+def _query_epoch(dt_str: str) -> float:
+    """Epoch seconds for a query bound, interpreted like query_conflicts does"""
+    dt_str = _ensure_rfc3339_with_tz(dt_str)
+    if "T" not in dt_str:
+        return _to_epoch({"date": dt_str})
+    dt = datetime.datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=zoneinfo.ZoneInfo(DEFAULT_TZ))
+    return dt.timestamp()
+
+class IntervalIndex:
+    """Sorted-array interval index: O(log n + k) overlap queries"""
+
+    def __init__(self):
+        self._starts: List[float] = []
+        self._entries: List[Tuple[float, float, str]] = []
+        self._by_id: Dict[str, Tuple[float, float, str]] = {}
+        # Longest interval held bounds how far back an overlapping start can be
+        self._max_length = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, event_id: str, start: float, end: float):
+        self.remove(event_id)
+        entry = (start, end, event_id)
+        i = bisect.bisect_left(self._entries, entry)
+        self._entries.insert(i, entry)
+        self._starts.insert(i, start)
+        self._by_id[event_id] = entry
+        self._max_length = max(self._max_length, end - start)
+
+    def remove(self, event_id: str):
+        entry = self._by_id.pop(event_id, None)
+        if entry is None:
+            return
+        i = bisect.bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+            del self._starts[i]
+        if entry[1] - entry[0] >= self._max_length:
+            # The longest one went (or moved); a stale bound would widen every query's scan for good
+            self._max_length = max((e - s for s, e, _ in self._entries), default=0.0)
+
+    def overlapping(self, start: float, end: float) -> List[str]:
+        """Ids of intervals with start < end_q and end > start_q, ordered by start"""
+        lo = bisect.bisect_left(self._starts, start - self._max_length)
+        hi = bisect.bisect_left(self._starts, end)
+        return [eid for s, e, eid in self._entries[lo:hi] if e > start]
+
+    def clear(self):
+        self._starts.clear()
+        self._entries.clear()
+        self._by_id.clear()
+        self._max_length = 0.0
+
+class CalendarMirror:
+    """Local copy of one calendar, kept fresh with incremental syncToken syncs"""
+
+    def __init__(self, account: Optional[str] = None, calendar_id: str = CALENDAR_ID):
+        self.account = account
+        self.calendar_id = calendar_id
+        self._lock = threading.Lock()
+        self._events: Dict[str, Dict[str, Any]] = {}
+        self._index = IntervalIndex()
+        self._sync_token: Optional[str] = None
+        self._last_sync: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.syncs = 0
+        self.full_syncs = 0
+        self.sync_errors = 0
+        self.last_sync_ms = 0.0
+
+    def _apply(self, event: Dict[str, Any]):
+        # Caller holds the lock
+        event_id = event.get("id")
+        if not event_id:
+            return
+        if event.get("status") == "cancelled":
+            self._events.pop(event_id, None)
+            self._index.remove(event_id)
+            return
+        try:
+            start = _to_epoch(event.get("start"))
+            end = _to_epoch(event.get("end"))
+        except ValueError as e:
+            logger.warning(f"Skipping event {event_id} with unparseable time: {e}")
+            return
+        if start is None or end is None:
+            return
+        self._events[event_id] = event
+        self._index.add(event_id, start, end)
+
+    def _list_pages(self, service, **params):
+        page_token = None
+        while True:
+            resp = service.events().list(
+                calendarId=self.calendar_id, singleEvents=True, maxResults=2500, pageToken=page_token, **params
+            ).execute()
+            yield resp
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                return
+
+    def sync(self):
+        """Incremental sync with the stored syncToken, or a full sync if there is none or it expired"""
+        started = time.perf_counter()
+        service = get_service(self.account)
+        full = self._sync_token is None
+        try:
+            pages = list(self._list_pages(service, **({} if full else {"syncToken": self._sync_token})))
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            # Sync token expired; start over
+            logger.info("Calendar sync token expired, running a full sync")
+            full = True
+            pages = list(self._list_pages(service))
+
+        with self._lock:
+            if full:
+                self._events.clear()
+                self._index.clear()
+                self.full_syncs += 1
+            for page in pages:
+                for event in page.get("items", []):
+                    self._apply(event)
+            self._sync_token = pages[-1].get("nextSyncToken") if pages else None
+            self._last_sync = time.time()
+            self.syncs += 1
+            self.last_sync_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        # Edits and deletions made elsewhere reach the title index without waiting for its re-list
+        index = get_index(self.account)
+        if not full and index.loaded:
+            index.apply_changes([event for page in pages for event in page.get("items", [])])
+
+    def record_write(self, event: Dict[str, Any]):
+        """Reflect a write made through calendar_booker before the next sync sees it"""
+        with self._lock:
+            self._apply(event)
+
+    def is_fresh(self) -> bool:
+        return self._last_sync is not None and time.time() - self._last_sync <= MIRROR_MAX_LAG
+
+    def conflicts(self, start_iso: str, end_iso: str) -> List[Dict[str, Any]]:
+        start, end = _query_epoch(start_iso), _query_epoch(end_iso)
+        with self._lock:
+            return [self._events[eid] for eid in self._index.overlapping(start, end)]
+
+    def _sync_loop(self):
+        while True:
+            try:
+                with metrics.span("calendar.mirror_sync"):
+                    self.sync()
+            except Exception as e:
+                self.sync_errors += 1
+                logger.error(f"Calendar mirror sync failed: {e}")
+            if self._stop.wait(MIRROR_SYNC_INTERVAL):
+                return
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sync_loop, name="calendar-mirror", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "events": len(self._events),
+                "index_size": len(self._index),
+                "sync_lag_seconds": round(time.time() - self._last_sync, 1) if self._last_sync else None,
+                "fresh": self.is_fresh(),
+                "syncs": self.syncs,
+                "full_syncs": self.full_syncs,
+                "sync_errors": self.sync_errors,
+                "last_sync_ms": self.last_sync_ms,
+            }
+
+_mirrors: Dict[Optional[str], CalendarMirror] = {}
+_mirrors_lock = threading.Lock()
+
+def get_mirror(account: Optional[str] = None) -> CalendarMirror:
+    with _mirrors_lock:
+        if account not in _mirrors:
+            _mirrors[account] = CalendarMirror(account)
+        return _mirrors[account]
+
+def active_mirror(account: Optional[str] = None) -> Optional[CalendarMirror]:
+    """The account's mirror if it is enabled and recently synced, else None"""
+    if not MIRROR_ENABLED:
+        return None
+    mirror = _mirrors.get(account)
+    return mirror if mirror is not None and mirror.is_fresh() else None
+
+def mirror_stats() -> Dict[str, Any]:
+    return {str(account or "default"): m.stats() for account, m in list(_mirrors.items())}
@@ -0,0 +1,297 @@
+# calendar_outbox.py
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from calendar_async import calendar_client
+from calendar_booker import _format_event_body, _is_retryable
+import metrics
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_ENABLED = os.getenv("CALENDAR_OUTBOX", "1") == "1"
+OUTBOX_PATH = os.getenv("CALENDAR_OUTBOX_PATH", str(Path.home() / ".voice-calendar-ai" / "outbox.db"))
+OUTBOX_WORKERS = int(os.getenv("CALENDAR_OUTBOX_WORKERS", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("CALENDAR_OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF = float(os.getenv("CALENDAR_OUTBOX_BACKOFF", "1.0"))
+# Finished operations are kept this long so status lookups and key reuse keep working
+OUTBOX_RETENTION_HOURS = float(os.getenv("CALENDAR_OUTBOX_RETENTION_HOURS", "48"))
+# Longest a worker sleeps before looking again for retries that came due
+OUTBOX_POLL_INTERVAL = 5.0
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+TERMINAL = (DONE, FAILED)
+
+class IdempotencyConflict(ValueError):
+    """The idempotency key was already used for a different event"""
+
+def _canonical(event_body: Dict[str, Any]) -> str:
+    return json.dumps(event_body, sort_keys=True, separators=(",", ":"), default=str)
+
+def event_id_for(key: str, account: Optional[str] = None) -> str:
+    """
+    Calendar event id derived from the key (ids allow a-v and 0-9, so hex is valid).
+    Inserting under a fixed id makes a retried insert fail with 409 instead of duplicating.
+    """
+    return "vc" + hashlib.sha256(f"{account or ''}|{key}".encode()).hexdigest()[:40]
+
+class OutboxStore:
+    """SQLite table of pending and finished calendar writes; survives restarts"""
+
+    def __init__(self, path: str = OUTBOX_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        # WAL: commits don't wait on fsync, and survive a crash of this process
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS operations (
+                id TEXT PRIMARY KEY,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                account TEXT,
+                payload TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                result TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS operations_due ON operations (status, next_attempt)")
+        self._db.commit()
+
+    def _scoped_key(self, key: str, account: Optional[str]) -> str:
+        return f"{account or ''}|{key}"
+
+    def add(self, key: str, event_body: Dict[str, Any], account: Optional[str] = None) -> Tuple[sqlite3.Row, bool]:
+        """Record a write under its key; returns (row, created). Reusing a key returns the existing row."""
+        scoped = self._scoped_key(key, account)
+        payload = _canonical(event_body)
+        now = time.time()
+        with self._lock:
+            existing = self._db.execute("SELECT * FROM operations WHERE idempotency_key = ?", (scoped,)).fetchone()
+            if existing is not None:
+                if existing["payload"] != payload:
+                    raise IdempotencyConflict(f"Idempotency key '{key}' was already used for a different event")
+                return existing, False
+            op_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO operations (id, idempotency_key, account, payload, event_id, status, next_attempt,"
+                " created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (op_id, scoped, account, payload, event_id_for(key, account), PENDING, now, now, now),
+            )
+            self._db.commit()
+            return self._db.execute("SELECT * FROM operations WHERE id = ?", (op_id,)).fetchone(), True
+
+    def get(self, op_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute("SELECT * FROM operations WHERE id = ?", (op_id,)).fetchone()
+
+    def claim(self) -> Optional[sqlite3.Row]:
+        """Oldest due pending operation, marked running"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM operations WHERE status = ? AND next_attempt <= ? ORDER BY next_attempt LIMIT 1",
+                (PENDING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE operations SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                (RUNNING, now, row["id"]),
+            )
+            self._db.commit()
+            return self._db.execute("SELECT * FROM operations WHERE id = ?", (row["id"],)).fetchone()
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            row = self._db.execute("SELECT MIN(next_attempt) FROM operations WHERE status = ?", (PENDING,)).fetchone()
+        return row[0]
+
+    def finish(self, op_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None, retry_at: Optional[float] = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE operations SET status = ?, result = ?, error = ?, next_attempt = COALESCE(?, next_attempt),"
+                " updated = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, retry_at, time.time(), op_id),
+            )
+            self._db.commit()
+
+    def recover(self) -> int:
+        """Requeue operations a previous process left running; the derived event id dedups them"""
+        with self._lock:
+            count = self._db.execute("UPDATE operations SET status = ? WHERE status = ?", (PENDING, RUNNING)).rowcount
+            self._db.commit()
+        return count
+
+    def prune(self, older_than: float) -> int:
+        with self._lock:
+            count = self._db.execute(
+                "DELETE FROM operations WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, older_than)
+            ).rowcount
+            self._db.commit()
+        return count
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM operations GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def describe(row: sqlite3.Row) -> Dict[str, Any]:
+    """Public view of an operation for the status endpoints"""
+    return {
+        "operation_id": row["id"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "event": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "created": row["created"],
+        "updated": row["updated"],
+    }
+
+class CalendarOutbox:
+    """
+    Accepts event creations durably and drains them into Google with a pool of workers.
+    Each write is inserted under an event id derived from its idempotency key, so a retry
+    (or a restart mid-request) finds the existing event instead of creating a second one.
+    Store calls commit to SQLite, so from async code they run in a thread, off the event loop.
+    """
+
+    def __init__(self, store: Optional[OutboxStore] = None, workers: int = OUTBOX_WORKERS):
+        self._store = store
+        self.workers = max(1, workers)
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._changed: Dict[str, asyncio.Event] = {}
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+
+    @property
+    def store(self) -> OutboxStore:
+        if self._store is None:
+            self._store = OutboxStore()
+        return self._store
+
+    async def submit(self, event_body: Dict[str, Any], key: Optional[str] = None,
+                     account: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Validate and record a creation; returns (operation, created). Raises ValueError on a bad body.
+        Only a client's key dedups submissions: the same event sent twice without one is booked twice.
+        """
+        _format_event_body(event_body)
+        row, created = await asyncio.to_thread(self.store.add, key or uuid.uuid4().hex, event_body, account)
+        if created and self._wake is not None:
+            self._wake.set()
+        return describe(row), created
+
+    async def get(self, op_id: str) -> Optional[Dict[str, Any]]:
+        row = await asyncio.to_thread(self.store.get, op_id)
+        return describe(row) if row is not None else None
+
+    async def wait_for_change(self, op_id: str, timeout: float) -> bool:
+        """True once the operation's status changes, False on timeout"""
+        event = self._changed.setdefault(op_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _notify(self, op_id: str):
+        event = self._changed.pop(op_id, None)
+        if event is not None:
+            event.set()
+
+    async def _process(self, row: sqlite3.Row):
+        metrics.observe("calendar.outbox_wait", max(0.0, time.time() - row["next_attempt"]))
+        try:
+            with metrics.span("calendar.outbox", attempt=row["attempts"]):
+                # The derived event id makes this a no-op if an earlier attempt got through
+                event = await calendar_client.create_event(json.loads(row["payload"]), row["account"],
+                                                           event_id=row["event_id"])
+        except asyncio.CancelledError:
+            # Shutting down: leave it running; recover() requeues it on the next start
+            raise
+        except Exception as e:
+            if _is_retryable(e) and row["attempts"] < OUTBOX_MAX_ATTEMPTS:
+                self.retries += 1
+                delay = min(OUTBOX_BACKOFF * 2 ** (row["attempts"] - 1), 300)
+                await asyncio.to_thread(self.store.finish, row["id"], PENDING, error=str(e),
+                                        retry_at=time.time() + delay)
+                metrics.registry.inc("outbox_operations_total", outcome="retry")
+            else:
+                self.failed += 1
+                await asyncio.to_thread(self.store.finish, row["id"], FAILED, error=str(e))
+                metrics.registry.inc("outbox_operations_total", outcome="failed")
+                logger.error(f"Calendar outbox gave up on {row['id']} after {row['attempts']} attempt(s): {e}")
+        else:
+            self.completed += 1
+            await asyncio.to_thread(self.store.finish, row["id"], DONE, result=event)
+            metrics.registry.inc("outbox_operations_total", outcome="done")
+        self._notify(row["id"])
+
+    async def _worker(self):
+        while True:
+            # Cleared before looking, so a submit after this point always wakes us
+            self._wake.clear()
+            row = await asyncio.to_thread(self.store.claim)
+            if row is not None:
+                self._notify(row["id"])
+                await self._process(row)
+                continue
+            next_due = await asyncio.to_thread(self.store.next_due)
+            timeout = OUTBOX_POLL_INTERVAL if next_due is None else min(OUTBOX_POLL_INTERVAL, max(0.0, next_due - time.time()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        if self._tasks:
+            return
+        recovered = await asyncio.to_thread(self.store.recover)
+        pruned = await asyncio.to_thread(self.store.prune, time.time() - OUTBOX_RETENTION_HOURS * 3600)
+        if recovered or pruned:
+            logger.info(f"Calendar outbox: requeued {recovered} interrupted, pruned {pruned} finished operation(s)")
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Anything cancelled mid-insert goes back to pending now rather than on the next start
+        await asyncio.to_thread(self.store.recover)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": OUTBOX_ENABLED,
+            "workers": len(self._tasks),
+            "operations": await asyncio.to_thread(self.store.counts),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
+
+outbox = CalendarOutbox()
+metrics.registry.describe("outbox_operations_total", "Calendar outbox attempts by outcome (done, retry, failed)")
@@ -0,0 +1,223 @@
+# calendar_service.py
+import os
+import re
+import json
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import httplib2
+import google_auth_httplib2
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.http import HttpRequest
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ["https://www.googleapis.com/auth/calendar.events"]
+# Use environment variable or relative path for better portability
+CLIENT_PATH = os.getenv("GOOGLE_CREDENTIALS_PATH",
+                       r"C:\Users\gatsi\Box\MY BREATHTAKING PROJECT\Voice Calendar AI\credentials.json")
+TOKEN_PATH = Path.home() / ".voice-calendar-ai" / "token.json"
+TOKEN_PATH.parent.mkdir(parents=True, exist_ok=True)
+# Per-account tokens; the default account keeps using TOKEN_PATH
+TOKEN_DIR = TOKEN_PATH.parent / "tokens"
+DEFAULT_ACCOUNT = "default"
+
+# Optional discovery document on disk; otherwise the one bundled with google-api-python-client
+DISCOVERY_PATH = os.getenv("CALENDAR_DISCOVERY_PATH", "")
+MAX_ACCOUNTS = int(os.getenv("CALENDAR_MAX_ACCOUNTS", "32"))
+REFRESH_AHEAD_SECONDS = int(os.getenv("CALENDAR_REFRESH_AHEAD", "300"))
+REFRESH_CHECK_INTERVAL = float(os.getenv("CALENDAR_REFRESH_CHECK_INTERVAL", "30"))
+
+def token_path_for(account: str) -> Path:
+    if account == DEFAULT_ACCOUNT:
+        return TOKEN_PATH
+    safe = re.sub(r"[^A-Za-z0-9_.@-]", "_", account)
+    return TOKEN_DIR / f"{safe}.json"
+
+def _load_credentials(token_path: Path) -> Credentials:
+    """Load stored credentials, refreshing or running the OAuth flow if needed"""
+    creds = None
+
+    if token_path.exists():
+        try:
+            creds = Credentials.from_authorized_user_file(str(token_path), SCOPES)
+        except Exception as e:
+            logger.error(f"Error loading credentials from {token_path}: {e}")
+            creds = None
+
+    if creds and not creds.valid and creds.expired and creds.refresh_token:
+        try:
+            creds.refresh(Request())
+            _save_credentials(token_path, creds)
+        except Exception as e:
+            logger.error(f"Error refreshing token: {e}")
+            creds = None
+
+    if not creds or not creds.valid:
+        if not os.path.exists(CLIENT_PATH):
+            raise FileNotFoundError(f"Credentials file not found: {CLIENT_PATH}")
+        flow = InstalledAppFlow.from_client_secrets_file(str(CLIENT_PATH), SCOPES)
+        creds = flow.run_local_server(port=8080, prompt="consent")
+        _save_credentials(token_path, creds)
+
+    return creds
+
+def _save_credentials(token_path: Path, creds: Credentials):
+    token_path.parent.mkdir(parents=True, exist_ok=True)
+    token_path.write_text(creds.to_json(), encoding="utf-8")
+
+class _AccountEntry:
+    """Credentials and a built Calendar client for one account"""
+
+    def __init__(self, account: str, creds: Credentials):
+        self.account = account
+        self.token_path = token_path_for(account)
+        self.creds = creds
+        self.refresh_lock = threading.Lock()
+        self.refreshes = 0
+        # httplib2 is not thread-safe, so each worker thread gets its own keep-alive connection
+        self._local = threading.local()
+        self.service = self._build_service()
+
+    def _http(self) -> google_auth_httplib2.AuthorizedHttp:
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(self.creds, http=httplib2.Http())
+            self._local.http = http
+        return http
+
+    def _build_service(self):
+        def request_builder(_http, *args, **kwargs):
+            return HttpRequest(self._http(), *args, **kwargs)
+
+        if DISCOVERY_PATH and os.path.exists(DISCOVERY_PATH):
+            with open(DISCOVERY_PATH, encoding="utf-8") as f:
+                return build_from_document(json.load(f), http=self._http(), requestBuilder=request_builder)
+        return build("calendar", "v3", http=self._http(), requestBuilder=request_builder, static_discovery=True)
+
+    def seconds_to_expiry(self) -> Optional[float]:
+        if not self.creds.expiry:
+            return None
+        # google-auth stores expiry as naive UTC
+        return (self.creds.expiry - datetime.datetime.utcnow()).total_seconds()
+
+    def refresh(self, force: bool = False):
+        """Refresh under a per-account lock; concurrent callers wait for one refresh"""
+        with self.refresh_lock:
+            remaining = self.seconds_to_expiry()
+            if not force and self.creds.valid and (remaining is None or remaining > REFRESH_AHEAD_SECONDS):
+                # Someone else refreshed while we waited
+                return
+            self.creds.refresh(Request())
+            self.refreshes += 1
+            _save_credentials(self.token_path, self.creds)
+            logger.info(f"Refreshed Calendar token for {self.account}")
+
+class CalendarServicePool:
+    """Process-wide Calendar clients keyed by account, with LRU eviction and refresh-ahead"""
+
+    def __init__(self, max_accounts: int = MAX_ACCOUNTS):
+        self.max_accounts = max(1, max_accounts)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _AccountEntry]" = OrderedDict()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.builds = 0
+        self.evictions = 0
+
+    def _entry(self, account: Optional[str]) -> _AccountEntry:
+        account = account or DEFAULT_ACCOUNT
+        with self._lock:
+            entry = self._entries.get(account)
+            if entry is not None:
+                self._entries.move_to_end(account)
+            build_lock = self._build_locks.setdefault(account, threading.Lock())
+
+        if entry is None:
+            # One build per account even if many requests arrive at once
+            with build_lock:
+                with self._lock:
+                    entry = self._entries.get(account)
+                if entry is None:
+                    entry = _AccountEntry(account, _load_credentials(token_path_for(account)))
+                    with self._lock:
+                        self._entries[account] = entry
+                        self.builds += 1
+                        while len(self._entries) > self.max_accounts:
+                            evicted, _ = self._entries.popitem(last=False)
+                            self._build_locks.pop(evicted, None)
+                            self.evictions += 1
+
+        # Only if the background refresher fell behind does a request pay for a refresh
+        if not entry.creds.valid:
+            entry.refresh()
+        return entry
+
+    def get_service(self, account: Optional[str] = None):
+        return self._entry(account).service
+
+    def get_credentials(self, account: Optional[str] = None) -> Credentials:
+        return self._entry(account).creds
+
+    def cached_credentials(self, account: Optional[str] = None) -> Optional[Credentials]:
+        """Credentials of an already-built account without loading or refreshing; safe on the event loop"""
+        with self._lock:
+            entry = self._entries.get(account or DEFAULT_ACCOUNT)
+        return entry.creds if entry is not None else None
+
+    def warm(self, account: Optional[str] = None) -> bool:
+        """Build the client ahead of the first request if a stored token exists"""
+        if not token_path_for(account or DEFAULT_ACCOUNT).exists():
+            return False
+        try:
+            self._entry(account)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not warm Calendar service: {e}")
+            return False
+
+    def _refresh_due(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in entries:
+            remaining = entry.seconds_to_expiry()
+            if remaining is not None and remaining <= REFRESH_AHEAD_SECONDS and entry.creds.refresh_token:
+                try:
+                    entry.refresh()
+                except Exception as e:
+                    logger.error(f"Background token refresh failed for {entry.account}: {e}")
+
+    def _refresh_loop(self):
+        while not self._stop.wait(REFRESH_CHECK_INTERVAL):
+            self._refresh_due()
+
+    def start_refresher(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="calendar-token-refresher", daemon=True)
+        self._thread.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "accounts": len(self._entries),
+                "max_accounts": self.max_accounts,
+                "builds": self.builds,
+                "evictions": self.evictions,
+                "refreshes": sum(e.refreshes for e in self._entries.values()),
+                "seconds_to_expiry": {a: e.seconds_to_expiry() for a, e in self._entries.items()},
+            }
+
+service_pool = CalendarServicePool()
@@ -0,0 +1,105 @@
+# circuit_breaker.py
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker shared by every caller of one backend"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._transitions = 0
+        self._last_error: Optional[str] = None
+
+    def _set_state(self, new_state: str, reason: str = ""):
+        # Caller holds the lock
+        if new_state == self._state:
+            return
+        logger.warning(f"Circuit '{self.name}': {self._state} -> {new_state}{f' ({reason})' if reason else ''}")
+        self._state = new_state
+        self._transitions += 1
+        if new_state == OPEN:
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a real call may go out; False means use the fallback"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(HALF_OPEN, "reset timeout elapsed")
+            # Half-open: let exactly one trial call through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            self._trial_started = time.monotonic()
+            return True
+
+    def release_trial(self):
+        """The call let through ended without a verdict (e.g. cancelled); let the next one try instead"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def trial_stale(self) -> bool:
+        """A half-open trial has been out longer than the reset timeout; its outcome was probably lost"""
+        with self._lock:
+            return (self._state == HALF_OPEN and self._trial_in_flight
+                    and time.monotonic() - self._trial_started >= self.reset_timeout)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._last_error = None
+            self._set_state(CLOSED, "call succeeded")
+
+    def record_failure(self, error: Any = None):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) if error is not None else None
+            if self._state == HALF_OPEN:
+                self._set_state(OPEN, "trial call failed")
+            elif self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._set_state(OPEN, f"{self._failures} consecutive failures")
+            elif self._state == OPEN:
+                self._opened_at = time.monotonic()
+
+    def probe_succeeded(self):
+        """A background health probe reached the backend; let the next real call try it"""
+        with self._lock:
+            if self._state == OPEN:
+                self._set_state(HALF_OPEN, "health probe succeeded")
+            elif self._state == HALF_OPEN:
+                self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "transitions": self._transitions,
+                "last_error": self._last_error,
+            }
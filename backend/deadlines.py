@@ -0,0 +1,76 @@
+# deadlines.py
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+import metrics
+
+# End-to-end latency budget for one request; each stage gets what is left of it, capped by its own timeout
+REQUEST_BUDGET_MS = float(os.getenv("REQUEST_BUDGET_MS", "15000"))
+# Clients can ask for a tighter budget (never a looser one) with this header
+BUDGET_HEADER = "X-Request-Budget-Ms"
+
+metrics.registry.describe("deadline_overruns_total", "Stages cut short or skipped because the request budget ran out")
+
+# Monotonic time the current request must finish by; None outside any budget (CLI, background workers)
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    """The request's latency budget ran out in `stage`"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request budget exhausted in the {stage} stage")
+        self.stage = stage
+
+def budget_from_header(value: Optional[str]) -> float:
+    """Seconds of budget for a request carrying `value` in BUDGET_HEADER"""
+    budget_ms = REQUEST_BUDGET_MS
+    try:
+        if value is not None and float(value) > 0:
+            budget_ms = min(budget_ms, float(value))
+    except ValueError:
+        pass
+    return budget_ms / 1000
+
+@contextmanager
+def budget(seconds: float):
+    """Run the block under a deadline `seconds` from now; inside another budget the earlier deadline wins"""
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget (negative once overrun), or None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def record_overrun(stage: str):
+    metrics.registry.inc("deadline_overruns_total", stage=stage)
+    metrics.annotate(deadline_overrun=stage)
+
+def overrun(stage: str) -> DeadlineExceeded:
+    """Count an overrun in `stage` and return the error to raise"""
+    record_overrun(stage)
+    return DeadlineExceeded(stage)
+
+def check(stage: str):
+    """Raise DeadlineExceeded if the budget is already spent"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise overrun(stage)
+
+def timeout_for(stage: str, default: Optional[float]) -> Optional[float]:
+    """The stage's own timeout capped by the budget left; raises DeadlineExceeded when nothing is left"""
+    check(stage)
+    left = remaining()
+    if left is None:
+        return default
+    return left if default is None else min(default, left)
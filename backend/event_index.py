@@ -0,0 +1,206 @@
+# event_index.py
+import os
+import re
+import time
+import bisect
+import logging
+import datetime
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Re-list the calendar after this long, so edits made outside this app are picked up
+TITLE_INDEX_MAX_AGE = float(os.getenv("TITLE_INDEX_MAX_AGE", "900"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9@.]+")
+
+def title_tokens(title: str) -> List[str]:
+    return _TOKEN_RE.findall((title or "").lower())
+
+def normalize_title(title: str) -> str:
+    return " ".join(title_tokens(title))
+
+def _event_start(event: Dict[str, Any]) -> Optional[float]:
+    """Epoch start, parsed the way the calendar mirror parses it (all-day dates in DEFAULT_TZ)"""
+    # Imported lazily: calendar_mirror imports calendar_booker, which imports us
+    from calendar_mirror import _to_epoch
+    try:
+        return _to_epoch(event.get("start") or {})
+    except ValueError:
+        return None
+
+class TitleIndex:
+    """Inverted index over normalized event titles with token/prefix matching"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._events: Dict[str, Dict[str, Any]] = {}
+        self._titles: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._vocab: List[str] = []  # sorted, for prefix lookups
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.lookups = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def load(self, service, calendar_id: str):
+        """Fill the index by following every page of events().list once"""
+        events = []
+        page_token = None
+        while True:
+            resp = service.events().list(calendarId=calendar_id, maxResults=2500, pageToken=page_token).execute()
+            events.extend(resp.get("items", []))
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                break
+        self.replace_all(events)
+
+    def replace_all(self, events: List[Dict[str, Any]]):
+        """Swap in a complete event listing (from any client)"""
+        with self._lock:
+            self._events.clear()
+            self._titles.clear()
+            self._postings.clear()
+            self._vocab.clear()
+            for event in events:
+                self._upsert(event)
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+        logger.info(f"Title index loaded with {len(events)} events")
+
+    @property
+    def stale(self) -> bool:
+        """Never loaded, or loaded longer than TITLE_INDEX_MAX_AGE ago"""
+        return not self.loaded or time.monotonic() - self.loaded_at > TITLE_INDEX_MAX_AGE
+
+    def ensure_loaded(self, service, calendar_id: str):
+        """(Re)load when stale; concurrent lookups wait for a single load"""
+        if not self.stale:
+            return
+        with self._load_lock:
+            if self.stale:
+                self.load(service, calendar_id)
+
+    def apply_changes(self, events: List[Dict[str, Any]]):
+        """
+        Fold in changed events from an incremental sync (cancelled ones are removed).
+        Expanded recurring instances are skipped: the index holds series, as listed without singleEvents.
+        """
+        with self._lock:
+            for event in events:
+                if not event.get("recurringEventId"):
+                    self._upsert(event)
+
+    def _upsert(self, event: Dict[str, Any]):
+        # Caller holds the lock
+        event_id = event.get("id")
+        if not event_id:
+            return
+        self._remove(event_id)
+        if event.get("status") == "cancelled":
+            return
+        title = normalize_title(event.get("summary", ""))
+        self._events[event_id] = event
+        self._titles[event_id] = title
+        for token in set(title.split()):
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = set()
+                bisect.insort(self._vocab, token)
+            ids.add(event_id)
+
+    def _remove(self, event_id: str):
+        # Caller holds the lock
+        title = self._titles.pop(event_id, None)
+        self._events.pop(event_id, None)
+        if title is None:
+            return
+        for token in set(title.split()):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(event_id)
+            if not ids:
+                del self._postings[token]
+                i = bisect.bisect_left(self._vocab, token)
+                if i < len(self._vocab) and self._vocab[i] == token:
+                    del self._vocab[i]
+
+    def upsert(self, event: Dict[str, Any]):
+        with self._lock:
+            self._upsert(event)
+
+    def remove(self, event_id: str):
+        with self._lock:
+            self._remove(event_id)
+
+    def _ids_for_token(self, token: str) -> Set[str]:
+        # Exact token or any indexed token it is a prefix of
+        ids: Set[str] = set()
+        i = bisect.bisect_left(self._vocab, token)
+        while i < len(self._vocab) and self._vocab[i].startswith(token):
+            ids |= self._postings[self._vocab[i]]
+            i += 1
+        return ids
+
+    def find(self, title: str, near: Optional[datetime.datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Best event for a spoken title: exact normalized titles first, then events
+        containing every query token (as a word or word prefix), nearest to `near` first.
+        """
+        query = normalize_title(title)
+        tokens = query.split()
+        if not tokens:
+            return None
+        near = near or datetime.datetime.now(datetime.timezone.utc)
+        if near.tzinfo is None:
+            near = near.astimezone()
+        near_epoch = near.timestamp()
+
+        with self._lock:
+            self.lookups += 1
+            candidates = None
+            for token in tokens:
+                ids = self._ids_for_token(token)
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    self.misses += 1
+                    return None
+
+            def rank(event_id):
+                start = _event_start(self._events[event_id])
+                distance = abs(start - near_epoch) if start is not None else float("inf")
+                # Exact title, then fewest extra words, then closest in time
+                return (self._titles[event_id] != query,
+                        len(self._titles[event_id].split()) - len(tokens),
+                        distance)
+
+            return self._events[min(candidates, key=rank)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded else None,
+                "events": len(self._events),
+                "tokens": len(self._vocab),
+                "lookups": self.lookups,
+                "misses": self.misses,
+            }
+
+_indexes: Dict[Optional[str], TitleIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_index(account: Optional[str] = None) -> TitleIndex:
+    with _indexes_lock:
+        if account not in _indexes:
+            _indexes[account] = TitleIndex()
+        return _indexes[account]
+
+def index_stats() -> Dict[str, Any]:
+    return {str(account or "default"): index.stats() for account, index in list(_indexes.items())}
@@ -0,0 +1,58 @@
+# json_stream.py
+import json
+from typing import Any, Dict
+
+class IncrementalJSONObject:
+    """Parse a JSON object as it streams in, exposing each top-level field once it is complete"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self._pos = 0
+        self._start = -1  # index of the opening brace
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> Dict[str, Any]:
+        """Add streamed text; return the fields completed by this chunk"""
+        self.buffer += text
+        new_fields: Dict[str, Any] = {}
+        buf = self.buffer
+        while self._pos < len(buf) and not self.complete:
+            ch = buf[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0 and ch == "{":
+                    self._start = self._pos
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0 and self._start >= 0:
+                    new_fields.update(self._parse_prefix(buf[self._start:self._pos + 1]))
+                    self.complete = True
+            elif ch == "," and self._depth == 1:
+                # A top-level comma closes the previous field
+                new_fields.update(self._parse_prefix(buf[self._start:self._pos] + "}"))
+            self._pos += 1
+        return new_fields
+
+    def _parse_prefix(self, text: str) -> Dict[str, Any]:
+        try:
+            parsed = json.loads(text)
+        except ValueError:
+            return {}
+        if not isinstance(parsed, dict):
+            return {}
+        added = {k: v for k, v in parsed.items() if k not in self.fields}
+        self.fields.update(added)
+        return added
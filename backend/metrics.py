@@ -0,0 +1,226 @@
+# metrics.py
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "voicecal"
+# Quantiles are computed over the most recent observations of each series
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "2048"))
+QUANTILES = (0.5, 0.95, 0.99)
+# Log the full stage breakdown of requests slower than this; 0 disables the log
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class _Series:
+    """Count, sum and a sliding window of observations for quantiles"""
+
+    def __init__(self):
+        self.values = deque(maxlen=METRICS_WINDOW)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self) -> Dict[float, float]:
+        ordered = sorted(self.values)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+class Registry:
+    """In-process summaries, counters and gauges rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries: Dict[str, Dict[LabelKey, _Series]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._summaries.setdefault(name, {}).get(key)
+            if series is None:
+                series = self._summaries[name][key] = _Series()
+            series.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            counters = self._counters.setdefault(name, {})
+            counters[key] = counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def summary(self, name: str) -> Dict[str, Dict[str, Any]]:
+        """{label string: {count, p50, p95, p99}} in seconds, for JSON endpoints and benchmarks"""
+        with self._lock:
+            series = dict(self._summaries.get(name, {}))
+        result = {}
+        for key, s in series.items():
+            q = s.quantiles()
+            result[",".join(f"{k}={v}" for k, v in key) or "all"] = {
+                "count": s.count, "p50": q[0.5], "p95": q[0.95], "p99": q[0.99],
+            }
+        return result
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def header(name: str, kind: str):
+            full = f"{METRICS_PREFIX}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        with self._lock:
+            for name, series in sorted(self._summaries.items()):
+                full = header(name, "summary")
+                for key, s in series.items():
+                    for q, value in s.quantiles().items():
+                        lines.append(f"{full}{_labels(key + (('quantile', str(q)),))} {value:.6f}")
+                    lines.append(f"{full}_sum{_labels(key)} {s.total:.6f}")
+                    lines.append(f"{full}_count{_labels(key)} {s.count}")
+            for name, counters in sorted(self._counters.items()):
+                full = header(name, "counter")
+                for key, value in counters.items():
+                    lines.append(f"{full}{_labels(key)} {value:g}")
+            for name, gauges in sorted(self._gauges.items()):
+                full = header(name, "gauge")
+                for key, value in gauges.items():
+                    lines.append(f"{full}{_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in key) + "}"
+
+registry = Registry()
+registry.describe("stage_seconds", "Latency of each pipeline stage")
+registry.describe("stage_errors_total", "Exceptions raised inside a stage")
+registry.describe("http_request_seconds", "Request latency by route (to response headers for streams)")
+registry.describe("http_requests_total", "Requests by route and status")
+registry.describe("nlu_path_total", "Extractions by path taken (rule, cache, llm, fallback, budget, hedge)")
+
+class Trace:
+    """Spans recorded for one request, across awaits and worker threads"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.attrs: Dict[str, Any] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request": self.name,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "attrs": self.attrs,
+            "spans": self.spans,
+        }
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_parent: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span_parent", default=None)
+
+class Span:
+    def __init__(self, name: str):
+        self.name = name
+        self.ms = 0.0
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a stage: feeds the stage_seconds summary and the current request's trace"""
+    current = Span(name)
+    trace = _trace.get()
+    parent_token = _parent.set(name)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = type(e).__name__
+        registry.inc("stage_errors_total", stage=name, error=error)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        _parent.reset(parent_token)
+        current.ms = round(elapsed * 1000, 2)
+        registry.observe("stage_seconds", elapsed, stage=name)
+        if trace is not None:
+            entry = {
+                "stage": name,
+                "parent": _parent.get(),
+                "offset_ms": round((started - trace.started) * 1000, 1),
+                "ms": current.ms,
+            }
+            if attrs:
+                entry.update(attrs)
+            if error:
+                entry["error"] = error
+            trace.spans.append(entry)
+
+def observe(name: str, seconds: float):
+    """Record a stage timed elsewhere (e.g. queue wait) like a finished span"""
+    registry.observe("stage_seconds", seconds, stage=name)
+    trace = _trace.get()
+    if trace is not None:
+        trace.spans.append({
+            "stage": name,
+            "parent": _parent.get(),
+            "offset_ms": round((time.perf_counter() - seconds - trace.started) * 1000, 1),
+            "ms": round(seconds * 1000, 2),
+        })
+
+def annotate(**attrs):
+    """Attach attributes (e.g. the NLU path) to the current request's trace"""
+    trace = _trace.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+def record_nlu_path(path: Optional[str]):
+    if path:
+        registry.inc("nlu_path_total", path=path)
+        annotate(nlu_path=path)
+
+def start_trace(name: str) -> Tuple[Trace, contextvars.Token]:
+    trace = Trace(name)
+    return trace, _trace.set(trace)
+
+def end_trace(trace: Trace, token: contextvars.Token, route: str, method: str, status: int):
+    _trace.reset(token)
+    elapsed = time.perf_counter() - trace.started
+    registry.observe("http_request_seconds", elapsed, route=route, method=method)
+    registry.inc("http_requests_total", route=route, method=method, status=status)
+    trace.attrs["status"] = status
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        logger.warning(f"Slow request: {json.dumps(trace.to_dict(), default=str)}")
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+def render() -> str:
+    return registry.render()
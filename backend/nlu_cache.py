@@ -0,0 +1,144 @@
+# nlu_cache.py
+import re
+import copy
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17,
+    "eighteen": 18, "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40,
+    "forty-five": 45, "fifty": 50, "sixty": 60, "ninety": 90,
+    "first": "1st", "second": "2nd", "third": "3rd", "fourth": "4th", "fifth": "5th",
+}
+
+_NUMBER_WORD_RE = re.compile(r"\b(" + "|".join(sorted(map(re.escape, NUMBER_WORDS), key=len, reverse=True)) + r")\b")
+_MERIDIEM_RE = re.compile(r"\b([ap])\.?\s?m\b\.?")
+# Drop punctuation but keep times (2:30), decimals and email addresses intact
+_PUNCT_RE = re.compile(r"[^\w\s:@.]|\.(?=\s|$)|(?<!\d):|:(?!\d)")
+_SPACE_RE = re.compile(r"\s+")
+# Phrases resolved against the clock, not the day ("in 30 minutes", "an hour from now", "asap")
+_CLOCK_RELATIVE_RE = re.compile(
+    r"\b(?:in|within) (?:\S+ ){1,3}?(?:minutes?|mins?|hours?|hrs?)\b"
+    r"|\b(?:from now|now|later|soon|asap|right away)\b"
+)
+
+def normalize_utterance(utterance: str) -> str:
+    """Canonical form for cache keys: case, punctuation, whitespace and number words"""
+    text = utterance.lower().strip()
+    text = _MERIDIEM_RE.sub(lambda m: f" {m.group(1)}m ", text)
+    text = _NUMBER_WORD_RE.sub(lambda m: str(NUMBER_WORDS[m.group(1)]), text)
+    text = _PUNCT_RE.sub(" ", text)
+    # "2pm" and "2 pm" mean the same thing
+    text = re.sub(r"(\d)\s*(am|pm)\b", r"\1 \2", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+def cache_key(utterance: str, model: str, now: Optional[datetime] = None) -> str:
+    """
+    Key includes the reference date so 'tomorrow' never resolves against a stale day.
+    Clock-relative phrases are keyed to the minute instead, the resolution the prompt gives
+    the model, so 'in 30 minutes' is only reused while it still means the same start.
+    """
+    now = now or datetime.now()
+    text = normalize_utterance(utterance)
+    reference = f"{now:%Y-%m-%dT%H:%M}" if _CLOCK_RELATIVE_RE.search(text) else now.date().isoformat()
+    return f"{model}|{reference}|{text}"
+
+class EventCache:
+    """Bounded LRU + TTL cache of extracted events, with an optional SQLite tier"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, path: Optional[str] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS events (key TEXT PRIMARY KEY, expires REAL, value TEXT)")
+            self._db.execute("DELETE FROM events WHERE expires < ?", (time.time(),))
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires >= now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return copy.deepcopy(value)
+                del self._entries[key]
+                self._expirations += 1
+            row = self._disk_get(key, now)
+            if row is not None:
+                expires, value = row
+                self._disk_hits += 1
+                self._store(key, value, expires)
+                return copy.deepcopy(value)
+            self._misses += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        now = time.time()
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._store(key, value, now + self.ttl)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO events (key, expires, value) VALUES (?, ?, ?)",
+                        (key, now + self.ttl, json.dumps(value)),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"NLU cache disk write failed: {e}")
+
+    def _store(self, key: str, value: Dict[str, Any], expires: float):
+        # Caller holds the lock
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT expires, value FROM events WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"NLU cache disk read failed: {e}")
+            return None
+        if row is None or row[0] < now:
+            return None
+        return row[0], json.loads(row[1])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "disk_enabled": self._db is not None,
+            }
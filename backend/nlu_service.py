@@ -1,19 +1,89 @@
 # nlu_service.py
-import os, json, logging, requests, re
-from datetime import datetime, timedelta
-from typing import Dict, Any
+import os, json, logging, re, threading, time, asyncio
+from contextlib import aclosing, closing, contextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+
+import deadlines
+import metrics
+import rule_parser
+from json_stream import IncrementalJSONObject
+from nlu_cache import EventCache, cache_key
+from ollama_client import OLLAMA_READ_TIMEOUT, OllamaUnavailable, get_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Ollama settings
-OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+# Ollama settings (hosts, pool size and timeouts live in ollama_client)
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+OLLAMA_PROBE_INTERVAL = float(os.getenv("OLLAMA_PROBE_INTERVAL", "10"))
+# Stream tokens and stop as soon as the required fields are complete
+OLLAMA_STREAM = os.getenv("OLLAMA_STREAM", "1") == "1"
+REQUIRED_FIELDS = ("intent", "title", "start", "end", "duration_minutes")
+
+def _keep_alive(value: str):
+    # Ollama reads bare numbers as seconds (-1 keeps the model loaded) and strings as durations ("30m")
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+# How long Ollama keeps the model loaded after a request; the default unloads after 5 idle minutes
+OLLAMA_KEEP_ALIVE = _keep_alive(os.getenv("OLLAMA_KEEP_ALIVE", "30m"))
+# Load the model at startup; a cold load can take far longer than a request's read timeout
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") == "1"
+OLLAMA_WARMUP_TIMEOUT = float(os.getenv("OLLAMA_WARMUP_TIMEOUT", "120"))
+
+# Tier 0: confident rule parses skip the LLM entirely
+RULE_FAST_PATH = os.getenv("RULE_FAST_PATH", "1") == "1"
+RULE_CONFIDENCE_THRESHOLD = float(os.getenv("RULE_CONFIDENCE_THRESHOLD", "0.8"))
+
+# With less of the request budget left than this, the LLM isn't tried and the rule parse answers
+NLU_MIN_LLM_BUDGET_MS = float(os.getenv("NLU_MIN_LLM_BUDGET_MS", "500"))
+# Hedging: if the LLM hasn't answered after NLU_HEDGE_AFTER_MS, a rule parse this confident answers instead
+NLU_HEDGE = os.getenv("NLU_HEDGE", "0") == "1"
+NLU_HEDGE_AFTER_MS = float(os.getenv("NLU_HEDGE_AFTER_MS", "1000"))
+NLU_HEDGE_CONFIDENCE = float(os.getenv("NLU_HEDGE_CONFIDENCE", "0.5"))
+
+_ISO_TIME_RE = re.compile(r"T(\d{2}:\d{2}:\d{2})")
+
+# Utterance -> event cache; NLU_CACHE_PATH enables a SQLite tier that survives restarts
+NLU_CACHE_SIZE = int(os.getenv("NLU_CACHE_SIZE", "1024"))
+NLU_CACHE_TTL = float(os.getenv("NLU_CACHE_TTL", "3600"))
+NLU_CACHE_PATH = os.getenv("NLU_CACHE_PATH", "")
+event_cache = EventCache(NLU_CACHE_SIZE, NLU_CACHE_TTL, NLU_CACHE_PATH or None)
+
+# Host URL -> warmup milliseconds (None if it failed), for /health
+_warmup: Dict[str, Optional[float]] = {}
+
+_probe_thread = None
+_probe_stop = threading.Event()
+
+def _probe_ollama_loop():
+    """Poll /api/tags on hosts whose breaker is open or stuck half-open so recovery is noticed without user traffic"""
+    while not _probe_stop.wait(OLLAMA_PROBE_INTERVAL):
+        with metrics.span("nlu.health_probe"):
+            get_client().probe_open_hosts()
+
+def start_health_probe():
+    global _probe_thread
+    if _probe_thread and _probe_thread.is_alive():
+        return
+    _probe_stop.clear()
+    _probe_thread = threading.Thread(target=_probe_ollama_loop, name="ollama-probe", daemon=True)
+    _probe_thread.start()
+
+def stop_health_probe():
+    _probe_stop.set()
+
+def nlu_status() -> Dict[str, Any]:
+    return {"model": OLLAMA_MODEL, "keep_alive": OLLAMA_KEEP_ALIVE, "warmup_ms": dict(_warmup),
+            **get_client().stats(), "cache": event_cache.stats()}
 
 def validate_and_correct_dates(event_data: Dict[str, Any], utterance: str = "") -> Dict[str, Any]:
     """Validate and correct date formats with proper relative date handling"""
-    utterance_lower = utterance.lower()
-    
     # If we don't have a start date, try to extract from utterance
     if "start" not in event_data or not event_data["start"]:
         return event_data
@@ -21,45 +91,21 @@ def validate_and_correct_dates(event_data: Dict[str, Any], utterance: str = "")
     event_data["attendees"] = []
     
     try:
-        start_str = event_data.get("start", "")
-        current_year = datetime.now().year
-        
-        # Check if we mentioned a specific month that should override any existing date
-        month_patterns = {
-            'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
-            'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
-        }
-        
-        for month_name, month_num in month_patterns.items():
-            if month_name in utterance_lower:
-                day_match = re.search(rf"{month_name}\s+(\d{{1,2}})(?:st|nd|rd|th)?", utterance_lower)
-                if day_match:
-                    day_num = int(day_match.group(1))
-                    current_year = datetime.now().year
-                    
-                    try:
-                        corrected_date = datetime(current_year, month_num, day_num)
-                        
-                        # If we have a time in the existing start date, preserve it
-                        if "start" in event_data and event_data["start"]:
-                            start_str = event_data["start"]
-                            time_match = re.search(r"T(\d{2}:\d{2}:\d{2})", start_str)
-                            if time_match:
-                                time_part = time_match.group(1)
-                                event_data["start"] = f"{corrected_date.strftime('%Y-%m-%d')}T{time_part}"
-                                
-                                # Also update end date if it exists
-                                if "end" in event_data and event_data["end"]:
-                                    end_str = event_data["end"]
-                                    end_time_match = re.search(r"T(\d{2}:\d{2}:\d{2})", end_str)
-                                    if end_time_match:
-                                        event_data["end"] = f"{corrected_date.strftime('%Y-%m-%d')}T{end_time_match.group(1)}"
-                        
-                        logger.info(f"Corrected to specific date: {corrected_date.strftime('%Y-%m-%d')}")
-                        break
-                        
-                    except ValueError:
-                        continue
+        # A specific month-day in the utterance overrides whatever date the model picked
+        corrected_date = rule_parser.find_month_day(utterance)
+        if corrected_date:
+            # If we have a time in the existing start date, preserve it
+            time_match = _ISO_TIME_RE.search(event_data["start"])
+            if time_match:
+                event_data["start"] = f"{corrected_date.strftime('%Y-%m-%d')}T{time_match.group(1)}"
+                
+                # Also update end date if it exists
+                if "end" in event_data and event_data["end"]:
+                    end_time_match = _ISO_TIME_RE.search(event_data["end"])
+                    if end_time_match:
+                        event_data["end"] = f"{corrected_date.strftime('%Y-%m-%d')}T{end_time_match.group(1)}"
+            
+            logger.info(f"Corrected to specific date: {corrected_date.strftime('%Y-%m-%d')}")
     
     except Exception as e:
         logger.error(f"Date correction failed: {e}")
@@ -67,150 +113,17 @@ def validate_and_correct_dates(event_data: Dict[str, Any], utterance: str = "")
     return event_data
 
 def extract_event_fallback(utterance: str) -> Dict[str, Any]:
-    """Improved fallback function with proper date parsing for specific dates"""
-    utterance_lower = utterance.lower()
-    result = {"intent": "CreateEvent", "title": "Meeting", "timezone": "America/New_York", "attendees": []}
-    
-    today = datetime.now()
-    current_year = today.year
-    
-    # Handle specific dates like "September 18th"
-    month_patterns = {
-        'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
-        'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
-    }
-    
-    event_date = None
-    date_found = False
-    
-    # Parse specific month-day patterns
-    for month_name, month_num in month_patterns.items():
-        if month_name in utterance_lower:
-            # Match patterns like "September 18th", "September 18", "september 18th at"
-            day_match = re.search(rf"{month_name}\s+(\d{{1,2}})(?:st|nd|rd|th)?", utterance_lower)
-            if day_match:
-                day_num = int(day_match.group(1))
-                try:
-                    event_date = datetime(current_year, month_num, day_num)
-                    result["title"] = f"Meeting on {month_name.title()} {day_num}"
-                    date_found = True
-                    logger.info(f"Parsed specific date: {event_date.strftime('%Y-%m-%d')}")
-                    break
-                except ValueError:
-                    # Invalid date (e.g., February 30)
-                    continue
-    
-    # Handle "next [day]" patterns if no specific date found
-    if not date_found:
-        day_mapping = {
-            'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-            'friday': 4, 'saturday': 5, 'sunday': 6
-        }
-        
-        next_day_match = re.search(r"next\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)", utterance_lower)
-        
-        if next_day_match:
-            day_name = next_day_match.group(1)
-            target_weekday = day_mapping[day_name]
-            current_weekday = today.weekday()
-            
-            days_until_next = (target_weekday - current_weekday) % 7
-            if days_until_next <= 0:
-                days_until_next += 7
-            
-            event_date = today + timedelta(days=days_until_next)
-            result["title"] = f"{day_name.title()} Meeting"
-            
-        elif "tomorrow" in utterance_lower:
-            event_date = today + timedelta(days=1)
-            
-        else:
-            # Default to today if no date specified
-            event_date = today
-    
-    # Parse time with better pattern matching
-    time_match = re.search(r"at\s+(\d{1,2})(?::(\d{2}))?\s*(a\.m\.|p\.m\.|am|pm|a\.m|p\.m)?", utterance_lower, re.IGNORECASE)
-    if time_match and event_date:
-        hour = int(time_match.group(1))
-        minute = int(time_match.group(2) or "0")
-        period = (time_match.group(3) or "").lower().replace('.', '')
-        
-        # Convert to 24-hour format
-        if any(p in period for p in ['pm', 'p.m']):
-            if hour < 12:
-                hour += 12
-        elif any(p in period for p in ['am', 'a.m']) and hour == 12:
-            hour = 0
-        
-        # Handle 12-hour format without AM/PM (assume PM if ambiguous)
-        if not period and hour < 8:
-            hour += 12  # Assume evening for hours 1-7 without AM/PM
-        
-        try:
-            start_time = event_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-            result["start"] = start_time.isoformat()
-            
-            # Set default duration of 1 hour if not specified
-            default_duration = 60
-            result["end"] = (start_time + timedelta(minutes=default_duration)).isoformat()
-            result["duration_minutes"] = default_duration
-        except ValueError as e:
-            logger.error(f"Invalid time: {e}")
-    
-    # Parse duration more accurately
-    duration_match = re.search(r"for\s+(\d+)\s*(hour|hr|minute|min|minutes|hrs|hours)", utterance_lower)
-    if duration_match and "start" in result:
-        duration = int(duration_match.group(1))
-        unit = duration_match.group(2).lower()
-        
-        try:
-            start_time = datetime.fromisoformat(result["start"].replace('Z', '+00:00'))
-            
-            if any(u in unit for u in ['hour', 'hr']):
-                result["end"] = (start_time + timedelta(hours=duration)).isoformat()
-                result["duration_minutes"] = duration * 60
-            else:
-                result["end"] = (start_time + timedelta(minutes=duration)).isoformat()
-                result["duration_minutes"] = duration
-        except Exception as e:
-            logger.error(f"Error calculating end time: {e}")
-    
-    # Parse title from utterance (first few meaningful words)
-    words = [word for word in utterance.split() if word.lower() not in ['schedule', 'a', 'meeting', 'with', 'on', 'at', 'for']]
-    if len(words) > 0:
-        result["title"] = " ".join(words[:4])  # Use first 4 meaningful words as title
-    
-    # Parse attendees
-    #email_matches = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', utterance)
-    #if email_matches:
-    #    result["attendees"] = email_matches
-    result["attendees"] = []
-    
-    return result
+    """Rule-based extraction used when the LLM is unavailable or unusable"""
+    with metrics.span("nlu.fallback"):
+        event_data, _ = rule_parser.parse(utterance)
+    return event_data
 
-def extract_event(utterance: str) -> Dict[str, Any]:
-    """
-    Main extraction function with AI and fallback
-    """
-    try:
-        # First check if Ollama is running
-        try:
-            health_response = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=5)
-            if health_response.status_code != 200:
-                logger.warning("Ollama is not running, using fallback")
-                return extract_event_fallback(utterance)
-        except requests.exceptions.RequestException:
-            logger.warning("Ollama is not available, using fallback")
-            return extract_event_fallback(utterance)
-        
-        current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        current_year = datetime.now().year
-        
-        system_prompt = f"""You are a calendar assistant. Today is {current_date} (CURRENT YEAR: {current_year}). 
+# Byte-identical on every request so Ollama can reuse the evaluated prefix; nothing volatile goes in here
+SYSTEM_PROMPT = """You are a calendar assistant.
         Return JSON with: intent, title, start, end, duration_minutes, attendees, timezone.
         
         CRITICAL RULES:
-        1. Use CURRENT YEAR {current_year}, NOT 2025
+        1. Use the current year given with the request, NOT a year from your training data
         2. If user says "45 minutes", duration_minutes must be EXACTLY 45
         3. If user says "1 hour", duration_minutes must be EXACTLY 60
         4. timezone should always be "America/New_York"
@@ -220,29 +133,132 @@ def extract_event(utterance: str) -> Dict[str, Any]:
         
         Example: "45 minutes meeting" → "duration_minutes": 45
         Example: "1 hour meeting" → "duration_minutes": 60"""
-        
-        response = requests.post(
-            f"{OLLAMA_HOST}/api/generate",
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": f"Extract calendar event from: '{utterance}'. Today is {current_date}. Return JSON:",
-                "system": system_prompt,
-                "stream": False,
-                "format": "json",
-                "options": {"temperature": 0.1}
-            },
-            timeout=30  # Increased timeout
-        )
-        
-        result = response.json()
-        event_data = json.loads(result["response"])
-        
+
+def _build_generate_payload(utterance: str) -> Dict[str, Any]:
+    """Build the /api/generate request body for one utterance"""
+    now = datetime.now()
+    # The date context changes every minute, so it comes after everything that can be shared
+    return {
+        "model": OLLAMA_MODEL,
+        "prompt": (f"Extract calendar event from: '{utterance}'.\n"
+                   f"Today is {now:%A, %Y-%m-%d %H:%M} (CURRENT YEAR: {now.year}). Return JSON:"),
+        "system": SYSTEM_PROMPT,
+        "stream": False,
+        "format": "json",
+        "options": {"temperature": 0.1},
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+    }
+
+async def warm_model() -> Dict[str, Any]:
+    """
+    One short generate per Ollama host with the real system prompt, so the first user
+    request neither pays the model load nor evaluates the shared prefix from scratch.
+    """
+    payload = _build_generate_payload("Team sync tomorrow at 10am")
+    payload["options"] = {**payload["options"], "num_predict": 1}
+    with metrics.span("nlu.warmup"):
+        results = await get_client().awarm(payload, OLLAMA_WARMUP_TIMEOUT)
+    _warmup.update(results)
+    logger.info(f"Ollama warmup (ms per host): {results}")
+    return results
+
+class _StreamingExtraction:
+    """Consume Ollama stream chunks until the required event fields are complete"""
+
+    def __init__(self):
+        self.parser = IncrementalJSONObject()
+        self.started = time.perf_counter()
+        self.first_field_at = None
+        self.tokens = 0
+        self.eval_count = None
+        self.early_stop = False
+
+    def feed(self, chunk: Dict[str, Any]) -> bool:
+        """Return True once reading can stop"""
+        if chunk.get("done"):
+            self.eval_count = chunk.get("eval_count")
+            return True
+        piece = chunk.get("response", "")
+        if piece:
+            self.tokens += 1
+        if self.parser.feed(piece) and self.first_field_at is None:
+            self.first_field_at = time.perf_counter()
+        if self.parser.complete:
+            return True
+        if _required_fields_ready(self.parser.fields):
+            self.early_stop = True
+            return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        return {
+            "mode": "stream",
+            "time_to_first_field_ms": round((self.first_field_at - self.started) * 1000, 1) if self.first_field_at else None,
+            "total_ms": round((now - self.started) * 1000, 1),
+            "tokens": self.eval_count if self.eval_count is not None else self.tokens,
+            "early_stop": self.early_stop,
+        }
+
+def _required_fields_ready(fields: Dict[str, Any]) -> bool:
+    """True when every required field has arrived and is usable as-is"""
+    if any(field not in fields for field in REQUIRED_FIELDS):
+        return False
+    if not isinstance(fields["intent"], str) or not fields["intent"]:
+        return False
+    if not isinstance(fields["title"], str):
+        return False
+    if not isinstance(fields["duration_minutes"], (int, float)) or isinstance(fields["duration_minutes"], bool):
+        return False
+    try:
+        start = datetime.fromisoformat(str(fields["start"]).replace("Z", "+00:00"))
+        end = datetime.fromisoformat(str(fields["end"]).replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    return start.tzinfo == end.tzinfo and end > start
+
+def _extract_streaming(payload: Dict[str, Any], stats: Optional[Dict[str, Any]],
+                       timeout: Optional[float] = None) -> Dict[str, Any]:
+    state = _StreamingExtraction()
+    # closing() drops the connection on early stop, which makes Ollama stop generating
+    with closing(get_client().stream_generate(payload, timeout)) as chunks:
+        for chunk in chunks:
+            if state.feed(chunk):
+                break
+            # The read timeout is per chunk; the budget bounds the whole stream
+            deadlines.check("nlu")
+    return _finish_streaming(state, stats)
+
+async def _aextract_streaming(payload: Dict[str, Any], stats: Optional[Dict[str, Any]],
+                              timeout: Optional[float] = None) -> Dict[str, Any]:
+    state = _StreamingExtraction()
+    async with aclosing(get_client().astream_generate(payload, timeout)) as chunks:
+        async for chunk in chunks:
+            if state.feed(chunk):
+                break
+    return _finish_streaming(state, stats)
+
+def _finish_streaming(state: _StreamingExtraction, stats: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    run_stats = state.stats()
+    logger.info(f"Streamed extraction: {run_stats}")
+    if stats is not None:
+        stats.update(run_stats)
+    if state.parser.complete or state.early_stop:
+        return dict(state.parser.fields)
+    # Stream ended without a closed object; let the full parse decide
+    return json.loads(state.parser.buffer)
+
+def _event_from_llm_data(event_data: Dict[str, Any], utterance: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate and correct the model's parsed JSON, or fall back"""
+    try:
         # Validate that we have both start and end times
         if "start" not in event_data or "end" not in event_data:
             logger.warning("Ollama response missing start/end times, using fallback")
+            stats["path"] = "fallback"
             return extract_event_fallback(utterance)
         
         # Force current year and fix duration
+        current_year = datetime.now().year
         if "start" in event_data and event_data["start"] and "2025" in event_data["start"]:
             event_data["start"] = event_data["start"].replace("2025", str(current_year))
         if "end" in event_data and event_data["end"] and "2025" in event_data["end"]:
@@ -252,8 +268,229 @@ def extract_event(utterance: str) -> Dict[str, Any]:
         if not event_data.get("timezone"):
             event_data["timezone"] = "America/New_York"
         
-        return validate_and_correct_dates(event_data, utterance)
+        with metrics.span("nlu.validate"):
+            event_data = validate_and_correct_dates(event_data, utterance)
+        stats["path"] = "llm"
+        return event_data
         
     except Exception as e:
         logger.error(f"Ollama extraction failed: {e}")
-        return extract_event_fallback(utterance)
\ No newline at end of file
+        stats["path"] = "fallback"
+        return extract_event_fallback(utterance)
+
+def _extract_blocking(payload: Dict[str, Any], stats: Optional[Dict[str, Any]],
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result = get_client().generate(payload, timeout)
+    _record_blocking_stats(result, started, stats)
+    return json.loads(result.get("response", ""))
+
+async def _aextract_blocking(payload: Dict[str, Any], stats: Optional[Dict[str, Any]],
+                             timeout: Optional[float] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result = await get_client().agenerate(payload, timeout)
+    _record_blocking_stats(result, started, stats)
+    return json.loads(result.get("response", ""))
+
+def _record_blocking_stats(result: Dict[str, Any], started: float, stats: Optional[Dict[str, Any]]):
+    run_stats = {
+        "mode": "blocking",
+        "time_to_first_field_ms": None,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "tokens": result.get("eval_count"),
+        "early_stop": False,
+    }
+    logger.info(f"Blocking extraction: {run_stats}")
+    if stats is not None:
+        stats.update(run_stats)
+
+def extract_event(utterance: str, stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Main extraction function with cache, AI and fallback.
+    Under a request budget (see deadlines) the LLM only gets what is left of it; when that
+    runs out the rule parse is returned instead, with path "budget".
+    If a stats dict is passed it is filled with the path taken and generation stats.
+    """
+    stats = {} if stats is None else stats
+    with metrics.span("nlu.extract"):
+        event_data = _extract_event(utterance, stats)
+    _record_path(stats)
+    return event_data
+
+async def extract_event_async(utterance: str, stats: Optional[Dict[str, Any]] = None,
+                              rule_checked: bool = False) -> Dict[str, Any]:
+    """
+    Same as extract_event, awaiting the pooled async client instead of blocking a thread.
+    With NLU_HEDGE a good enough rule parse answers for a slow LLM (path "hedge").
+    With rule_checked the caller already tried the rule parser, so it isn't run again.
+    """
+    stats = {} if stats is None else stats
+    with metrics.span("nlu.extract"):
+        event_data = await _extract_event_async(utterance, stats, rule_checked)
+    _record_path(stats)
+    return event_data
+
+def _record_path(stats: Dict[str, Any]):
+    # Rule hits are counted by rule_fast_path itself, which the app also calls directly
+    if stats.get("path") != "rule":
+        metrics.record_nlu_path(stats.get("path"))
+
+def _extract_event(utterance: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+    rule_event = rule_fast_path(utterance, stats)
+    if rule_event is not None:
+        return rule_event
+    
+    key = cache_key(utterance, OLLAMA_MODEL)
+    with metrics.span("nlu.cache"):
+        cached = event_cache.get(key)
+    if cached is not None:
+        stats["path"] = "cache"
+        return cached
+    
+    payload = _build_generate_payload(utterance)
+    try:
+        timeout = _llm_timeout()
+        with metrics.span("nlu.generate"), _budget_timeouts():
+            if OLLAMA_STREAM:
+                event_data = _extract_streaming(payload, stats, timeout)
+            else:
+                event_data = _extract_blocking(payload, stats, timeout)
+    except deadlines.DeadlineExceeded:
+        return _budget_fallback(utterance, stats)
+    except (OllamaUnavailable, httpx.HTTPError) as e:
+        # Open breakers cost nothing here: no host is contacted
+        logger.warning(f"Ollama is not available ({e}), using fallback")
+        stats["path"] = "fallback"
+        return extract_event_fallback(utterance)
+    except Exception as e:
+        logger.error(f"Ollama extraction failed: {e}")
+        stats["path"] = "fallback"
+        return extract_event_fallback(utterance)
+    
+    return _finish_llm_event(event_data, utterance, key, stats)
+
+async def _extract_event_async(utterance: str, stats: Dict[str, Any], rule_checked: bool = False) -> Dict[str, Any]:
+    if not rule_checked:
+        rule_event = rule_fast_path(utterance, stats)
+        if rule_event is not None:
+            return rule_event
+    
+    key = cache_key(utterance, OLLAMA_MODEL)
+    with metrics.span("nlu.cache"):
+        cached = event_cache.get(key)
+    if cached is not None:
+        stats["path"] = "cache"
+        return cached
+    
+    payload = _build_generate_payload(utterance)
+    try:
+        timeout = _llm_timeout()
+        with metrics.span("nlu.generate"), _budget_timeouts():
+            if OLLAMA_STREAM:
+                task = asyncio.ensure_future(_aextract_streaming(payload, stats, timeout))
+            else:
+                task = asyncio.ensure_future(_aextract_blocking(payload, stats, timeout))
+            try:
+                hedged = await _hedge(task, utterance, stats) if NLU_HEDGE else None
+                if hedged is not None:
+                    return hedged
+                event_data = await _within_budget(task)
+            finally:
+                # Dropping the connection stops generation; cancellation isn't held against the host
+                task.cancel()
+    except deadlines.DeadlineExceeded:
+        return _budget_fallback(utterance, stats)
+    except (OllamaUnavailable, httpx.HTTPError) as e:
+        logger.warning(f"Ollama is not available ({e}), using fallback")
+        stats["path"] = "fallback"
+        return extract_event_fallback(utterance)
+    except Exception as e:
+        logger.error(f"Ollama extraction failed: {e}")
+        stats["path"] = "fallback"
+        return extract_event_fallback(utterance)
+    
+    return _finish_llm_event(event_data, utterance, key, stats)
+
+def _llm_timeout() -> Optional[float]:
+    """
+    Seconds the LLM may take: what is left of the request budget, capped by OLLAMA_READ_TIMEOUT
+    (None without a budget); too little left raises DeadlineExceeded
+    """
+    left = deadlines.remaining()
+    if left is None:
+        return None
+    if left * 1000 < NLU_MIN_LLM_BUDGET_MS:
+        raise deadlines.overrun("nlu")
+    return min(left, OLLAMA_READ_TIMEOUT)
+
+@contextmanager
+def _budget_timeouts():
+    """Report an Ollama timeout that happened because the budget ran out as DeadlineExceeded"""
+    try:
+        yield
+    except httpx.TimeoutException:
+        deadlines.check("nlu")
+        raise
+
+async def _within_budget(task: "asyncio.Future[Dict[str, Any]]") -> Dict[str, Any]:
+    left = deadlines.remaining()
+    if left is None:
+        return await task
+    try:
+        return await asyncio.wait_for(task, max(left, 0))
+    except deadlines.DeadlineExceeded:
+        raise
+    except asyncio.TimeoutError:
+        raise deadlines.overrun("nlu") from None
+
+async def _hedge(task: "asyncio.Future[Dict[str, Any]]", utterance: str, stats: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Give the LLM a head start of NLU_HEDGE_AFTER_MS. If it is still generating after that,
+    the rule parse answers when it is at least NLU_HEDGE_CONFIDENCE sure; None means wait for the LLM.
+    """
+    head_start = NLU_HEDGE_AFTER_MS / 1000
+    left = deadlines.remaining()
+    if left is not None:
+        head_start = min(head_start, max(left, 0))
+    done, _ = await asyncio.wait({task}, timeout=head_start)
+    if done:
+        return None
+    with metrics.span("nlu.rule"):
+        event_data, confidence = rule_parser.parse(utterance)
+    stats["rule_confidence"] = confidence
+    if confidence < NLU_HEDGE_CONFIDENCE or "start" not in event_data:
+        return None
+    logger.info(f"LLM still generating; answering with the rule parse ({confidence:.2f})")
+    stats["path"] = "hedge"
+    return event_data
+
+def _budget_fallback(utterance: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Request budget too short for the LLM: the best the rule parser can do"""
+    logger.warning("Request budget exhausted before the LLM answered, using the rule parse")
+    stats["path"] = "budget"
+    return extract_event_fallback(utterance)
+
+def rule_parse(utterance: str, stats: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """The rule parse, and whether it is confident enough to skip Ollama (then recorded as the rule path)"""
+    with metrics.span("nlu.rule"):
+        event_data, confidence = rule_parser.parse(utterance)
+    stats["rule_confidence"] = confidence
+    confident = RULE_FAST_PATH and confidence >= RULE_CONFIDENCE_THRESHOLD and "start" in event_data
+    if confident:
+        stats["path"] = "rule"
+        metrics.record_nlu_path("rule")
+    return event_data, confident
+
+def rule_fast_path(utterance: str, stats: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the rule parse when it is confident enough to skip Ollama"""
+    if not RULE_FAST_PATH:
+        return None
+    event_data, confident = rule_parse(utterance, stats)
+    return event_data if confident else None
+
+def _finish_llm_event(event_data: Dict[str, Any], utterance: str, key: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+    event_data = _event_from_llm_data(event_data, utterance, stats)
+    # Only model answers are cached; fallbacks would pin a worse result while Ollama is down
+    if stats.get("path") == "llm":
+        event_cache.put(key, event_data)
+    return event_data
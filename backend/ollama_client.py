@@ -0,0 +1,220 @@
+# ollama_client.py
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+
+from circuit_breaker import CircuitBreaker, OPEN
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated list of inference boxes; OLLAMA_HOST is kept for single-host setups
+OLLAMA_HOSTS = [
+    h.strip().rstrip("/")
+    for h in os.getenv("OLLAMA_HOSTS", os.getenv("OLLAMA_HOST", "http://localhost:11434")).split(",")
+    if h.strip()
+]
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "10"))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "2"))
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "30"))
+OLLAMA_FAILURE_THRESHOLD = int(os.getenv("OLLAMA_FAILURE_THRESHOLD", "3"))
+OLLAMA_RESET_TIMEOUT = float(os.getenv("OLLAMA_RESET_TIMEOUT", "30"))
+
+class OllamaUnavailable(Exception):
+    """No Ollama host is currently accepting requests"""
+
+class OllamaHost:
+    """One inference box with its own breaker and outstanding-request count"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.breaker = CircuitBreaker(f"ollama@{url}", OLLAMA_FAILURE_THRESHOLD, OLLAMA_RESET_TIMEOUT)
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "breaker": self.breaker.snapshot(),
+        }
+
+class OllamaClient:
+    """Long-lived, pooled keep-alive client for one or more Ollama hosts"""
+
+    def __init__(self, hosts: Optional[List[str]] = None, pool_size: int = OLLAMA_POOL_SIZE,
+                 connect_timeout: float = OLLAMA_CONNECT_TIMEOUT, read_timeout: float = OLLAMA_READ_TIMEOUT):
+        self.hosts = [OllamaHost(url) for url in (hosts or OLLAMA_HOSTS)]
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self._lock = threading.Lock()
+        self._rr = 0
+        self._sync: Optional[httpx.Client] = None
+        self._async: Optional[httpx.AsyncClient] = None
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        if self._sync is None:
+            self._sync = httpx.Client(timeout=self.timeout, limits=self.limits)
+        return self._sync
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async is None:
+            self._async = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._async
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        """The client timeouts, shortened to `timeout` seconds (e.g. what is left of a request budget)"""
+        if timeout is None:
+            return self.timeout
+        return httpx.Timeout(timeout, connect=min(timeout, self.timeout.connect))
+
+    def _acquire_host(self) -> OllamaHost:
+        """Least-outstanding-requests choice among hosts whose breaker lets a call through"""
+        with self._lock:
+            # Rotate the starting point so ties spread across hosts
+            self._rr = (self._rr + 1) % len(self.hosts)
+            ordered = self.hosts[self._rr:] + self.hosts[:self._rr]
+            for host in sorted(ordered, key=lambda h: h.outstanding):
+                if host.breaker.allow_request():
+                    host.outstanding += 1
+                    host.requests += 1
+                    return host
+        raise OllamaUnavailable("All Ollama hosts are unavailable")
+
+    def _release_host(self, host: OllamaHost, error: Optional[Exception] = None):
+        with self._lock:
+            host.outstanding -= 1
+            if error is not None:
+                host.errors += 1
+        if error is None:
+            host.breaker.record_success()
+        else:
+            host.breaker.record_failure(error)
+
+    @contextmanager
+    def _host(self):
+        host = self._acquire_host()
+        try:
+            yield host
+        except httpx.HTTPError as e:
+            self._release_host(host, e)
+            raise
+        except GeneratorExit:
+            # A stream closed early by the reader is a healthy call
+            self._release_host(host)
+            raise
+        except Exception as e:
+            # e.g. a malformed stream chunk: the host answered, but not usefully
+            self._release_host(host, e)
+            raise
+        except BaseException:
+            # Cancellation says nothing about the host; don't count it, and free a half-open trial
+            with self._lock:
+                host.outstanding -= 1
+            host.breaker.release_trial()
+            raise
+        else:
+            self._release_host(host)
+
+    def generate(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        with self._host() as host:
+            response = self.sync_client.post(f"{host.url}/api/generate", json=payload, timeout=self._timeout(timeout))
+            response.raise_for_status()
+            return response.json()
+
+    async def agenerate(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        with self._host() as host:
+            response = await self.async_client.post(f"{host.url}/api/generate", json=payload,
+                                                    timeout=self._timeout(timeout))
+            response.raise_for_status()
+            return response.json()
+
+    def stream_generate(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Yield Ollama's NDJSON chunks; closing the iterator drops the connection and stops generation"""
+        with self._host() as host:
+            with self.sync_client.stream("POST", f"{host.url}/api/generate", json={**payload, "stream": True},
+                                         timeout=self._timeout(timeout)) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
+
+    async def astream_generate(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        with self._host() as host:
+            async with self.async_client.stream("POST", f"{host.url}/api/generate", json={**payload, "stream": True},
+                                                timeout=self._timeout(timeout)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        yield json.loads(line)
+
+    async def awarm(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Optional[float]]:
+        """Send `payload` to every host at once; host URL -> milliseconds taken, or None if it failed"""
+        async def warm(host: OllamaHost) -> Optional[float]:
+            started = time.perf_counter()
+            try:
+                response = await self.async_client.post(f"{host.url}/api/generate", json=payload, timeout=timeout)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.warning(f"Warmup failed on {host.url}: {e}")
+                return None
+            return round((time.perf_counter() - started) * 1000, 1)
+        
+        results = await asyncio.gather(*(warm(host) for host in self.hosts))
+        return {host.url: ms for host, ms in zip(self.hosts, results)}
+
+    def probe_open_hosts(self):
+        """Hit /api/tags on hosts whose breaker is open (or stuck half-open) so they can recover without user traffic"""
+        for host in self.hosts:
+            if host.breaker.state != OPEN and not host.breaker.trial_stale():
+                continue
+            try:
+                response = self.sync_client.get(f"{host.url}/api/tags", timeout=5)
+                if response.status_code == 200:
+                    host.breaker.probe_succeeded()
+            except httpx.HTTPError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hosts": [h.stats() for h in self.hosts]}
+
+    def close(self):
+        if self._sync is not None:
+            self._sync.close()
+            self._sync = None
+
+    async def aclose(self):
+        if self._async is not None:
+            await self._async.aclose()
+            self._async = None
+        self.close()
+
+_client: Optional[OllamaClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> OllamaClient:
+    """Process-wide client, created on first use and kept for the app lifetime"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient()
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
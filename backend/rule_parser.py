@@ -0,0 +1,225 @@
+# rule_parser.py
+import re
+import functools
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_TZ = "America/New_York"
+DEFAULT_DURATION = 60
+
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
+    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8,
+    "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+WEEKDAYS = {
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
+    "friday": 4, "saturday": 5, "sunday": 6,
+}
+DURATION_AMOUNTS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "half an": 0.5, "half a": 0.5}
+
+_MONTH_ALT = "|".join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY_ALT = "|".join(WEEKDAYS)
+_PERIOD = r"a\.?\s?m\.?|p\.?\s?m\.?"
+
+# One alternation over lowercased text, scanned once left to right; the outer group
+# name is the token kind. The leading lookahead lets mid-word positions fail fast.
+_TOKEN_RE = re.compile(
+    r"(?=[a-z0-9])\b(?:"
+    rf"(?P<monthday>\b(?P<month>{_MONTH_ALT})\.?\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\b)"
+    rf"|(?P<weekday>\b(?:(?P<qualifier>next|this|on)\s+)?(?P<wday>{_WEEKDAY_ALT})\b)"
+    r"|(?P<relday>\b(?:today|tomorrow|tonight)\b)"
+    rf"|(?P<time>\bat\s+(?P<hour>\d{{1,2}})(?::(?P<minute>\d{{2}}))?\s*(?P<period>{_PERIOD})?"
+    rf"|\b(?P<bhour>\d{{1,2}})(?::(?P<bminute>\d{{2}}))?\s*(?P<bperiod>{_PERIOD})"
+    r"|\b(?:at\s+)?(?P<noon>noon|midnight)\b)"
+    r"|(?P<duration>\bfor\s+(?P<amount>\d+|half an|half a|an|a|one|two|three)\s*"
+    r"(?P<unit>hours?|hrs?|minutes?|mins?)\b)"
+    r"|(?P<complex>\b(?:every|each|daily|weekly|cancel|delete|move|reschedule|postpone|instead|"
+    r"except|unless|until|between|from)\b)"
+    r")"
+)
+_MONTH_DAY_RE = re.compile(rf"\b({_MONTH_ALT})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?\b")
+_LEADING_FILLER_RE = re.compile(
+    r"^(?:(?:please|can you|could you|hey)\s+)*"
+    r"(?:(?:schedule|book|set up|create|add|put|make|plan)\s+)?"
+    r"(?:(?:a|an|the|my)\s+)?",
+    re.IGNORECASE,
+)
+# Date, time or length wording left over after tokenizing ("the day after", "next week", "2 days before",
+# "for 1.5 hours", "3 hours", "EST"): the grammar read around it, so its date, time or length is suspect
+_LEFTOVER_DATETIME_RE = re.compile(
+    r"\b(?:after|before|next|last|week|weeks|weekend|days?|months?|years?|hours?|hrs?|minutes?|mins?"
+    r"|\d+(?:\.\d+)?|utc|gmt|[ecmp][sd]?t|eastern|central|mountain|pacific)\b"
+)
+_TRAILING_FILLER = {"on", "at", "for", "with", "and", "to", ","}
+_EMAIL_RE = re.compile(r"\S+@\S+")
+
+@functools.lru_cache(maxsize=512)
+def _month_days(text: str) -> Tuple[Tuple[int, int], ...]:
+    # Memoized: every LLM answer is validated against its utterance, which was parsed already
+    return tuple((MONTHS[m.group(1)], int(m.group(2))) for m in _MONTH_DAY_RE.finditer(text.lower()))
+
+def find_month_day(text: str, year: Optional[int] = None) -> Optional[datetime]:
+    """First valid 'September 18th'-style date in text, in the given (or current) year"""
+    pairs = _month_days(text)
+    if not pairs:
+        return None
+    year = year or datetime.now().year
+    for month, day in pairs:
+        try:
+            return datetime(year, month, day)
+        except ValueError:
+            continue
+    return None
+
+def _to_24h(hour: int, minute: int, period: str) -> Tuple[Optional[Tuple[int, int]], bool]:
+    """Return ((hour, minute), explicit) or (None, False) if the time is invalid"""
+    period = period.lower().replace(".", "").replace(" ", "")
+    explicit = bool(period) or hour >= 13 or hour == 0
+    if period == "pm" and hour < 12:
+        hour += 12
+    elif period == "am" and hour == 12:
+        hour = 0
+    # Assume afternoon for 1-7 without am/pm, as people rarely book 3am meetings
+    if not period and hour < 8:
+        hour += 12
+    if hour > 23 or minute > 59:
+        return None, False
+    return (hour, minute), explicit
+
+def _clean_title(utterance: str, spans) -> str:
+    pieces, last = [], 0
+    for start, end in spans:
+        pieces.append(utterance[last:start])
+        last = end
+    pieces.append(utterance[last:])
+    text = " ".join(pieces)
+    if "@" in text:
+        text = _EMAIL_RE.sub(" ", text)
+    text = " ".join(text.split()).strip(" ,.!?")
+    words = text[_LEADING_FILLER_RE.match(text).end():].split()
+    while words and words[-1].lower().rstrip(",") in _TRAILING_FILLER:
+        words.pop()
+    if not words:
+        return ""
+    text = " ".join(words).strip(" ,.!?")
+    if text.lower().startswith("with "):
+        text = "Meeting " + text
+    return text[0].upper() + text[1:]
+
+def parse(utterance: str, now: Optional[datetime] = None) -> Tuple[Dict[str, Any], float]:
+    """
+    Single-pass rule parse of an utterance.
+    Returns the event in extract_event's shape and a 0-1 confidence that it is complete and right.
+    Only the date of `now` matters, so parses are memoized per (utterance, day): one request
+    parses the same text up to three times (fast path, hedge, fallback). Callers get their own copy.
+    """
+    now = now or datetime.now()
+    result, confidence = _parse(utterance, now.date())
+    return {**result, "attendees": list(result["attendees"])}, confidence
+
+@functools.lru_cache(maxsize=512)
+def _parse(utterance: str, today: date) -> Tuple[Dict[str, Any], float]:
+    now = datetime(today.year, today.month, today.day)
+    result: Dict[str, Any] = {"intent": "CreateEvent", "title": "Meeting", "timezone": DEFAULT_TZ, "attendees": []}
+
+    event_date = None
+    date_explicit = False
+    time_of_day = None
+    time_explicit = False
+    duration_minutes = None
+    dates_seen = times_seen = 0
+    complex_phrase = False
+    evening = False
+    spans = []
+
+    lowered = utterance.lower()
+    if len(lowered) != len(utterance):
+        # Rare case-mapping that changes length; keep spans aligned with the text we title from
+        utterance = lowered
+
+    for m in _TOKEN_RE.finditer(lowered):
+        kind = m.lastgroup  # the outer group closes last, so this is the token kind
+        spans.append(m.span())
+        if kind == "monthday":
+            dates_seen += 1
+            if event_date is None or not date_explicit:
+                try:
+                    event_date = datetime(now.year, MONTHS[m.group("month")], int(m.group("day")))
+                    date_explicit = True
+                except ValueError:
+                    # Invalid date (e.g., February 30)
+                    dates_seen -= 1
+        elif kind == "weekday":
+            dates_seen += 1
+            if event_date is None:
+                days_ahead = (WEEKDAYS[m.group("wday")] - now.weekday()) % 7 or 7
+                event_date = now + timedelta(days=days_ahead)
+                date_explicit = True
+        elif kind == "relday":
+            dates_seen += 1
+            if event_date is None:
+                word = m.group("relday")
+                event_date = now + timedelta(days=1) if word == "tomorrow" else now
+                date_explicit = True
+                evening = word == "tonight"
+        elif kind == "time":
+            times_seen += 1
+            hour, minute, period, bhour, bminute, bperiod, noon = m.group(
+                "hour", "minute", "period", "bhour", "bminute", "bperiod", "noon")
+            if noon:
+                parsed, explicit = ((12, 0) if noon == "noon" else (0, 0)), True
+            elif hour:
+                parsed, explicit = _to_24h(int(hour), int(minute or 0), period or "")
+            else:
+                parsed, explicit = _to_24h(int(bhour), int(bminute or 0), bperiod)
+            if parsed and (time_of_day is None or not time_explicit):
+                time_of_day, time_explicit = parsed, explicit
+        elif kind == "duration":
+            amount = m.group("amount")
+            value = DURATION_AMOUNTS[amount] if amount in DURATION_AMOUNTS else int(amount)
+            unit = m.group("unit")
+            duration_minutes = int(value * 60) if unit.startswith("h") else int(value)
+        elif kind == "complex":
+            complex_phrase = True
+            # Not part of the date/time grammar; keep it in the title text
+            spans.pop()
+
+    if event_date is None:
+        # Default to today if no date specified
+        event_date = now
+    if evening:
+        # "tonight at 8" is 8 PM; "tonight" alone is an evening slot
+        if time_of_day is None:
+            time_of_day = (19, 0)
+        elif not time_explicit and time_of_day[0] < 12:
+            time_of_day = (time_of_day[0] + 12, time_of_day[1])
+
+    if time_of_day is not None:
+        start_time = event_date.replace(hour=time_of_day[0], minute=time_of_day[1], second=0, microsecond=0)
+        duration = duration_minutes or DEFAULT_DURATION
+        result["start"] = start_time.isoformat()
+        result["end"] = (start_time + timedelta(minutes=duration)).isoformat()
+        result["duration_minutes"] = duration
+
+    title = _clean_title(utterance, spans)
+    if title:
+        result["title"] = title
+        if _LEFTOVER_DATETIME_RE.search(title.lower()):
+            complex_phrase = True
+
+    confidence = 0.0
+    if date_explicit:
+        confidence += 0.3
+    if time_of_day is not None:
+        confidence += 0.3 if time_explicit else 0.15
+    if duration_minutes:
+        confidence += 0.2
+    if title:
+        confidence += 0.2 if len(title.split()) <= 8 else 0.1
+    # Anything the grammar can't fully represent is better left to the LLM
+    if complex_phrase or dates_seen > 1 or times_seen > 1:
+        confidence = min(confidence, 0.3)
+
+    return result, round(confidence, 2)
@@ -0,0 +1,231 @@
+# stt_backends.py
+import abc
+import os
+import time
+import logging
+import functools
+import threading
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+import deadlines
+import metrics
+
+logger = logging.getLogger(__name__)
+
+STT_BACKEND = os.getenv("STT_BACKEND", "google")
+LOCAL_STT_MODEL = os.getenv("LOCAL_STT_MODEL", "base.en")
+LOCAL_STT_DEVICE = os.getenv("LOCAL_STT_DEVICE", "cpu")
+LOCAL_STT_COMPUTE_TYPE = os.getenv("LOCAL_STT_COMPUTE_TYPE", "int8")
+LOCAL_STT_WORKERS = int(os.getenv("LOCAL_STT_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Split the cores between workers so processes don't oversubscribe the CPU
+LOCAL_STT_THREADS = int(os.getenv("LOCAL_STT_THREADS", str(max(1, (os.cpu_count() or 1) // LOCAL_STT_WORKERS))))
+
+class BackendUnavailable(RuntimeError):
+    """The STT backend can't run in this install (e.g. its optional package is missing)"""
+
+    def __init__(self, backend: str, reason: str):
+        super().__init__(f"STT backend '{backend}' is unavailable: {reason}")
+        self.backend = backend
+
+@functools.lru_cache(maxsize=None)
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+class STTBackend(abc.ABC):
+    """One speech-to-text engine. transcribe() blocks and runs in the STT stage pool."""
+
+    name = "base"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    @abc.abstractmethod
+    def _transcribe(self, audio: bytes, encoding: str, sample_rate: int, stats: Dict[str, Any]) -> str:
+        """Blocking transcription of one clip"""
+
+    def transcribe(self, audio: bytes, encoding: str = "WEBM_OPUS", sample_rate: int = 48000,
+                   stats: Optional[Dict[str, Any]] = None) -> str:
+        stats = stats if stats is not None else {}
+        stats["backend"] = self.name
+        started = time.perf_counter()
+        try:
+            with metrics.span(f"stt.{self.name}"):
+                return self._transcribe(audio, encoding, sample_rate, stats)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.calls += 1
+                self.total_ms += elapsed
+
+    def warm(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+            }
+
+class GoogleBackend(STTBackend):
+    """Google Speech-to-Text through stt_live's pooled clients"""
+
+    name = "google"
+
+    def _transcribe(self, audio, encoding, sample_rate, stats):
+        from stt_live import transcribe_audio_file
+        return transcribe_audio_file(audio, stats, encoding, sample_rate)
+
+    def warm(self) -> bool:
+        from stt_live import speech_pool
+        return speech_pool.warm()
+
+    def stats(self) -> Dict[str, Any]:
+        from stt_live import stt_status
+        return {**super().stats(), "clients": stt_status()}
+
+# Set once per worker process by _init_worker
+_worker_model = None
+
+def _init_worker(model_name: str, device: str, compute_type: str, cpu_threads: int):
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+def _worker_ping() -> int:
+    return os.getpid()
+
+def _worker_transcribe(audio: bytes, encoding: str, sample_rate: int) -> Dict[str, Any]:
+    import io
+    import numpy as np
+    from audio_preprocess import TARGET_RATE, resample
+
+    started = time.perf_counter()
+    if encoding == "LINEAR16":
+        source = np.frombuffer(audio, dtype="<i2").astype(np.float32) / 32768
+        if sample_rate != TARGET_RATE:
+            source = resample(source, sample_rate, TARGET_RATE)
+    else:
+        # faster-whisper decodes containers (WebM/Opus, WAV, ...) itself
+        source = io.BytesIO(audio)
+    segments, info = _worker_model.transcribe(source, language="en", beam_size=1, vad_filter=False)
+    text = " ".join(segment.text.strip() for segment in segments)
+    return {
+        "transcript": text.strip(),
+        "audio_seconds": round(info.duration, 2),
+        "decode_ms": round((time.perf_counter() - started) * 1000, 1),
+        "pid": os.getpid(),
+    }
+
+class LocalWhisperBackend(STTBackend):
+    """
+    faster-whisper in a process pool: each worker loads the model once, and decoding
+    spreads across cores outside the GIL. Requires `pip install faster-whisper`;
+    without it, transcribe() raises BackendUnavailable instead of breaking the pool.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name: str = LOCAL_STT_MODEL, workers: int = LOCAL_STT_WORKERS):
+        super().__init__()
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn, not fork: the parent holds gRPC/httpx threads that don't survive a fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, LOCAL_STT_DEVICE, LOCAL_STT_COMPUTE_TYPE, LOCAL_STT_THREADS),
+                )
+            return self._executor
+
+    def _check_installed(self):
+        if not _installed("faster_whisper"):
+            raise BackendUnavailable(self.name, "faster-whisper is not installed (pip install faster-whisper)")
+
+    def _transcribe(self, audio, encoding, sample_rate, stats):
+        self._check_installed()
+        timeout = deadlines.timeout_for("stt", None)
+        future = self.executor.submit(_worker_transcribe, audio, encoding.upper(), sample_rate)
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            # Out of request budget; a decode that already started runs to completion unobserved
+            future.cancel()
+            raise deadlines.overrun("stt") from None
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool for the next request
+            logger.error("Local STT worker pool broke, restarting it")
+            self.close()
+            raise
+        stats["local_decode_ms"] = result["decode_ms"]
+        stats["audio_seconds"] = result["audio_seconds"]
+        return result["transcript"]
+
+    def warm(self) -> bool:
+        """Start the workers so each loads its model before the first request"""
+        try:
+            self._check_installed()
+            pids = {f.result() for f in [self.executor.submit(_worker_ping) for _ in range(self.workers)]}
+            logger.info(f"Local STT warmed: {self.model_name} in {len(pids)} worker(s)")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not warm local STT backend: {e}")
+            return False
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "model": self.model_name, "workers": self.workers,
+                "started": self._executor is not None}
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "local": LocalWhisperBackend,
+}
+
+_instances: Dict[str, STTBackend] = {}
+_instances_lock = threading.Lock()
+
+def get_backend(name: Optional[str] = None) -> STTBackend:
+    """The shared instance of a backend by name (STT_BACKEND when not given)"""
+    name = (name or STT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown STT backend '{name}' (choose from {', '.join(BACKENDS)})")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
+
+def backend_stats() -> Dict[str, Any]:
+    return {name: backend.stats() for name, backend in list(_instances.items())}
+
+def close_backends():
+    for backend in list(_instances.values()):
+        backend.close()
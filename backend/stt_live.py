@@ -1,50 +1,237 @@
 # stt_live.py (DIRECT WEBM VERSION - may not work as well)
+import abc
 import io
 import os
+import time
+import queue
+import asyncio
+import logging
+import functools
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
+import grpc
+from google.api_core import exceptions as google_exceptions
 from google.cloud import speech
+from google.cloud.speech_v1.services.speech.transports import SpeechGrpcTransport
 
-def transcribe_audio_file(file_path):
-    """Transcribe an audio file using Google Speech-to-Text"""
-    try:
-        print(f"🔊 Attempting to transcribe: {file_path}")
-        
-        client = speech.SpeechClient()
-        print("✅ Google Speech client created")
-        
-        with io.open(file_path, "rb") as audio_file:
+import deadlines
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Synchronous recognize accepts at most 10 MB of inline audio
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+DEFAULT_BOOST_PHRASES = [
+    "meeting", "appointment", "calendar", "schedule", "book",
+    "Monday", "Tuesday", "Wednesday", "Thursday", "Friday",
+    "Saturday", "Sunday", "January", "February", "March", 
+    "April", "May", "June", "July", "August", "September", 
+    "October", "November", "December", "AM", "PM", "o'clock", 
+    "hour", "minute", "tomorrow", "next week", "today", "at",
+    "for", "with", "Brenda", "John", "team", "lunch", "dinner"
+]
+BOOST = float(os.getenv("STT_BOOST", "20"))
+# Per deployment: a comma-separated list, or a file with one phrase per line
+BOOST_PHRASES_ENV = os.getenv("STT_BOOST_PHRASES", "")
+BOOST_PHRASES_FILE = os.getenv("STT_BOOST_PHRASES_FILE", "")
+
+# Alternate Speech endpoint (host:port), e.g. a local fake server; STT_INSECURE=1 skips TLS and auth
+STT_ENDPOINT = os.getenv("STT_ENDPOINT", "")
+STT_INSECURE = os.getenv("STT_INSECURE", "0") == "1"
+STT_CLIENTS = int(os.getenv("STT_CLIENTS", "2"))
+STT_CONNECT_TIMEOUT = float(os.getenv("STT_CONNECT_TIMEOUT", "10"))
+# Longest a recognize call may take; a request budget (see deadlines) can shorten it
+STT_RECOGNIZE_TIMEOUT = float(os.getenv("STT_RECOGNIZE_TIMEOUT", "30"))
+
+def load_boost_phrases() -> List[str]:
+    """Phrases from STT_BOOST_PHRASES_FILE or STT_BOOST_PHRASES, else the built-in calendar vocabulary"""
+    if BOOST_PHRASES_FILE:
+        with open(BOOST_PHRASES_FILE, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if BOOST_PHRASES_ENV:
+        return [p.strip() for p in BOOST_PHRASES_ENV.split(",") if p.strip()]
+    return list(DEFAULT_BOOST_PHRASES)
+
+BOOST_PHRASES = load_boost_phrases()
+
+AudioSource = Union[str, os.PathLike, bytes, bytearray, memoryview, io.IOBase]
+
+class AudioTooLarge(ValueError):
+    """Audio past MAX_AUDIO_BYTES; raised as soon as the running total crosses it"""
+
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"Audio exceeds {limit} bytes (got at least {size})")
+        self.size = size
+        self.limit = limit
+
+def _count(stats: Optional[Dict[str, Any]], key: str, amount: int = 1):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + amount
+
+async def collect_audio(chunks: AsyncIterator[bytes], max_bytes: int = MAX_AUDIO_BYTES,
+                        stats: Optional[Dict[str, Any]] = None) -> bytes:
+    """Gather an async chunk stream into one bytes object, rejecting it once it passes max_bytes"""
+    started = time.perf_counter()
+    parts, total = [], 0
+    async for chunk in chunks:
+        total += len(chunk)
+        if total > max_bytes:
+            raise AudioTooLarge(total, max_bytes)
+        parts.append(chunk)
+        _count(stats, "chunks")
+    # The join is the only copy; a single chunk is passed through as is
+    content = parts[0] if len(parts) == 1 else b"".join(parts)
+    if len(parts) > 1:
+        _count(stats, "copies")
+    if stats is not None:
+        stats["bytes"] = total
+        stats["read_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return content
+
+def _audio_content(source: AudioSource, stats: Optional[Dict[str, Any]] = None) -> bytes:
+    """Bytes for RecognitionAudio, copying only when the source is not already bytes"""
+    if isinstance(source, bytes):
+        content = source
+    elif isinstance(source, (bytearray, memoryview)):
+        # The request proto needs immutable bytes, so this costs one copy
+        content = bytes(source)
+        _count(stats, "copies")
+    elif isinstance(source, (str, os.PathLike)):
+        with io.open(source, "rb") as audio_file:
             content = audio_file.read()
+        _count(stats, "copies")
+    else:
+        content = source.read()
+        _count(stats, "copies")
+    if len(content) > MAX_AUDIO_BYTES:
+        raise AudioTooLarge(len(content), MAX_AUDIO_BYTES)
+    if stats is not None:
+        stats.setdefault("bytes", len(content))
+    return content
+
+@functools.lru_cache(maxsize=None)
+def _build_config(encoding: str, sample_rate: int) -> speech.RecognitionConfig:
+    return speech.RecognitionConfig(
+        encoding=speech.RecognitionConfig.AudioEncoding[encoding],
+        sample_rate_hertz=sample_rate,  # WebM/Opus typically uses 48kHz
+        language_code="en-US",
+        enable_automatic_punctuation=True,
+        model="video",
+        use_enhanced=True,
+        audio_channel_count=1,
+        enable_word_time_offsets=False,
+        enable_word_confidence=True,
+        speech_contexts=[{"phrases": BOOST_PHRASES, "boost": BOOST}]
+    )
+
+def recognition_config(encoding: str = "WEBM_OPUS", sample_rate: int = 48000) -> speech.RecognitionConfig:
+    """
+    Recognition settings shared by one-shot and streaming recognition, built once per
+    (encoding, sample rate). The returned message is shared; don't mutate it.
+    """
+    return _build_config(encoding.upper(), sample_rate)
+
+@functools.lru_cache(maxsize=None)
+def _build_streaming_config(encoding: str, sample_rate: int) -> speech.StreamingRecognitionConfig:
+    return speech.StreamingRecognitionConfig(config=_build_config(encoding, sample_rate), interim_results=True)
+
+class SpeechClientPool:
+    """Long-lived SpeechClients, each with its own gRPC channel, handed out round-robin"""
+
+    def __init__(self, size: int = STT_CLIENTS):
+        self.size = max(1, size)
+        self._lock = threading.Lock()
+        self._clients: List[speech.SpeechClient] = []
+        self._ready: set = set()  # ids of clients whose channel has connected
+        self._next = 0
+        self.builds = 0
+        self.warmed = False
+
+    def _new_client(self) -> speech.SpeechClient:
+        if STT_ENDPOINT and STT_INSECURE:
+            channel = grpc.insecure_channel(STT_ENDPOINT)
+            return speech.SpeechClient(transport=SpeechGrpcTransport(channel=channel))
+        return speech.SpeechClient(client_options={"api_endpoint": STT_ENDPOINT} if STT_ENDPOINT else None)
+
+    def get(self) -> speech.SpeechClient:
+        with self._lock:
+            if len(self._clients) < self.size:
+                client = self._new_client()
+                self._clients.append(client)
+                self.builds += 1
+                return client
+            client = self._clients[self._next % self.size]
+            self._next += 1
+            return client
+
+    def connect(self, client: speech.SpeechClient, timeout: float = STT_CONNECT_TIMEOUT):
+        """Block until the client's channel is connected; free once it has been"""
+        if id(client) in self._ready:
+            return
+        grpc.channel_ready_future(client.transport.grpc_channel).result(timeout=timeout)
+        self._ready.add(id(client))
+
+    def warm(self) -> bool:
+        """Build every client and connect its channel (TLS, auth) ahead of the first request"""
+        try:
+            for _ in range(self.size):
+                self.connect(self.get())
+            self.warmed = True
+            logger.info(f"Speech client pool warmed ({self.size} channels)")
+        except Exception as e:
+            logger.warning(f"Could not warm Speech clients: {e}")
+        return self.warmed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "size": self.size,
+                "connected": len(self._ready),
+                "builds": self.builds,
+                "warmed": self.warmed,
+                "configs": _build_config.cache_info().currsize,
+                "boost_phrases": len(BOOST_PHRASES),
+            }
+
+speech_pool = SpeechClientPool()
+
+def stt_status() -> Dict[str, Any]:
+    return speech_pool.stats()
+
+def transcribe_audio_file(source: AudioSource, stats: Optional[Dict[str, Any]] = None,
+                          encoding: str = "WEBM_OPUS", sample_rate: int = 48000):
+    """Transcribe audio using Google Speech-to-Text; source is a path, bytes-like object or readable buffer"""
+    file_path = os.fspath(source) if isinstance(source, (str, os.PathLike)) else ""
+    try:
+        print(f"🔊 Attempting to transcribe: {file_path or type(source).__name__}")
         
-        print(f"📖 Read {len(content)} bytes from audio file")
+        content = _audio_content(source, stats)
+        print(f"📖 Read {len(content)} bytes of audio")
+        timings = stats if stats is not None else {}
         
-        audio = speech.RecognitionAudio(content=content)
+        # Connect: a pooled client; only a cold channel waits here for TLS/auth
+        with metrics.span("stt.connect") as phase:
+            client = speech_pool.get()
+            speech_pool.connect(client, deadlines.timeout_for("stt", STT_CONNECT_TIMEOUT))
+        timings["connect_ms"] = phase.ms
         
-        # Try to use WebM_OPUS encoding directly
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
-            sample_rate_hertz=48000,  # WebM/Opus typically uses 48kHz
-            language_code="en-US",
-            enable_automatic_punctuation=True,
-            model="video",
-            use_enhanced=True,
-            audio_channel_count=1,
-            enable_word_time_offsets=False,
-            enable_word_confidence=True,
-            speech_contexts=[{
-                "phrases": [
-                    "meeting", "appointment", "calendar", "schedule", "book",
-                    "Monday", "Tuesday", "Wednesday", "Thursday", "Friday",
-                    "Saturday", "Sunday", "January", "February", "March", 
-                    "April", "May", "June", "July", "August", "September", 
-                    "October", "November", "December", "AM", "PM", "o'clock", 
-                    "hour", "minute", "tomorrow", "next week", "today", "at",
-                    "for", "with", "Brenda", "John", "team", "lunch", "dinner"
-                ],
-                "boost": 20.0
-            }]
-        )
+        # Upload: building the request message around the audio (the wire transfer rides on the RPC)
+        with metrics.span("stt.upload") as phase:
+            request = speech.RecognizeRequest(config=recognition_config(encoding, sample_rate), audio=speech.RecognitionAudio(content=content))
+        timings["upload_ms"] = phase.ms
         
         print("🚀 Sending request to Google Speech-to-Text...")
-        response = client.recognize(config=config, audio=audio)
+        with metrics.span("stt.recognize") as phase:
+            try:
+                response = client.recognize(request=request, timeout=deadlines.timeout_for("stt", STT_RECOGNIZE_TIMEOUT))
+            except google_exceptions.DeadlineExceeded:
+                # Cut short by the request budget rather than Speech's own limit
+                deadlines.check("stt")
+                raise
+        timings["recognize_ms"] = phase.ms
         print("✅ Received response from Google Speech-to-Text")
         
         # Get the most confident result
@@ -64,9 +251,118 @@ def transcribe_audio_file(file_path):
             
         return transcript.strip()
         
+    except (AudioTooLarge, deadlines.DeadlineExceeded):
+        raise
     except Exception as e:
         print(f"❌ Google Speech-to-Text failed: {str(e)}")
         # Fallback to a simulated response for testing
         if "book a meeting with brenda" in file_path.lower() or "brenda" in file_path.lower():
             return "Book a meeting with Brenda next Tuesday at 1 PM for 3 hours"
-        return "Simulated transcript: Meeting with team tomorrow at 2 PM"
\ No newline at end of file
+        return "Simulated transcript: Meeting with team tomorrow at 2 PM"
+
+STREAMING_BACKEND = os.getenv("STT_STREAMING_BACKEND", "google")
+FAKE_TRANSCRIPT = os.getenv("STT_FAKE_TRANSCRIPT", "Book a meeting with Brenda next Tuesday at 1 PM for 3 hours")
+
+class StreamingRecognizer(abc.ABC):
+    """
+    Bridges a blocking streaming recognizer to asyncio: feed() audio frames in,
+    iterate updates() for {"transcript", "is_final", "stability"} dicts.
+    run() blocks for the whole session and belongs in the STT worker pool.
+    """
+
+    def __init__(self):
+        self._audio: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._updates: asyncio.Queue = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        self.bytes_received = 0
+
+    def feed(self, chunk: bytes):
+        self.bytes_received += len(chunk)
+        self._audio.put(chunk)
+
+    def close(self):
+        """End of audio; the recognizer flushes its final result and stops"""
+        self._audio.put(None)
+
+    def _chunks(self) -> Iterator[bytes]:
+        while True:
+            chunk = self._audio.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    @abc.abstractmethod
+    def _recognize(self, chunks: Iterator[bytes]) -> Iterator[Dict[str, Any]]:
+        """Blocking recognition of the fed audio, yielding update dicts as results arrive"""
+
+    def _emit(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self._updates.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed; nobody is listening
+            pass
+
+    def abort(self, error: Exception):
+        """Fail updates() with error, e.g. when run() never got a worker"""
+        self._emit(error)
+        self._emit(None)
+
+    def run(self):
+        try:
+            for update in self._recognize(self._chunks()):
+                self._emit(update)
+        except Exception as e:
+            self._emit(e)
+        finally:
+            self._emit(None)
+
+    async def updates(self):
+        while True:
+            item = await self._updates.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+class GoogleStreamingRecognizer(StreamingRecognizer):
+    """Google Speech-to-Text streaming_recognize with interim results"""
+
+    def __init__(self, encoding: str = "WEBM_OPUS", sample_rate: int = 48000):
+        super().__init__()
+        self.streaming_config = _build_streaming_config(encoding.upper(), sample_rate)
+
+    def _recognize(self, chunks):
+        client = speech_pool.get()
+        requests = (speech.StreamingRecognizeRequest(audio_content=chunk) for chunk in chunks)
+        for response in client.streaming_recognize(config=self.streaming_config, requests=requests):
+            for result in response.results:
+                if not result.alternatives:
+                    continue
+                yield {
+                    "transcript": result.alternatives[0].transcript.strip(),
+                    "is_final": result.is_final,
+                    "stability": 1.0 if result.is_final else result.stability,
+                }
+
+class FakeStreamingRecognizer(StreamingRecognizer):
+    """Reveals one more word of a fixed transcript per audio frame; for local runs and tests"""
+
+    def __init__(self, transcript: str = FAKE_TRANSCRIPT, stability: float = 0.9):
+        super().__init__()
+        self.words = transcript.split()
+        self.stability = stability
+
+    def _recognize(self, chunks):
+        shown = 0
+        for _ in chunks:
+            if shown < len(self.words):
+                shown += 1
+                yield {"transcript": " ".join(self.words[:shown]), "is_final": False, "stability": self.stability}
+        yield {"transcript": " ".join(self.words), "is_final": True, "stability": 1.0}
+
+def open_streaming_recognizer(encoding: str = "WEBM_OPUS", sample_rate: int = 48000) -> StreamingRecognizer:
+    """Recognizer for one live session, chosen by STT_STREAMING_BACKEND (google or fake)"""
+    if STREAMING_BACKEND == "fake":
+        return FakeStreamingRecognizer()
+    return GoogleStreamingRecognizer(encoding, sample_rate)
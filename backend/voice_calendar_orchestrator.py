@@ -1,13 +1,23 @@
 # voice_calendar_orchestrator.py
 import os
+import sys
+import time
+import asyncio
+import argparse
 import importlib
 import json
 import requests
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
+import deadlines
+import metrics
+
 CONFIG = {
-    "NLU_URL": "http://localhost:8000/extract",
+    "NLU_URL": "http://localhost:8000/process-text",
+    # "http" posts to NLU_URL; "inprocess" calls nlu_service directly (no server needed)
+    "NLU_MODE": os.getenv("ORCHESTRATOR_NLU", "http"),
     "ASR_MODULE": "stt_live",
     "ASR_FUNC": "transcribe_once",
     "GCAL_CREATE_MODULE": "calendar_booker",
@@ -18,10 +28,22 @@ CONFIG = {
     "GCAL_CANCEL_FUNC": "cancel_event",
     "GCAL_CONFLICTS_MODULE": "calendar_booker",
     "GCAL_CONFLICTS_FUNC": "query_conflicts",
+    "GCAL_FREE_SLOTS_MODULE": "calendar_booker",
+    "GCAL_FREE_SLOTS_FUNC": "find_free_slots",
+    "ALTERNATIVE_SEARCH_DAYS": 3,
+    # Daemon mode: commands waiting between stages, and NLU workers. Calendar work always has a
+    # single worker: "create X" then "move X" must reach the calendar in the order they were said
+    "PIPELINE_DEPTH": int(os.getenv("ORCHESTRATOR_PIPELINE_DEPTH", "4")),
+    "NLU_WORKERS": int(os.getenv("ORCHESTRATOR_NLU_WORKERS", "2")),
     "USER_TZ": "America/New_York",
+    # Seconds from a transcript to its extracted event; the NLU server is asked to finish within what is left
+    "NLU_BUDGET": float(os.getenv("ORCHESTRATOR_NLU_BUDGET_MS", str(deadlines.REQUEST_BUDGET_MS))) / 1000,
+    "NLU_TIMEOUT": 20,
 }
 
+@lru_cache(maxsize=None)
 def _load_callable(module_name: str, func_name: str):
+    """Resolved once per process; a failed load is remembered (and warned about) once too"""
     try:
         mod = importlib.import_module(module_name)
         return getattr(mod, func_name)
@@ -33,14 +55,40 @@ def asr_transcribe_once() -> str:
     fn = _load_callable(CONFIG["ASR_MODULE"], CONFIG["ASR_FUNC"])
     return fn() if fn else input("🧑 Type command: ")
 
+# Keeps the connection to the NLU server alive across commands
+_session = requests.Session()
+
+def _default_nlu() -> Dict[str, Any]:
+    return {"intent":"CreateEvent","title":"Meeting","duration_minutes":30,"timezone":CONFIG["USER_TZ"]}
+
+def _nlu_event(data: Dict[str, Any]) -> Dict[str, Any]:
+    """The event out of a /process-text response"""
+    if not data.get("success"):
+        raise RuntimeError(data.get("error") or "NLU returned no event")
+    return data["event"]
+
+def _budget_headers() -> Dict[str, str]:
+    """Pass what is left of the budget on, so the server gives up no later than we do"""
+    left = deadlines.remaining()
+    return {} if left is None else {deadlines.BUDGET_HEADER: str(max(1, int(left * 1000)))}
+
 def nlu_extract_http(utterance: str) -> Dict[str, Any]:
     try:
-        r = requests.post(CONFIG["NLU_URL"], json={"utterance": utterance}, timeout=20)
+        r = _session.post(CONFIG["NLU_URL"], json={"utterance": utterance}, headers=_budget_headers(),
+                          timeout=deadlines.timeout_for("nlu", CONFIG["NLU_TIMEOUT"]))
         r.raise_for_status()
-        return r.json()
+        return _nlu_event(r.json())
     except Exception as e:
         print(f"[error] NLU failed: {e}")
-        return {"intent":"CreateEvent","title":"Meeting","duration_minutes":30,"timezone":CONFIG["USER_TZ"]}
+        return _default_nlu()
+
+def nlu_extract(utterance: str) -> Dict[str, Any]:
+    with deadlines.budget(CONFIG["NLU_BUDGET"]):
+        if CONFIG["NLU_MODE"] == "inprocess":
+            extract = _load_callable("nlu_service", "extract_event")
+            if extract is not None:
+                return extract(utterance)
+        return nlu_extract_http(utterance)
 
 def gcal_create(body: Dict[str, Any]) -> Dict[str, Any]:
     func = _load_callable(CONFIG["GCAL_CREATE_MODULE"], CONFIG["GCAL_CREATE_FUNC"])
@@ -50,6 +98,36 @@ def gcal_conflicts(start: str, end: str) -> List[Dict[str, Any]]:
     func = _load_callable(CONFIG["GCAL_CONFLICTS_MODULE"], CONFIG["GCAL_CONFLICTS_FUNC"])
     return func(start, end) if func else []
 
+def gcal_free_slots(duration: int, window_start: str, window_end: str, preferred: str) -> List[Dict[str, Any]]:
+    func = _load_callable(CONFIG["GCAL_FREE_SLOTS_MODULE"], CONFIG["GCAL_FREE_SLOTS_FUNC"])
+    return func(duration, (window_start, window_end), preferred=preferred) if func else []
+
+def offer_alternatives(start: str, end: str, interactive: bool = True) -> Optional[Dict[str, str]]:
+    """Free slots of the same length near the requested time; returns the one the user picks"""
+    try:
+        start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+        duration = int((datetime.fromisoformat(end.replace('Z', '+00:00')) - start_dt).total_seconds() // 60)
+        window_end = start_dt + timedelta(days=CONFIG["ALTERNATIVE_SEARCH_DAYS"])
+        # From the start of the requested day, but never offer a time that has already passed
+        window_start = max(start_dt.replace(hour=0, minute=0, second=0, microsecond=0),
+                           datetime.now(start_dt.tzinfo).replace(microsecond=0))
+        slots = gcal_free_slots(duration, window_start.isoformat(), window_end.isoformat(), start)
+    except Exception as e:
+        print(f"⚠️  Could not look for free slots: {e}")
+        return None
+    if not slots:
+        print("   No free slots found nearby")
+        return None
+    print("🗓️  Free instead:")
+    for slot in slots:
+        print(f"   {slot['rank']}. {slot['start']} → {slot['end']}")
+    if not interactive:
+        return None
+    choice = input("   Pick a slot number, or press Enter to keep the original time: ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(slots):
+        return slots[int(choice) - 1]
+    return None
+
 def compute_end(start_iso: str, dur: int) -> str:
     try:
         dt = datetime.fromisoformat(start_iso.replace('Z', '+00:00'))
@@ -92,7 +170,10 @@ def handle_once():
     utterance = asr_transcribe_once()
     print(f"🗣️  Heard: {utterance}")
     
-    nlu = nlu_extract_http(utterance)
+    handle_command(nlu_extract(utterance))
+
+def handle_command(nlu: Dict[str, Any], interactive: bool = True):
+    """Act on one extracted command; without `interactive`, alternatives are listed but not chosen"""
     intent = nlu.get("intent", "Unknown")
     print(f"🎯 Extracted intent: {intent}")
     print(f"📋 NLU data: {json.dumps(nlu, indent=2)}")
@@ -127,6 +208,12 @@ def handle_once():
                 for conflict in conflicts:
                     print(f"   - {conflict.get('summary', 'Unnamed event')} "
                           f"({conflict.get('start', {}).get('dateTime', conflict.get('start', {}).get('date', 'Unknown'))})")
+                if "T" in start:
+                    slot = offer_alternatives(start, end, interactive)
+                    if slot:
+                        start, end = slot["start"], slot["end"]
+                        payload = to_gcal_event(nlu, start, end)
+                        print(f"📅 Moved to {start} → {end}")
         except Exception as e:
             print(f"⚠️  Could not check for conflicts: {e}")
         
@@ -151,5 +238,150 @@ def handle_once():
     else:
         print(f"🤷 Unhandled intent: {intent}")
 
+# --- Daemon mode: capture, NLU and calendar run as overlapping stages ---
+
+STOP_WORDS = {"exit", "quit", "stop"}
+
+async def _put(queue: asyncio.Queue, stage: str, item: Dict[str, Any]):
+    item["enqueued"] = time.perf_counter()
+    await queue.put(item)
+    metrics.registry.set_gauge("orchestrator_queue_depth", queue.qsize(), stage=stage)
+
+async def _get(queue: asyncio.Queue, stage: str) -> Dict[str, Any]:
+    item = await queue.get()
+    metrics.registry.set_gauge("orchestrator_queue_depth", queue.qsize(), stage=stage)
+    metrics.observe(f"orchestrator.{stage}.queue_wait", time.perf_counter() - item["enqueued"])
+    return item
+
+class _InOrder:
+    """Hands NLU results to the calendar queue in capture order; a fast rule parse waits for earlier commands"""
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+        self.next_seq = 1
+        self.ready: Dict[int, Dict[str, Any]] = {}
+        self.lock = asyncio.Lock()
+
+    async def put(self, item: Dict[str, Any]):
+        self.ready[item["seq"]] = item
+        async with self.lock:
+            while self.next_seq in self.ready:
+                await _put(self.queue, "calendar", self.ready.pop(self.next_seq))
+                self.next_seq += 1
+
+def _nlu_extractor(client):
+    """Resolve the NLU call once: nlu_service in this process, or the pooled HTTP client"""
+    if CONFIG["NLU_MODE"] == "inprocess":
+        extract = _load_callable("nlu_service", "extract_event_async")
+        if extract is not None:
+            return extract
+        print("[warn] in-process NLU unavailable, using NLU_URL")
+    
+    async def extract_http(utterance: str) -> Dict[str, Any]:
+        r = await client.post(CONFIG["NLU_URL"], json={"utterance": utterance}, headers=_budget_headers(),
+                              timeout=deadlines.timeout_for("nlu", CONFIG["NLU_TIMEOUT"]))
+        r.raise_for_status()
+        return _nlu_event(r.json())
+    return extract_http
+
+async def _capture_stage(nlu_queue: asyncio.Queue):
+    # The capture callable blocks (microphone or stdin), so it runs in a thread
+    capture = _load_callable(CONFIG["ASR_MODULE"], CONFIG["ASR_FUNC"]) or (lambda: input("🧑 Type command: "))
+    seq = 0
+    while True:
+        try:
+            with metrics.span("orchestrator.capture"):
+                utterance = await asyncio.to_thread(capture)
+        except EOFError:
+            return
+        utterance = (utterance or "").strip()
+        if not utterance:
+            continue
+        if utterance.lower() in STOP_WORDS:
+            return
+        seq += 1
+        print(f"🗣️  [{seq}] Heard: {utterance}")
+        # Blocks when NLU is PIPELINE_DEPTH commands behind, which throttles capture
+        await _put(nlu_queue, "nlu", {"seq": seq, "utterance": utterance})
+
+async def _nlu_stage(extract, nlu_queue: asyncio.Queue, calendar_queue: _InOrder):
+    while True:
+        item = await _get(nlu_queue, "nlu")
+        try:
+            with metrics.span("orchestrator.nlu"), deadlines.budget(CONFIG["NLU_BUDGET"]):
+                item["nlu"] = await extract(item["utterance"])
+        except Exception as e:
+            print(f"[error] [{item['seq']}] NLU failed: {e}")
+            item["nlu"] = _default_nlu()
+        await calendar_queue.put(item)
+        # Only now: nlu_queue.join() must not return while the item is between the two queues.
+        # An item held for an earlier one is released by that one's worker before its task_done
+        nlu_queue.task_done()
+
+async def _calendar_stage(calendar_queue: asyncio.Queue):
+    while True:
+        item = await _get(calendar_queue, "calendar")
+        try:
+            print(f"🎯 [{item['seq']}] {item['utterance']}")
+            # Calendar calls block; the prompt for alternatives would fight capture for stdin
+            with metrics.span("orchestrator.calendar"):
+                await asyncio.to_thread(handle_command, item["nlu"], False)
+        except Exception as e:
+            print(f"❌ [{item['seq']}] Failed: {e}")
+        finally:
+            calendar_queue.task_done()
+
+def _print_stage_summary():
+    summary = metrics.registry.summary("stage_seconds")
+    rows = {key: value for key, value in summary.items() if "orchestrator." in key}
+    if not rows:
+        return
+    print("\n📊 Stage latency (ms):")
+    for key, value in sorted(rows.items()):
+        print(f"   {key.split('=', 1)[-1]:<36} n={value['count']:<4} p50={value['p50'] * 1000:8.1f} "
+              f"p95={value['p95'] * 1000:8.1f}")
+
+async def run_daemon():
+    """
+    Handle commands until EOF or a stop word. Capture of the next utterance overlaps
+    NLU and calendar work for earlier ones; bounded queues between stages apply backpressure.
+    """
+    import httpx
+    
+    nlu_queue: asyncio.Queue = asyncio.Queue(maxsize=CONFIG["PIPELINE_DEPTH"])
+    calendar_queue: asyncio.Queue = asyncio.Queue(maxsize=CONFIG["PIPELINE_DEPTH"])
+    async with httpx.AsyncClient(timeout=CONFIG["NLU_TIMEOUT"]) as client:
+        extract = _nlu_extractor(client)
+        # Resolve the calendar callables before the first command needs them
+        for stage in ("CREATE", "CONFLICTS", "FREE_SLOTS"):
+            _load_callable(CONFIG[f"GCAL_{stage}_MODULE"], CONFIG[f"GCAL_{stage}_FUNC"])
+        
+        in_order = _InOrder(calendar_queue)
+        workers = [asyncio.create_task(_nlu_stage(extract, nlu_queue, in_order))
+                   for _ in range(max(1, CONFIG["NLU_WORKERS"]))]
+        workers.append(asyncio.create_task(_calendar_stage(calendar_queue)))
+        print("🎤 Listening for voice commands (type 'exit' to stop)...")
+        try:
+            await _capture_stage(nlu_queue)
+            # Finish everything already captured before stopping
+            await nlu_queue.join()
+            await calendar_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    _print_stage_summary()
+
 if __name__ == "__main__":
-    handle_once()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Voice calendar orchestrator")
+    parser.add_argument("--daemon", action="store_true", help="keep handling commands, pipelined")
+    parser.add_argument("--nlu", choices=("http", "inprocess"), default=CONFIG["NLU_MODE"])
+    args = parser.parse_args()
+    CONFIG["NLU_MODE"] = args.nlu
+    if args.daemon:
+        try:
+            asyncio.run(run_daemon())
+        except KeyboardInterrupt:
+            sys.exit(130)
+    else:
+        handle_once()
\ No newline at end of file
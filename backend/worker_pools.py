@@ -0,0 +1,166 @@
+# worker_pools.py
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import deadlines
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-stage limits: workers = concurrent calls, queue = calls allowed to wait for a worker
+POOL_CONFIG = {
+    "stt": {
+        "workers": int(os.getenv("STT_WORKERS", "4")),
+        "queue": int(os.getenv("STT_QUEUE", "16")),
+    },
+    # Live WebSocket sessions hold a worker for their whole length; kept apart so they can't starve "stt"
+    "stt_stream": {
+        "workers": int(os.getenv("STT_STREAM_WORKERS", "4")),
+        "queue": int(os.getenv("STT_STREAM_QUEUE", "0")),
+    },
+    "nlu": {
+        "workers": int(os.getenv("NLU_WORKERS", "4")),
+        "queue": int(os.getenv("NLU_QUEUE", "32")),
+    },
+    "calendar": {
+        "workers": int(os.getenv("CALENDAR_WORKERS", "8")),
+        "queue": int(os.getenv("CALENDAR_QUEUE", "32")),
+    },
+}
+
+metrics.registry.describe("pool_running", "Calls running in a stage pool")
+metrics.registry.describe("pool_queued", "Calls admitted to a stage pool and waiting for a worker")
+metrics.registry.describe("pool_rejected_total", "Calls shed because a stage pool was full")
+
+class PoolSaturated(Exception):
+    """Raised when a stage already has its workers busy and its queue full"""
+
+    def __init__(self, stage: str, retry_after: int = 1):
+        super().__init__(f"{stage} stage is at capacity, try again shortly")
+        self.stage = stage
+        self.retry_after = retry_after
+
+class StagePool:
+    """Bounded thread pool for one blocking stage (STT, NLU or calendar)"""
+
+    def __init__(self, name: str, workers: int, queue: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_queue = max(0, queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{name}-worker")
+        self._lock = threading.Lock()
+        self._admitted = 0  # running + waiting
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _admit(self):
+        with self._lock:
+            if self._admitted >= self.workers + self.max_queue:
+                self._rejected += 1
+                metrics.registry.inc("pool_rejected_total", stage=self.name)
+                logger.warning(f"{self.name} pool saturated ({self._admitted} admitted), shedding request")
+                raise PoolSaturated(self.name)
+            self._admitted += 1
+
+    def _release(self):
+        with self._lock:
+            self._admitted -= 1
+
+    def _record_start(self, enqueued_at: float):
+        waited = time.perf_counter() - enqueued_at
+        metrics.observe(f"{self.name}.queue_wait", waited)
+        with self._lock:
+            self._running += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+    def _record_finish(self):
+        with self._lock:
+            self._running -= 1
+            self._completed += 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn in this stage's pool, or raise PoolSaturated without waiting"""
+        self._admit()
+        enqueued_at = time.perf_counter()
+
+        def _task():
+            self._record_start(enqueued_at)
+            try:
+                # Work whose request budget ran out while it queued is dropped rather than started
+                deadlines.check(self.name)
+                with metrics.span(self.name):
+                    return fn(*args, **kwargs)
+            finally:
+                self._record_finish()
+
+        # Release the slot when the work itself finishes, not when the caller stops waiting.
+        # The copied context carries the request's trace and deadline into the worker thread.
+        future = self._executor.submit(contextvars.copy_context().run, _task)
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Admission for async work (e.g. pooled HTTP calls) under the same limits as run()"""
+        self._admit()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        enqueued_at = time.perf_counter()
+        try:
+            async with self._slots:
+                self._record_start(enqueued_at)
+                try:
+                    with metrics.span(self.name):
+                        yield
+                finally:
+                    self._record_finish()
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._admitted - self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / started * 1000, 2) if started else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 2),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+pools: Dict[str, StagePool] = {
+    name: StagePool(name, cfg["workers"], cfg["queue"]) for name, cfg in POOL_CONFIG.items()
+}
+
+async def run_in_stage(stage: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call in the named stage pool"""
+    return await pools[stage].run(fn, *args, **kwargs)
+
+def stage_slot(stage: str):
+    """Async context manager admitting one unit of awaited work to the named stage"""
+    return pools[stage].slot()
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: pool.stats() for name, pool in pools.items()}
+
+def shutdown_pools():
+    for pool in pools.values():
+        pool.shutdown()
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import VoiceRecorder from './components/VoiceRecorder';
 import CalendarView from './components/CalendarView';
 import EventList from './components/EventList';
@@ -13,6 +13,12 @@ function App() {
   const [notification, setNotification] = useState(null);
   const [currentView, setCurrentView] = useState('main'); // 'main' or 'confirmation'
   const [currentEvent, setCurrentEvent] = useState(null);
+  // One key per proposed event, so confirming it again after a lost response doesn't book it twice
+  const idempotencyKey = useRef(null);
+
+  useEffect(() => {
+    idempotencyKey.current = crypto.randomUUID();
+  }, [currentEvent]);
 
   const handleNewEvent = (newEvent) => {
     setEvents(prev => [...prev, { ...newEvent, id: Date.now() }]);
@@ -24,38 +30,77 @@ function App() {
     setCurrentView('main');
   };
 
+  // The backend answers 202 while its outbox still has to write the event; poll until it has
+  const waitForOperation = async (statusUrl) => {
+    for (let attempt = 0; attempt < 30; attempt++) {
+      await new Promise(resolve => setTimeout(resolve, 1000));
+      const response = await fetch(`http://localhost:8000${statusUrl}`);
+      const operation = await response.json();
+      if (operation.status === "done" || operation.status === "failed") {
+        return operation;
+      }
+    }
+    return null;
+  };
+
   const confirmEvent = async () => {
     if (currentEvent) {
       setIsLoading(true);
+      let added = false;
       try {
         const response = await fetch("http://localhost:8000/create-event", {
           method: "POST",
           headers: {
             "Content-Type": "application/json",
+            "Idempotency-Key": idempotencyKey.current,
           },
           body: JSON.stringify(currentEvent),
         });
         
         const result = await response.json();
         
-        if (result.success) {
-          handleNewEvent(currentEvent);
+        if (!result.success) {
+          throw new Error(result.error || "Failed to create event in calendar");
+        }
+        handleNewEvent(currentEvent);
+        added = true;
+        
+        if (response.status === 202) {
           setNotification({
+            message: "Event queued, adding it to your calendar...",
+            type: "info",
+            event: currentEvent
+          });
+          const operation = await waitForOperation(result.status_url);
+          if (operation?.status === "failed") {
+            throw new Error(operation.error || "Failed to create event in calendar");
+          }
+          setNotification(operation ? {
             message: "Event created successfully in your calendar!",
             type: "success",
+            event: operation.event || currentEvent
+          } : {
+            message: "Event is still queued and will appear in your calendar shortly.",
+            type: "info",
             event: currentEvent
           });
         } else {
-          throw new Error(result.error || "Failed to create event in calendar");
+          setNotification({
+            message: "Event created successfully in your calendar!",
+            type: "success",
+            event: result.event || currentEvent
+          });
         }
       } catch (error) {
         console.error("Error creating event:", error);
+        // Still add to local events even if calendar creation fails
+        if (!added) {
+          handleNewEvent(currentEvent);
+        }
         setNotification({
           message: error.message,
           type: "error"
         });
-        // Still add to local events even if calendar creation fails
-        handleNewEvent(currentEvent);
       } finally {
         setIsLoading(false);
       }